@@ -0,0 +1,164 @@
+"""
+Benchmark concurrent workflows on a single event loop.
+
+Runs many workflows at once through `run_agent_workflow` with simulated LLM
+and agent latency, and compares the graph with sync-only nodes (each node is
+offloaded to the default thread pool) against the graph with native async
+nodes. The thread pool is deliberately small to show that async nodes do not
+depend on it.
+
+Usage:
+    uv run python -m benchmarks.bench_async_workflows [--workflows 200]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import src.graph.nodes as nodes
+import src.service.workflow_service as workflow_service
+from src.graph import builder
+
+PLAN = json.dumps(
+    {
+        "thought": "benchmark",
+        "title": "benchmark",
+        "steps": [
+            {"agent_name": "researcher", "title": "research", "description": ""},
+            {"agent_name": "reporter", "title": "report", "description": ""},
+        ],
+    }
+)
+
+
+class LatencyChatModel(BaseChatModel):
+    """A chat model that answers after a fixed delay, based on the system prompt."""
+
+    latency: float = 0.1
+
+    @property
+    def _llm_type(self) -> str:
+        return "latency"
+
+    def _respond(self, messages) -> ChatResult:
+        system_prompt = messages[0].content
+        if "You are Langmanus" in system_prompt:
+            content = "handoff_to_planner()"
+        elif "Deep Researcher" in system_prompt:
+            content = PLAN
+        else:
+            content = "done"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+
+class LatencyAgent:
+    """A stand-in for a ReAct agent that finishes after a fixed delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def invoke(self, state):
+        time.sleep(self.latency)
+        return {"messages": [AIMessage(content="findings")]}
+
+    async def ainvoke(self, state):
+        await asyncio.sleep(self.latency)
+        return {"messages": [AIMessage(content="findings")]}
+
+
+def build_sync_only_graph():
+    """Build the workflow graph as it was before async nodes existed."""
+    with patch.object(
+        builder,
+        "_add_node",
+        lambda graph_builder, name, func, afunc: graph_builder.add_node(name, func),
+    ):
+        return builder.build_graph()
+
+
+async def run_workflows(graph, count: int) -> tuple[float, int]:
+    """Run `count` workflows concurrently and return (seconds, peak threads)."""
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    async def run_one(index: int):
+        async for _ in workflow_service.run_agent_workflow(
+            [{"role": "user", "content": f"question {index}"}],
+            deterministic_routing=True,
+        ):
+            pass
+
+    sampler = asyncio.create_task(sample_threads())
+    start = time.perf_counter()
+    with patch.object(workflow_service, "get_graph", lambda: graph):
+        await asyncio.gather(*(run_one(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await sampler
+    return elapsed, peak_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workflows", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    # Keep per-node logging out of the measurement
+    logging.getLogger("src").setLevel(logging.WARNING)
+
+    llm = LatencyChatModel(latency=args.latency)
+    agent = LatencyAgent(args.latency)
+
+    async def run(graph):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+        return await run_workflows(graph, args.workflows)
+
+    with (
+        patch.object(nodes, "get_llm_by_type", lambda llm_type: llm),
+        patch.object(nodes, "get_research_agent", lambda: agent),
+    ):
+        # Each workflow makes 4 sequential calls: coordinator, planner,
+        # researcher and reporter.
+        print(
+            f"{args.workflows} workflows, {args.latency}s per call, "
+            f"{args.threads} pool threads, ideal: {4 * args.latency:.2f}s"
+        )
+        for label, graph in [
+            ("sync nodes", build_sync_only_graph()),
+            ("async nodes", builder.build_graph()),
+        ]:
+            elapsed, peak_threads = asyncio.run(run(graph))
+            print(
+                f"{label:<12} {elapsed:8.2f}s  "
+                f"{args.workflows / elapsed:8.1f} workflows/s  "
+                f"peak threads: {peak_threads}"
+            )
+
+
+if __name__ == "__main__":
+    main()
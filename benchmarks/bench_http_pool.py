@@ -0,0 +1,98 @@
+"""
+Benchmark LLM calls with and without the shared HTTP connection pool.
+
+Sends concurrent chat completions to the local OpenAI-compatible stub through
+three LLM instances (like the reasoning, basic and vision LLMs). Calls move
+between the instances in bursts, the way a workflow moves from the planner to
+the researcher and the browser. Compares:
+
+- a new client for every call, so every call opens a new connection
+- one client per LLM instance, each with its own default connection pool
+- the shared pool that `get_llm_by_type` injects into every client
+
+The stub adds a delay to the first request on each new connection to stand in
+for the TCP and TLS handshakes of a remote endpoint (`--handshake-delay`).
+
+Usage:
+    uv run python -m benchmarks.bench_http_pool [--calls 120] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_openai import ChatOpenAI
+
+from benchmarks.openai_stub import StubServer
+from src.llms.http import close_http_clients
+from src.llms.llm import create_openai_llm
+
+LLM_COUNT = 3
+
+
+async def run_calls(get_llm, calls: int, concurrency: int) -> tuple[float, list]:
+    """Make `calls` requests, at most `concurrency` at once."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def call(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await get_llm(index).ainvoke("ping")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(calls)))
+    return time.perf_counter() - start, latencies
+
+
+async def run(args, server: StubServer):
+    def default_client_llm():
+        return ChatOpenAI(model="stub", base_url=server.base_url, api_key="stub")
+
+    def burst(index: int) -> int:
+        return index // args.concurrency % LLM_COUNT
+
+    per_llm = [default_client_llm() for _ in range(LLM_COUNT)]
+    shared = [
+        create_openai_llm(model="stub", base_url=server.base_url, api_key="stub")
+        for _ in range(LLM_COUNT)
+    ]
+    scenarios = [
+        ("client per call", lambda index: default_client_llm()),
+        ("client per LLM", lambda index: per_llm[burst(index)]),
+        ("shared pool", lambda index: shared[burst(index)]),
+    ]
+    for label, get_llm in scenarios:
+        server.reset_stats()
+        elapsed, latencies = await run_calls(get_llm, args.calls, args.concurrency)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(
+            f"{label:<16} {elapsed:7.2f}s  "
+            f"mean {statistics.mean(latencies) * 1000:7.1f} ms  "
+            f"p95 {p95 * 1000:7.1f} ms  "
+            f"connections: {server.stats()['connections']}"
+        )
+    await close_http_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ttft", type=float, default=0.02)
+    parser.add_argument("--handshake-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubServer(ttft=args.ttft, handshake_delay=args.handshake_delay) as server:
+        print(
+            f"{args.calls} calls, concurrency {args.concurrency}, "
+            f"{args.ttft}s per call, {args.handshake_delay}s per new connection"
+        )
+        asyncio.run(run(args, server))
+
+
+if __name__ == "__main__":
+    main()
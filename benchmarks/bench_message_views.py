@@ -0,0 +1,112 @@
+"""
+Benchmark supervisor message preprocessing: deepcopy vs. message views.
+
+Builds a 100-message history with large crawled pages and measures the time
+and peak memory allocated (via tracemalloc) to prepare the supervisor input,
+once by deep-copying the history as the supervisor used to, and once through
+`_build_supervisor_messages`, which wraps team-member outputs lazily. Both
+inputs are consumed with `convert_to_messages`, as the chat model does.
+
+Message contents are immutable strings shared by both approaches, so most of
+the peak is the wrapped contents themselves; the difference is in the
+message objects, dicts and metadata that deepcopy clones.
+
+Usage:
+    uv run python -m benchmarks.bench_message_views [--messages 100]
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+from copy import deepcopy
+from unittest.mock import patch
+
+from langchain_core.messages import BaseMessage, HumanMessage, convert_to_messages
+
+from src.config import TEAM_MEMBERS
+from src.graph.nodes import RESPONSE_FORMAT, _build_supervisor_messages
+from src.prompts import template
+from src.prompts.template import apply_prompt_template
+
+
+def build_state(count: int, page_size: int) -> dict:
+    """Build a state whose history alternates crawled pages and short outputs."""
+    messages = [HumanMessage(content="Research the topic")]
+    messages.append(HumanMessage(content='{"steps": []}', name="planner"))
+    for index in range(count - len(messages)):
+        if index % 2 == 0:
+            content = f"# Crawled page {index}\n\n" + "lorem ipsum " * (page_size // 12)
+        else:
+            content = f"Summary of page {index - 1}"
+        messages.append(
+            HumanMessage(
+                content=content,
+                name="researcher",
+                additional_kwargs={"metadata": {"url": f"https://example.com/{index}"}},
+            )
+        )
+    return {
+        "messages": messages,
+        "TEAM_MEMBERS": TEAM_MEMBERS,
+        "deep_thinking_mode": False,
+        "search_before_planning": False,
+    }
+
+
+def deepcopy_supervisor_messages(state: dict) -> list:
+    """The previous supervisor preprocessing, which deep-copied the history."""
+    messages = deepcopy(apply_prompt_template("supervisor", state))
+    for message in messages:
+        if isinstance(message, BaseMessage) and message.name in TEAM_MEMBERS:
+            message.content = RESPONSE_FORMAT.format(message.name, message.content)
+    return messages
+
+
+def measure(build, state: dict, rounds: int) -> tuple[float, int, int]:
+    """Return (ms per round, peak bytes, live allocation blocks) for one round."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        convert_to_messages(build(state))
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    messages = convert_to_messages(build(state))
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(
+        stat.count for stat in tracemalloc.take_snapshot().statistics("filename")
+    )
+    tracemalloc.stop()
+    del messages
+    return elapsed * 1000, peak, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("src").setLevel(logging.WARNING)
+
+    state = build_state(args.messages, args.page_size)
+    history_bytes = sum(len(message.content) for message in state["messages"])
+    print(
+        f"{args.messages} messages, {history_bytes / 1e6:.1f} MB of content, "
+        f"{args.rounds} rounds"
+    )
+    # Measure the preprocessing alone, without context compaction
+    with patch.object(template, "AGENT_CONTEXT_BUDGET", {}):
+        for label, build in [
+            ("deepcopy", deepcopy_supervisor_messages),
+            ("message view", _build_supervisor_messages),
+        ]:
+            elapsed, peak, blocks = measure(build, state, args.rounds)
+            print(
+                f"{label:<13} {elapsed:8.2f} ms/round  "
+                f"peak alloc: {peak / 1e6:6.2f} MB  live blocks: {blocks}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark building system prompts: read and parse per call vs. compiled prompts.
+
+For every prompt in `src/prompts`, measures the time to build the system
+prompt the way `apply_prompt_template` used to (read the markdown file,
+escape braces, convert `<<VAR>>` placeholders and format a new
+`PromptTemplate` on every call) and through the compiled prompt cache,
+which only checks the file's mtime and joins strings. `apply_prompt_template`
+runs once per agent call and once per ReAct iteration.
+
+Usage:
+    uv run python -m benchmarks.bench_prompt_templates [--calls 2000]
+"""
+
+import argparse
+import glob
+import os
+import re
+import time
+
+from langchain_core.prompts import PromptTemplate
+
+from src.config import TEAM_MEMBERS
+from src.prompts.template import PROMPTS_DIR, current_time, get_compiled_prompt
+
+
+def legacy_system_prompt(prompt_name: str, state: dict) -> str:
+    """Build a system prompt as `apply_prompt_template` did before compiling."""
+    template = open(os.path.join(PROMPTS_DIR, f"{prompt_name}.md")).read()
+    template = template.replace("{", "{{").replace("}", "}}")
+    template = re.sub(r"<<([^>>]+)>>", r"{\1}", template)
+    return PromptTemplate(input_variables=["CURRENT_TIME"], template=template).format(
+        CURRENT_TIME=current_time(), **state
+    )
+
+
+def compiled_system_prompt(prompt_name: str, state: dict) -> str:
+    return get_compiled_prompt(prompt_name, cache_friendly=False).format(
+        CURRENT_TIME=current_time(), **state
+    )
+
+
+def measure(build, prompt_name: str, state: dict, calls: int) -> float:
+    """Return the mean microseconds per call."""
+    build(prompt_name, state)
+    start = time.perf_counter()
+    for _ in range(calls):
+        build(prompt_name, state)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    state = {"messages": [], "TEAM_MEMBERS": TEAM_MEMBERS}
+    prompt_names = sorted(
+        os.path.basename(path)[: -len(".md")]
+        for path in glob.glob(os.path.join(PROMPTS_DIR, "*.md"))
+    )
+    print(f"{'prompt':<14} {'per call':>12} {'compiled':>12} {'speedup':>8}")
+    for prompt_name in prompt_names:
+        assert legacy_system_prompt(prompt_name, state) == compiled_system_prompt(
+            prompt_name, state
+        )
+        legacy = measure(legacy_system_prompt, prompt_name, state, args.calls)
+        compiled = measure(compiled_system_prompt, prompt_name, state, args.calls)
+        print(
+            f"{prompt_name:<14} {legacy:9.1f} us {compiled:9.1f} us "
+            f"{legacy / compiled:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""
+Record and replay the LLM and tool calls of workflow sessions.
+
+Recording captures every chat model call (its messages and answer) and every
+tool call (its input and output) made while `run_agent_workflow` runs, and
+saves them to a JSON cassette. Replaying points every LLM type at the local
+OpenAI-compatible stub, which answers from the cassette with a latency
+profile, and answers tool calls from the cassette, so that graph, service and
+API benchmarks run deterministically with no network or API keys.
+
+Requests are matched on their messages, with ids and the CURRENT_TIME line
+left out. A request that was not recorded gets an answer recorded for the
+same system prompt (tool calls: for the same tool), so that small prompt
+changes can be benchmarked against an existing cassette.
+
+Usage:
+    # Record a session against the configured models and tools
+    uv run python -m benchmarks.cassette record session.json "question"
+    # Replay it, 20 workflows at a time, with hosted-model timings
+    uv run python -m benchmarks.cassette replay session.json "question" \\
+        --profile standard --reasoning-profile reasoning --workflows 20
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from typing import Any, Iterator, Optional, Union
+from unittest.mock import patch
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, ToolMessage, convert_to_openai_messages
+from langchain_core.outputs import LLMResult
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_core.tracers.context import register_configure_hook
+
+import src.graph.nodes as nodes
+import src.llms.llm as llm_module
+from benchmarks.openai_stub import PROFILES, LatencyProfile, StubServer
+from src.config.agents import LLMType
+from src.llms.cache import VOLATILE_PATTERNS
+from src.utils.cache import make_cache_key
+from src.utils.lazy import lazy_singleton
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+# Config names of each LLM type in src.llms.llm
+_LLM_CONFIG_PREFIXES: dict[LLMType, str] = {
+    "reasoning": "REASONING",
+    "basic": "BASIC",
+    "vision": "VL",
+}
+
+_recorder_var: contextvars.ContextVar[Optional["CassetteRecorder"]] = (
+    contextvars.ContextVar("cassette_recorder", default=None)
+)
+# Add the active recorder to the callbacks of every run
+register_configure_hook(_recorder_var, inheritable=True)
+
+
+def canonicalize_request_message(message: dict) -> dict:
+    """
+    Reduce an OpenAI-format message to the parts that determine the answer.
+
+    Recorded messages and the messages the stub receives both go through
+    this, so they match although ids, the CURRENT_TIME line and the way
+    clients serialize empty contents differ.
+    """
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = "".join(
+            block.get("text", "") for block in content if isinstance(block, dict)
+        )
+    for pattern in VOLATILE_PATTERNS:
+        content = pattern.sub("", content)
+    canonical = {"role": message["role"], "content": content}
+    if message.get("name") and message["role"] != "tool":
+        canonical["name"] = message["name"]
+    if message.get("tool_calls"):
+        canonical["tool_calls"] = [
+            {
+                "name": tool_call["function"]["name"],
+                "args": json.loads(tool_call["function"]["arguments"] or "{}"),
+            }
+            for tool_call in message["tool_calls"]
+        ]
+    return canonical
+
+
+def request_keys(messages: list[dict]) -> tuple[str, str]:
+    """Return the key of a request and the key of its system prompt."""
+    canonical = [canonicalize_request_message(message) for message in messages]
+    return make_cache_key(canonical), make_cache_key(canonical[:1])
+
+
+def tool_key(name: str, tool_input: Union[str, dict, None]) -> str:
+    return make_cache_key(name, tool_input)
+
+
+def _tool_output(output: Any) -> str:
+    if isinstance(output, ToolMessage):
+        output = output.content
+    return output if isinstance(output, str) else json.dumps(output, default=str)
+
+
+class CassetteRecorder(BaseCallbackHandler):
+    """Collect the chat model and tool calls of the runs it is attached to."""
+
+    # Record in the event loop, in call order
+    run_inline = True
+
+    def __init__(self):
+        self.interactions: list[dict] = []
+        self._lock = threading.Lock()
+        self._pending: dict[UUID, dict] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        key, prompt_key = request_keys(convert_to_openai_messages(messages[0]))
+        with self._lock:
+            self._pending[run_id] = {
+                "type": "llm",
+                "model": (metadata or {}).get("ls_model_name"),
+                "key": key,
+                "prompt_key": prompt_key,
+            }
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            interaction = self._pending.pop(run_id, None)
+        if interaction is None or not response.generations:
+            return
+        message = response.generations[0][0].message
+        interaction["response"] = {
+            "content": message.text(),
+            "tool_calls": [
+                {"name": tool_call["name"], "args": tool_call["args"]}
+                for tool_call in getattr(message, "tool_calls", [])
+            ],
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        # Streams the caller stopped early are replayed up to where they stopped
+        if isinstance(error, GeneratorExit) and kwargs.get("response"):
+            self.on_llm_end(kwargs["response"], run_id=run_id)
+        else:
+            with self._lock:
+                self._pending.pop(run_id, None)
+
+    def on_tool_start(
+        self,
+        serialized: dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        inputs: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        name = (serialized or {}).get("name", "")
+        with self._lock:
+            self._pending[run_id] = {
+                "type": "tool",
+                "name": name,
+                "key": tool_key(name, inputs if inputs is not None else input_str),
+            }
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            interaction = self._pending.pop(run_id, None)
+            if interaction is not None:
+                interaction["output"] = _tool_output(output)
+                self.interactions.append(interaction)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            interaction = self._pending.pop(run_id, None)
+            if interaction is not None:
+                interaction["error"] = str(error)
+                self.interactions.append(interaction)
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            cassette = {"version": CASSETTE_VERSION, "interactions": self.interactions}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cassette, f, ensure_ascii=False, indent=2)
+
+
+@contextmanager
+def record_session(path: str) -> Iterator[CassetteRecorder]:
+    """
+    Record the LLM and tool calls made inside the block to a cassette.
+
+    Usage:
+        with record_session("session.json"):
+            async for event in run_agent_workflow(messages):
+                ...
+    """
+    recorder = CassetteRecorder()
+    token = _recorder_var.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder_var.reset(token)
+        recorder.save(path)
+        logger.info(f"Recorded {len(recorder.interactions)} interactions to {path}")
+
+
+class Cassette:
+    """
+    The recorded answers of one kind of call in a cassette.
+
+    The n-th request with a key gets the n-th answer recorded for it, so that
+    concurrent replays of the same session each get the whole session.
+    Requests without a recorded answer get the answers recorded for their
+    fallback key in the same way.
+    """
+
+    def __init__(self, interactions: list[dict], kind: str, fallback_field: str):
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._by_key: dict[str, list[dict]] = defaultdict(list)
+        self._by_fallback: dict[str, list[dict]] = defaultdict(list)
+        for interaction in interactions:
+            if interaction["type"] == kind:
+                self._by_key[interaction["key"]].append(interaction)
+                self._by_fallback[interaction[fallback_field]].append(interaction)
+        self._requests: dict[str, int] = defaultdict(int)
+        self.hits = 0
+        self.fallbacks = 0
+        self.misses = 0
+
+    @staticmethod
+    def load(path: str) -> list[dict]:
+        with open(path, encoding="utf-8") as f:
+            cassette = json.load(f)
+        if cassette.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version in {path}")
+        return cassette["interactions"]
+
+    def _next(self, answers: list[dict], counter: str) -> dict:
+        count = self._requests[counter]
+        self._requests[counter] += 1
+        return answers[count % len(answers)]
+
+    def take(self, key: str, fallback_key: str) -> Optional[dict]:
+        with self._lock:
+            if key in self._by_key:
+                self.hits += 1
+                return self._next(self._by_key[key], key)
+            if fallback_key in self._by_fallback:
+                self.fallbacks += 1
+                logger.warning(f"No recorded {self.kind} call matched, using fallback")
+                answers = self._by_fallback[fallback_key]
+                return self._next(answers, f"fallback:{fallback_key}")
+            self.misses += 1
+            return None
+
+
+class CassetteResponder:
+    """
+    Answers the stub's chat completions requests from a cassette.
+
+    The cassette is loaded on the first request, in the stub's process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._cassette: Optional[Cassette] = None
+
+    def __call__(self, body: dict) -> Optional[dict]:
+        if self._cassette is None:
+            self._cassette = Cassette(Cassette.load(self.path), "llm", "prompt_key")
+        interaction = self._cassette.take(*request_keys(body["messages"]))
+        if interaction is None:
+            logger.warning("No recorded LLM answer for a request")
+            return None
+        return interaction["response"]
+
+
+@contextmanager
+def replay_tools(path: str) -> Iterator[Cassette]:
+    """
+    Answer tool calls made inside the block from a cassette.
+
+    Tools keep their name, schema and callbacks; only their output comes
+    from the cassette. Calls without a recorded output fail like a tool
+    error, so that a replay never reaches the network.
+    """
+    cassette = Cassette(Cassette.load(path), "tool", "name")
+    original_run, original_arun = BaseTool.run, BaseTool.arun
+
+    def recorded_tool(tool: BaseTool, tool_input) -> StructuredTool:
+        interaction = cassette.take(tool_key(tool.name, tool_input), tool.name)
+
+        def answer(*args, **kwargs) -> str:
+            if interaction is None:
+                raise RuntimeError(f"No recorded output for {tool.name}")
+            if "error" in interaction:
+                raise RuntimeError(interaction["error"])
+            return interaction["output"]
+
+        async def aanswer(*args, **kwargs) -> str:
+            return answer()
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            func=answer,
+            coroutine=aanswer,
+        )
+
+    def run(self, tool_input, *args, **kwargs):
+        return original_run(
+            recorded_tool(self, tool_input), tool_input, *args, **kwargs
+        )
+
+    async def arun(self, tool_input, *args, **kwargs):
+        tool = recorded_tool(self, tool_input)
+        return await original_arun(tool, tool_input, *args, **kwargs)
+
+    with patch.object(BaseTool, "run", run), patch.object(BaseTool, "arun", arun):
+        yield cassette
+
+
+@contextmanager
+def replay_session(
+    path: str,
+    profile: Union[str, LatencyProfile] = "instant",
+    profiles: Optional[dict[LLMType, Union[str, LatencyProfile]]] = None,
+) -> Iterator[StubServer]:
+    """
+    Replay a recorded session for the workflows run inside the block.
+
+    Every LLM type is pointed at a local stub that answers from the cassette,
+    and tool calls are answered from it as well. Agents are recreated, so
+    that they use the stub's LLMs.
+
+    Args:
+        path: The cassette file
+        profile: Latency profile, or the name of one in PROFILES, of every
+            LLM type without its own
+        profiles: Latency profiles by LLM type
+    """
+
+    def resolve(value: Union[str, LatencyProfile]) -> LatencyProfile:
+        return PROFILES[value] if isinstance(value, str) else value
+
+    model_profiles = {
+        f"replay-{llm_type}": resolve(value)
+        for llm_type, value in (profiles or {}).items()
+    }
+    with ExitStack() as stack:
+        server = stack.enter_context(
+            StubServer(
+                responder=CassetteResponder(path),
+                profile=resolve(profile),
+                profiles=model_profiles,
+            )
+        )
+        config = {}
+        for llm_type, prefix in _LLM_CONFIG_PREFIXES.items():
+            config[f"{prefix}_MODEL"] = f"replay-{llm_type}"
+            config[f"{prefix}_BASE_URL"] = server.base_url
+            config[f"{prefix}_API_KEY"] = "replay"
+            config[f"{prefix}_AZURE_DEPLOYMENT"] = None
+        stack.enter_context(patch.multiple(llm_module, **config))
+        stack.enter_context(patch.dict(llm_module._llm_cache, clear=True))
+        stack.enter_context(
+            patch.dict(
+                llm_module._FALLBACK_LLMS,
+                {llm_type: (None, None, None) for llm_type in _LLM_CONFIG_PREFIXES},
+            )
+        )
+        for name in ("get_research_agent", "get_coder_agent", "get_browser_agent"):
+            agent = lazy_singleton(getattr(nodes, name).__wrapped__)
+            stack.enter_context(patch.object(nodes, name, agent))
+        stack.enter_context(replay_tools(path))
+        yield server
+
+
+async def _run_workflow(question: str, options: dict) -> int:
+    from src.service.workflow_service import run_agent_workflow
+
+    events = 0
+    async for _ in run_agent_workflow(
+        [{"role": "user", "content": question}], **options
+    ):
+        events += 1
+    return events
+
+
+async def _run_workflows(question: str, count: int, options: dict) -> list[float]:
+    async def run_one() -> float:
+        start = time.perf_counter()
+        await _run_workflow(question, options)
+        return time.perf_counter() - start
+
+    return list(await asyncio.gather(*(run_one() for _ in range(count))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("cassette")
+    parser.add_argument("question")
+    parser.add_argument("--profile", choices=PROFILES, default="instant")
+    for llm_type in _LLM_CONFIG_PREFIXES:
+        parser.add_argument(f"--{llm_type}-profile", choices=PROFILES)
+    parser.add_argument(
+        "--workflows", type=int, default=1, help="Concurrent replays of the session"
+    )
+    parser.add_argument("--deep-thinking-mode", action="store_true")
+    parser.add_argument("--search-before-planning", action="store_true")
+    parser.add_argument("--parallel-execution", action="store_true")
+    parser.add_argument("--deterministic-routing", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    options = {
+        "deep_thinking_mode": args.deep_thinking_mode,
+        "search_before_planning": args.search_before_planning,
+        "parallel_execution": args.parallel_execution,
+        "deterministic_routing": args.deterministic_routing,
+    }
+    if args.mode == "record":
+        with record_session(args.cassette) as recorder:
+            asyncio.run(_run_workflow(args.question, options))
+        print(f"Recorded {len(recorder.interactions)} interactions")
+        return
+
+    profiles = {
+        llm_type: getattr(args, f"{llm_type}_profile")
+        for llm_type in _LLM_CONFIG_PREFIXES
+        if getattr(args, f"{llm_type}_profile")
+    }
+    with replay_session(args.cassette, args.profile, profiles):
+        start = time.perf_counter()
+        latencies = asyncio.run(_run_workflows(args.question, args.workflows, options))
+        elapsed = time.perf_counter() - start
+    print(
+        f"{args.workflows} workflows in {elapsed:.2f}s, "
+        f"mean {sum(latencies) / len(latencies):.2f}s, max {max(latencies):.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+A local OpenAI-compatible chat completions server for benchmarks.
+
+Answers `POST /v1/chat/completions`, streamed or not, with a fixed content, or
+with the answer of a responder such as a recorded session (see
+`benchmarks.cassette`), timed by a latency profile: round trip latency, time
+to first token and token rate, per model. It counts the connections clients
+open (`GET /v1/stats`), and can add a delay to the first request on each new
+connection to stand in for the TCP and TLS handshakes of a remote endpoint.
+
+Usage:
+    uv run python -m benchmarks.openai_stub [--port 8765] [--profile standard]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_CONTENT = "This is a response from the local OpenAI-compatible stub."
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    """
+    Timing of the stub's answers.
+
+    Args:
+        latency: Round trip seconds added to every request
+        ttft: Seconds before the first token
+        tokens_per_second: Rate at which tokens are produced, unlimited if None
+        jitter: Random variation of all delays, as a fraction of each delay;
+            the sequence is seeded, so a replay is timed the same every run
+    """
+
+    latency: float = 0.0
+    ttft: float = 0.0
+    tokens_per_second: Optional[float] = None
+    jitter: float = 0.0
+
+
+# Rough timings of hosted models, by name
+PROFILES = {
+    "instant": LatencyProfile(),
+    "fast": LatencyProfile(latency=0.05, ttft=0.25, tokens_per_second=150, jitter=0.2),
+    "standard": LatencyProfile(latency=0.1, ttft=0.6, tokens_per_second=60, jitter=0.3),
+    "reasoning": LatencyProfile(
+        latency=0.1, ttft=4.0, tokens_per_second=40, jitter=0.3
+    ),
+}
+
+# Answers a chat completions request body with an assistant message
+# ({"content": ..., "tool_calls": [{"name": ..., "args": ...}]}), or None
+Responder = Callable[[dict], Optional[dict]]
+
+
+class StubStats:
+    """Requests served and connections opened since the last reset."""
+
+    def __init__(self):
+        self.requests = 0
+        self.peers: set[tuple[str, int]] = set()
+
+    @property
+    def connections(self) -> int:
+        return len(self.peers)
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.peers.clear()
+
+
+def _split_tokens(content: str) -> list[str]:
+    """Split content into word-sized tokens, keeping the spaces."""
+    words = content.split(" ")
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+def create_app(
+    content: str = DEFAULT_CONTENT,
+    ttft: float = 0.0,
+    tokens_per_second: Optional[float] = None,
+    handshake_delay: float = 0.0,
+    responder: Optional[Responder] = None,
+    profile: Optional[LatencyProfile] = None,
+    profiles: Optional[dict[str, LatencyProfile]] = None,
+) -> FastAPI:
+    """
+    Create the stub application.
+
+    Args:
+        content: The content of every answer without a responder
+        ttft: Seconds before the first token
+        tokens_per_second: Rate at which tokens are produced, unlimited if None
+        handshake_delay: Extra seconds for the first request on a new connection
+        responder: Answers each request, 404 when it returns None
+        profile: Latency profile of models without their own, instead of
+            `ttft` and `tokens_per_second`
+        profiles: Latency profiles by requested model name
+    """
+    app = FastAPI()
+    app.state.stats = StubStats()
+    default_profile = profile or LatencyProfile(
+        ttft=ttft, tokens_per_second=tokens_per_second
+    )
+    profiles = profiles or {}
+    jitter = random.Random(0)
+
+    async def _sleep(profile: LatencyProfile, seconds: float) -> None:
+        if profile.jitter:
+            seconds *= 1 + jitter.uniform(-profile.jitter, profile.jitter)
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    async def _pace(profile: LatencyProfile, tokens: int) -> None:
+        if profile.tokens_per_second:
+            await _sleep(profile, tokens / profile.tokens_per_second)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats: StubStats = app.state.stats
+        stats.requests += 1
+        peer = (request.client.host, request.client.port)
+        if peer not in stats.peers:
+            stats.peers.add(peer)
+            await asyncio.sleep(handshake_delay)
+
+        model = body.get("model", "stub")
+        profile = profiles.get(model, default_profile)
+        message = responder(body) if responder else {"content": content}
+        if message is None:
+            return JSONResponse(
+                {"error": {"message": "No recorded response", "type": "not_found"}},
+                status_code=404,
+            )
+        await _sleep(profile, profile.latency + profile.ttft)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        tokens = _split_tokens(message.get("content") or "")
+        tool_calls = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {
+                    "name": tool_call["name"],
+                    "arguments": json.dumps(tool_call["args"], ensure_ascii=False),
+                },
+            }
+            for tool_call in message.get("tool_calls") or []
+        ]
+        tool_call_tokens = [
+            len(_split_tokens(tool_call["function"]["arguments"]))
+            for tool_call in tool_calls
+        ]
+        finish_reason = "tool_calls" if tool_calls else "stop"
+
+        if not body.get("stream"):
+            await _pace(profile, len(tokens) + sum(tool_call_tokens))
+            reply = {"role": "assistant", "content": message.get("content")}
+            if tool_calls:
+                reply["tool_calls"] = tool_calls
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": reply,
+                            "finish_reason": finish_reason,
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 0,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": len(tokens),
+                    },
+                }
+            )
+
+        def _chunk(delta: dict, finish_reason: Optional[str] = None) -> str:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        async def _events():
+            yield _chunk({"role": "assistant", "content": ""})
+            for token in tokens:
+                await _pace(profile, 1)
+                yield _chunk({"content": token})
+            for index, tool_call in enumerate(tool_calls):
+                await _pace(profile, tool_call_tokens[index])
+                yield _chunk({"tool_calls": [{"index": index, **tool_call}]})
+            yield _chunk({}, finish_reason=finish_reason)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    @app.get("/v1/stats")
+    async def get_stats():
+        stats: StubStats = app.state.stats
+        return {"requests": stats.requests, "connections": stats.connections}
+
+    @app.delete("/v1/stats")
+    async def reset_stats():
+        app.state.stats.reset()
+
+    return app
+
+
+class StubServer:
+    """
+    Run the stub application in a separate process.
+
+    A separate process keeps the stub from competing with the benchmark for
+    the GIL. Options are passed to `create_app`, so a responder must be
+    picklable where processes are spawned rather than forked.
+
+    Usage:
+        with StubServer(ttft=0.05) as server:
+            llm = ChatOpenAI(base_url=server.base_url, api_key="stub")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: Optional[int] = None, **options):
+        if port is None:
+            with socket.socket() as sock:
+                sock.bind((host, 0))
+                port = sock.getsockname()[1]
+        self.host = host
+        self.port = port
+        self._process = multiprocessing.Process(
+            target=_serve, args=(host, port, options), daemon=True
+        )
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def stats(self) -> dict:
+        """Requests served and connections opened since the last reset."""
+        return httpx.get(f"{self.base_url}/stats").json()
+
+    def reset_stats(self) -> None:
+        httpx.delete(f"{self.base_url}/stats")
+
+    def __enter__(self) -> "StubServer":
+        self._process.start()
+        while True:
+            try:
+                self.stats()
+                return self
+            except httpx.TransportError:
+                time.sleep(0.05)
+
+    def __exit__(self, *exc_info) -> None:
+        self._process.terminate()
+        self._process.join()
+
+
+def _serve(host: str, port: int, options: dict) -> None:
+    uvicorn.run(create_app(**options), host=host, port=port, log_level="warning")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--content", default=DEFAULT_CONTENT)
+    parser.add_argument("--ttft", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--handshake-delay", type=float, default=0.0)
+    parser.add_argument(
+        "--profile",
+        choices=PROFILES,
+        help="Latency profile, instead of --ttft and --tokens-per-second",
+    )
+    args = parser.parse_args()
+    app = create_app(
+        args.content,
+        args.ttft,
+        args.tokens_per_second,
+        args.handshake_delay,
+        profile=PROFILES.get(args.profile),
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
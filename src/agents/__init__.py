@@ -1,3 +1,16 @@
-from .agents import research_agent, coder_agent, browser_agent
+from .agents import get_research_agent, get_coder_agent, get_browser_agent
+from . import agents as _agents
 
-__all__ = ["research_agent", "coder_agent", "browser_agent"]
+__all__ = [
+    "get_research_agent",
+    "get_coder_agent",
+    "get_browser_agent",
+    "research_agent",
+    "coder_agent",
+    "browser_agent",
+]
+
+
+def __getattr__(name: str):
+    # research_agent, coder_agent and browser_agent are created on first access
+    return getattr(_agents, name)
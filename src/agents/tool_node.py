@@ -0,0 +1,150 @@
+import asyncio
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Optional
+
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.prebuilt import ToolNode
+from langgraph.store.base import BaseStore
+
+from src.config import (
+    TOOL_MAX_CONCURRENCY,
+    TOOL_CONCURRENCY_LIMITS,
+    TOOL_OUTPUT_MAX_TOKENS,
+    TOOL_OUTPUT_MAX_BYTES,
+    TOOL_OUTPUT_TOKEN_LIMITS,
+    TOOL_OUTPUT_BYTE_LIMITS,
+    TOOL_OUTPUT_SELECTION,
+)
+from src.llms.rate_limit import LLMRateLimiter
+from src.utils.tool_output import shape_tool_output
+
+# 读取完整输出的工具，它的输出本身已经受上限约束，不再处理
+READ_TOOL_OUTPUT = "read_tool_output"
+
+# 每个工具在进程内的并发上限，由所有工作流共享
+_tool_limiters: dict[str, LLMRateLimiter] = {
+    name: LLMRateLimiter(name, max_concurrency)
+    for name, max_concurrency in TOOL_CONCURRENCY_LIMITS.items()
+}
+
+# 当前一轮工具调用的并发上限，由异步执行的各个工具调用任务共享
+_turn_semaphore: ContextVar[Optional[asyncio.Semaphore]] = ContextVar(
+    "turn_semaphore", default=None
+)
+
+# 当前一轮工具调用所服务的请求，用于从过长的工具输出中选择相关段落
+_turn_request: ContextVar[Optional[str]] = ContextVar("turn_request", default=None)
+
+
+def tool_limit_stats() -> dict:
+    """返回每个有并发上限的工具的排队统计。"""
+    return {name: limiter.stats() for name, limiter in _tool_limiters.items()}
+
+
+def _request_of(input) -> Optional[str]:
+    """输入消息中最后一条用户请求或executor分派的步骤任务。"""
+    messages = input.get("messages", []) if isinstance(input, dict) else input
+    if not isinstance(messages, list):
+        messages = getattr(input, "messages", [])
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage) and message.name in (None, "executor"):
+            return message.content if isinstance(message.content, str) else None
+    return None
+
+
+class ConcurrentToolNode(ToolNode):
+    """
+    并发执行模型在一轮中发起的多个工具调用的ToolNode。
+
+    同一轮的工具调用最多同时执行max_concurrency个，整轮的耗时接近最慢的调用；
+    每个工具的调用还受到TOOL_CONCURRENCY_LIMITS中进程级并发上限的限制，
+    例如共享的浏览器同一时刻只执行一个任务。同步和异步执行都适用，
+    同步执行时工具调用在线程池中并发执行。
+
+    超过token或字节数上限的工具输出在进入消息历史之前被截短，
+    完整输出保存在句柄之后，代理可以通过read_tool_output读取。
+
+    Args:
+        tools: 工具列表
+        max_concurrency: 一轮中同时执行的工具调用数量上限，0表示不限制
+        shape_outputs: 是否限制工具输出的长度
+    """
+
+    def __init__(
+        self,
+        tools,
+        max_concurrency: int = TOOL_MAX_CONCURRENCY,
+        shape_outputs: bool = True,
+        **kwargs,
+    ):
+        super().__init__(tools, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.shape_outputs = shape_outputs
+
+    def _func(self, input, config: RunnableConfig, *, store: Optional[BaseStore]):
+        if self.max_concurrency:
+            # 决定同步执行时线程池的大小
+            config = {**config, "max_concurrency": self.max_concurrency}
+        # 线程池中执行的工具调用会复制当前的上下文
+        token = _turn_request.set(_request_of(input))
+        try:
+            return super()._func(input, config, store=store)
+        finally:
+            _turn_request.reset(token)
+
+    async def _afunc(
+        self, input, config: RunnableConfig, *, store: Optional[BaseStore]
+    ):
+        semaphore = (
+            asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        )
+        token = _turn_semaphore.set(semaphore)
+        request_token = _turn_request.set(_request_of(input))
+        try:
+            return await super()._afunc(input, config, store=store)
+        finally:
+            _turn_request.reset(request_token)
+            _turn_semaphore.reset(token)
+
+    def _run_one(self, call, input_type, config):
+        limiter = _tool_limiters.get(call["name"])
+        with limiter.limit(0) if limiter else nullcontext():
+            output = super()._run_one(call, input_type, config)
+        return self._shape(call, output)
+
+    async def _arun_one(self, call, input_type, config):
+        limiter = _tool_limiters.get(call["name"])
+        async with _turn_semaphore.get() or nullcontext():
+            async with limiter.alimit(0) if limiter else nullcontext():
+                output = await super()._arun_one(call, input_type, config)
+        if not self._needs_shaping(call, output):
+            return output
+        # 计数和选择段落是CPU密集的工作，放到线程中执行，不阻塞事件循环
+        return await asyncio.to_thread(self._shape, call, output)
+
+    def _needs_shaping(self, call, output) -> bool:
+        return (
+            self.shape_outputs
+            and call["name"] != READ_TOOL_OUTPUT
+            and isinstance(output, ToolMessage)
+        )
+
+    def _shape(self, call, output):
+        """将过长的工具输出截短，搜索类工具优先保留与搜索词相关的段落。"""
+        name = call["name"]
+        if not self._needs_shaping(call, output):
+            return output
+        query = None
+        if TOOL_OUTPUT_SELECTION == "relevant":
+            query = call["args"].get("query") or _turn_request.get()
+        content, handle = shape_tool_output(
+            output.content,
+            TOOL_OUTPUT_TOKEN_LIMITS.get(name, TOOL_OUTPUT_MAX_TOKENS),
+            TOOL_OUTPUT_BYTE_LIMITS.get(name, TOOL_OUTPUT_MAX_BYTES),
+            query=query if isinstance(query, str) else None,
+        )
+        if handle is None:
+            return output
+        return output.model_copy(update={"content": content})
@@ -15,9 +15,24 @@ from sse_starlette.sse import EventSourceResponse
 import asyncio
 from typing import AsyncGenerator, Dict, List, Any
 
-from src.graph import build_graph
+from src.agents.tool_node import tool_limit_stats
+from src.crawler.jina_client import close_async_client as close_crawler_client
+from src.graph.classifier import classifier_stats
+from src.llms.cache import llm_response_cache
+from src.llms.http import close_http_clients
+from src.llms.rate_limit import rate_limit_stats
+from src.llms.router import router_stats
+from src.prompts import load_token_counters
+from src.tools.python_pool import python_worker_pool
+from src.tools.search import search_cache_stats
 from src.config import TEAM_MEMBERS, BROWSER_HISTORY_DIR
-from src.service.workflow_service import run_agent_workflow
+from src.service.workflow_service import (
+    run_agent_workflow,
+    resume_agent_workflow,
+    get_workflow,
+    running_workflows,
+    close_durable_runtime,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -38,8 +53,20 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-# Create the graph
-graph = build_graph()
+
+@app.on_event("startup")
+async def startup():
+    """Load the tokenizers in a thread, so that prompts never download them on the event loop."""
+    await asyncio.to_thread(load_token_counters)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the checkpoint store, the connection pools and the Python workers."""
+    await close_durable_runtime()
+    await close_http_clients()
+    await close_crawler_client()
+    python_worker_pool.close()
 
 
 class ContentItem(BaseModel):
@@ -69,6 +96,17 @@ class ChatRequest(BaseModel):
     search_before_planning: Optional[bool] = Field(
         False, description="Whether to search before planning"
     )
+    parallel_execution: Optional[bool] = Field(
+        False, description="Whether to run independent plan steps concurrently"
+    )
+    deterministic_routing: Optional[bool] = Field(
+        False,
+        description="Whether to route plan steps without the supervisor LLM",
+    )
+    speculative_search: Optional[bool] = Field(
+        False,
+        description="Whether to start the planning search while the coordinator is deciding",
+    )
 
 
 @app.post("/api/chat/stream")
@@ -114,6 +152,9 @@ async def chat_endpoint(request: ChatRequest, req: Request):
                     request.debug,
                     request.deep_thinking_mode,
                     request.search_before_planning,
+                    request.parallel_execution,
+                    request.deterministic_routing,
+                    request.speculative_search,
                 ):
                     # Check if client is still connected
                     if await req.is_disconnected():
@@ -137,6 +178,52 @@ async def chat_endpoint(request: ChatRequest, req: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/workflows/{workflow_id}/resume")
+async def resume_workflow_endpoint(workflow_id: str, req: Request):
+    """
+    Resume or re-attach to a workflow by its workflow_id.
+
+    Events of completed steps are replayed from storage, then the workflow
+    continues from its latest checkpoint if it has not finished yet.
+
+    Args:
+        workflow_id: The workflow_id from the start_of_workflow event
+        req: The FastAPI request object for connection state checking
+
+    Returns:
+        The streamed response
+    """
+    workflow = await get_workflow(workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    if workflow_id in running_workflows:
+        raise HTTPException(status_code=409, detail="Workflow is already running")
+
+    async def event_generator():
+        try:
+            async for event in resume_agent_workflow(workflow_id):
+                # Check if client is still connected
+                if await req.is_disconnected():
+                    logger.info("Client disconnected, stopping workflow")
+                    break
+                yield {
+                    "event": event["event"],
+                    "data": json.dumps(event["data"], ensure_ascii=False),
+                }
+        except asyncio.CancelledError:
+            logger.info("Stream processing cancelled")
+            raise
+        except ValueError as e:
+            logger.error(f"Error resuming workflow: {e}")
+            yield {"event": "error", "data": json.dumps({"detail": str(e)})}
+
+    return EventSourceResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        sep="\n",
+    )
+
+
 @app.get("/api/browser_history/{filename}")
 async def get_browser_history_file(filename: str):
     """
@@ -159,3 +246,88 @@ async def get_browser_history_file(filename: str):
     except Exception as e:
         logger.error(f"Error retrieving browser history file: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/stats/coordinator_classifier")
+async def get_coordinator_classifier_stats():
+    """
+    Get the decisions of the coordinator pre-classifier since startup.
+
+    Returns:
+        Decision counts and the number of coordinator LLM calls saved
+    """
+    return classifier_stats.summary()
+
+
+@app.get("/api/stats/llm_cache")
+async def get_llm_cache_stats():
+    """
+    Get the hits and misses of the LLM response cache since startup.
+
+    Returns:
+        Cache hit statistics, or enabled=False if the cache is not configured
+    """
+    if llm_response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_response_cache.stats()}
+
+
+@app.get("/api/stats/search_cache")
+async def get_search_cache_stats():
+    """
+    Get the hit statistics of the search result cache.
+
+    Returns:
+        Cache hits and misses, or enabled=False if the cache is disabled, and
+        the number of searches that shared a request with a concurrent one
+    """
+    return search_cache_stats()
+
+
+@app.get("/api/stats/llm_rate_limits")
+async def get_llm_rate_limit_stats():
+    """
+    Get the queue wait statistics of the rate limited LLM types.
+
+    Returns:
+        Calls, calls in flight and waiting, and the average and maximum queue
+        wait in seconds for each rate limited LLM type
+    """
+    return rate_limit_stats()
+
+
+@app.get("/api/stats/tool_limits")
+async def get_tool_limit_stats():
+    """
+    Get the queue wait statistics of the tools with a concurrency limit.
+
+    Returns:
+        Calls, calls in flight and waiting, and the average and maximum queue
+        wait in seconds for each limited tool
+    """
+    return tool_limit_stats()
+
+
+@app.get("/api/stats/llm_backends")
+async def get_llm_backend_stats():
+    """
+    Get the hedging and fallback statistics of the LLM types with a secondary
+    backend.
+
+    Returns:
+        Hedged and fallback calls, and the calls, errors, timeouts, wins and
+        latency percentiles of each backend
+    """
+    return router_stats()
+
+
+@app.get("/api/stats/python_workers")
+async def get_python_worker_stats():
+    """
+    Get the size and queue depth of the Python worker pool.
+
+    Returns:
+        Worker processes, warm workers, sessions, busy sessions, current and
+        maximum queue depth, and execution, timeout, crash and recycle counts
+    """
+    return python_worker_pool.stats()
@@ -24,6 +24,89 @@ from .env import (
     CHROME_PROXY_SERVER,
     CHROME_PROXY_USERNAME,
     CHROME_PROXY_PASSWORD,
+    # Workflow checkpoint configuration
+    CHECKPOINT_DB_PATH,
+    # Coordinator pre-classifier configuration
+    COORDINATOR_CLASSIFIER,
+    # Plan cache configuration
+    PLAN_CACHE_TTL,
+    PLAN_CACHE_SIZE,
+    PLAN_CACHE_DB_PATH,
+    # LLM response cache configuration
+    LLM_CACHE_TTL,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_DB_PATH,
+    LLM_CACHE_DB_SIZE,
+    # LLM HTTP connection pool configuration
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_HTTP_KEEPALIVE_EXPIRY,
+    LLM_HTTP_TIMEOUT,
+    LLM_HTTP_CONNECT_TIMEOUT,
+    LLM_HTTP2,
+    # LLM rate limit configuration
+    REASONING_MAX_CONCURRENCY,
+    REASONING_RPM,
+    REASONING_TPM,
+    BASIC_MAX_CONCURRENCY,
+    BASIC_RPM,
+    BASIC_TPM,
+    VL_MAX_CONCURRENCY,
+    VL_RPM,
+    VL_TPM,
+    # LLM fallback configuration
+    REASONING_FALLBACK_MODEL,
+    REASONING_FALLBACK_BASE_URL,
+    REASONING_FALLBACK_API_KEY,
+    BASIC_FALLBACK_MODEL,
+    BASIC_FALLBACK_BASE_URL,
+    BASIC_FALLBACK_API_KEY,
+    VL_FALLBACK_MODEL,
+    VL_FALLBACK_BASE_URL,
+    VL_FALLBACK_API_KEY,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_DELAY,
+    LLM_FALLBACK_TIMEOUT,
+    # Prompt assembly configuration
+    PROMPT_CACHE_FRIENDLY,
+    PROMPT_TIME_RESOLUTION,
+    # Prompt budget configuration
+    TOKEN_COUNTER,
+    REASONING_CONTEXT_WINDOW,
+    BASIC_CONTEXT_WINDOW,
+    VL_CONTEXT_WINDOW,
+    CONTEXT_OUTPUT_RESERVE,
+    # Python worker pool configuration
+    PYTHON_WORKER_POOL_SIZE,
+    PYTHON_WORKER_WARM,
+    PYTHON_WORKER_PRELOAD,
+    PYTHON_WORKER_CPU_SECONDS,
+    PYTHON_WORKER_MEMORY_MB,
+    PYTHON_WORKER_TIMEOUT,
+    PYTHON_WORKER_IDLE_TIMEOUT,
+    # Bash tool configuration
+    BASH_TIMEOUT,
+    BASH_OUTPUT_HEAD,
+    BASH_OUTPUT_TAIL,
+    BASH_LOG_DIR,
+    # Search cache configuration
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_DB_PATH,
+    SEARCH_CACHE_DB_SIZE,
+    # Tool execution configuration
+    TOOL_MAX_CONCURRENCY,
+    TOOL_CONCURRENCY_LIMITS,
+    # Tool output configuration
+    TOOL_OUTPUT_MAX_TOKENS,
+    TOOL_OUTPUT_MAX_BYTES,
+    TOOL_OUTPUT_TOKEN_LIMITS,
+    TOOL_OUTPUT_BYTE_LIMITS,
+    TOOL_OUTPUT_SELECTION,
+    TOOL_OUTPUT_STORE_SIZE,
+    TOOL_OUTPUT_TTL,
+    TOOL_OUTPUT_DB_PATH,
 )
 from .tools import TAVILY_MAX_RESULTS, BROWSER_HISTORY_DIR
 
@@ -52,4 +135,73 @@ __all__ = [
     "CHROME_PROXY_USERNAME",
     "CHROME_PROXY_PASSWORD",
     "BROWSER_HISTORY_DIR",
+    "CHECKPOINT_DB_PATH",
+    "COORDINATOR_CLASSIFIER",
+    "PLAN_CACHE_TTL",
+    "PLAN_CACHE_SIZE",
+    "PLAN_CACHE_DB_PATH",
+    "LLM_CACHE_TTL",
+    "LLM_CACHE_SIZE",
+    "LLM_CACHE_DB_PATH",
+    "LLM_CACHE_DB_SIZE",
+    "LLM_HTTP_MAX_CONNECTIONS",
+    "LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS",
+    "LLM_HTTP_KEEPALIVE_EXPIRY",
+    "LLM_HTTP_TIMEOUT",
+    "LLM_HTTP_CONNECT_TIMEOUT",
+    "LLM_HTTP2",
+    "REASONING_MAX_CONCURRENCY",
+    "REASONING_RPM",
+    "REASONING_TPM",
+    "BASIC_MAX_CONCURRENCY",
+    "BASIC_RPM",
+    "BASIC_TPM",
+    "VL_MAX_CONCURRENCY",
+    "VL_RPM",
+    "VL_TPM",
+    "REASONING_FALLBACK_MODEL",
+    "REASONING_FALLBACK_BASE_URL",
+    "REASONING_FALLBACK_API_KEY",
+    "BASIC_FALLBACK_MODEL",
+    "BASIC_FALLBACK_BASE_URL",
+    "BASIC_FALLBACK_API_KEY",
+    "VL_FALLBACK_MODEL",
+    "VL_FALLBACK_BASE_URL",
+    "VL_FALLBACK_API_KEY",
+    "LLM_HEDGE_PERCENTILE",
+    "LLM_HEDGE_MIN_SAMPLES",
+    "LLM_HEDGE_DELAY",
+    "LLM_FALLBACK_TIMEOUT",
+    "PROMPT_CACHE_FRIENDLY",
+    "PROMPT_TIME_RESOLUTION",
+    "TOKEN_COUNTER",
+    "REASONING_CONTEXT_WINDOW",
+    "BASIC_CONTEXT_WINDOW",
+    "VL_CONTEXT_WINDOW",
+    "CONTEXT_OUTPUT_RESERVE",
+    "PYTHON_WORKER_POOL_SIZE",
+    "PYTHON_WORKER_WARM",
+    "PYTHON_WORKER_PRELOAD",
+    "PYTHON_WORKER_CPU_SECONDS",
+    "PYTHON_WORKER_MEMORY_MB",
+    "PYTHON_WORKER_TIMEOUT",
+    "PYTHON_WORKER_IDLE_TIMEOUT",
+    "BASH_TIMEOUT",
+    "BASH_OUTPUT_HEAD",
+    "BASH_OUTPUT_TAIL",
+    "BASH_LOG_DIR",
+    "SEARCH_CACHE_TTL",
+    "SEARCH_CACHE_SIZE",
+    "SEARCH_CACHE_DB_PATH",
+    "SEARCH_CACHE_DB_SIZE",
+    "TOOL_MAX_CONCURRENCY",
+    "TOOL_CONCURRENCY_LIMITS",
+    "TOOL_OUTPUT_MAX_TOKENS",
+    "TOOL_OUTPUT_MAX_BYTES",
+    "TOOL_OUTPUT_TOKEN_LIMITS",
+    "TOOL_OUTPUT_BYTE_LIMITS",
+    "TOOL_OUTPUT_SELECTION",
+    "TOOL_OUTPUT_STORE_SIZE",
+    "TOOL_OUTPUT_TTL",
+    "TOOL_OUTPUT_DB_PATH",
 ]
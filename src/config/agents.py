@@ -17,3 +17,22 @@ AGENT_LLM_MAP: dict[str, LLMType] = {
     "browser": "vision",  # 浏览器代理使用视觉LLM，负责网页交互和内容理解
     "reporter": "basic",  # 报告者使用基础LLM，负责总结和报告生成
 }
+
+# 定义各代理的上下文token预算
+# 消息历史超出预算时，较早的代理输出会被压缩为摘要或引用，最近的消息保持原样
+# 预算只针对消息历史，不包括系统提示
+AGENT_CONTEXT_BUDGET: dict[str, int] = {
+    "coordinator": 4000,  # 协调者只需要理解用户请求
+    "planner": 8000,  # 计划者需要用户请求和已有的上下文
+    "supervisor": 4000,  # 监督者只需要判断下一步，较早的输出可以大幅压缩
+    "researcher": 8000,
+    "coder": 8000,
+    "browser": 8000,
+    "reporter": 24000,  # 报告者需要尽量完整的结果来撰写报告
+}
+
+# 始终原样保留的最近消息数量
+CONTEXT_KEEP_RECENT_MESSAGES = 3
+
+# 被压缩的代理输出保留的摘要token数量
+CONTEXT_SUMMARY_TOKENS = 300
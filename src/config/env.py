@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -34,3 +35,183 @@ CHROME_HEADLESS = os.getenv("CHROME_HEADLESS", "False") == "True"
 CHROME_PROXY_SERVER = os.getenv("CHROME_PROXY_SERVER")
 CHROME_PROXY_USERNAME = os.getenv("CHROME_PROXY_USERNAME")
 CHROME_PROXY_PASSWORD = os.getenv("CHROME_PROXY_PASSWORD")
+
+# Workflow checkpoint configuration
+# SQLite database used to checkpoint workflows so they can be resumed by workflow_id.
+# Checkpointing is disabled when not set.
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH")
+
+# Coordinator pre-classifier configuration
+# Answers greetings and small talk from templates and hands obvious tasks to the planner
+# without a coordinator LLM call. "none" (default), "keyword", or "module:ClassName".
+# Handed-off requests skip the coordinator LLM's screening of harmful requests, so the
+# classifier is opt-in.
+COORDINATOR_CLASSIFIER = os.getenv("COORDINATOR_CLASSIFIER", "none")
+
+# Plan cache configuration
+# Plans are cached by the normalized user request and workflow options, for
+# single-turn conversations only.
+# PLAN_CACHE_TTL is in seconds, the cache is disabled by default (0). Set
+# PLAN_CACHE_DB_PATH to persist the cache in SQLite across restarts.
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", "0"))
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "256"))
+PLAN_CACHE_DB_PATH = os.getenv("PLAN_CACHE_DB_PATH")
+
+# LLM response cache configuration
+# Opt-in cache of LLM responses keyed on the model, its parameters and the messages,
+# useful for replaying evaluations and repeated workflows. LLM_CACHE_TTL is in seconds,
+# 0 (default) disables the cache. Set LLM_CACHE_DB_PATH to persist responses in SQLite.
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "0"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH")
+LLM_CACHE_DB_SIZE = int(os.getenv("LLM_CACHE_DB_SIZE", "10000"))
+
+# LLM HTTP connection pool configuration
+# All LLM clients share one keep-alive connection pool. HTTP/2 is used when the h2
+# package is installed and LLM_HTTP2 is not False. Timeouts are in seconds.
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")
+)
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "600"))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "True") == "True"
+
+# LLM rate limit configuration
+# Client-side limits per LLM type: maximum concurrent calls, requests per minute and
+# estimated prompt tokens per minute. Callers wait in a fair queue instead of hitting
+# 429 errors. 0 (default) means unlimited.
+REASONING_MAX_CONCURRENCY = int(os.getenv("REASONING_MAX_CONCURRENCY", "0"))
+REASONING_RPM = int(os.getenv("REASONING_RPM", "0"))
+REASONING_TPM = int(os.getenv("REASONING_TPM", "0"))
+BASIC_MAX_CONCURRENCY = int(os.getenv("BASIC_MAX_CONCURRENCY", "0"))
+BASIC_RPM = int(os.getenv("BASIC_RPM", "0"))
+BASIC_TPM = int(os.getenv("BASIC_TPM", "0"))
+VL_MAX_CONCURRENCY = int(os.getenv("VL_MAX_CONCURRENCY", "0"))
+VL_RPM = int(os.getenv("VL_RPM", "0"))
+VL_TPM = int(os.getenv("VL_TPM", "0"))
+
+# LLM fallback configuration
+# Optional secondary backend per LLM type. It is used when the primary backend fails or
+# times out, and for hedged requests when the primary is slower than its usual latency
+# (the LLM_HEDGE_PERCENTILE of its recent calls; 0 disables hedging). LLM_HEDGE_DELAY
+# (seconds) is used until LLM_HEDGE_MIN_SAMPLES calls have been measured.
+REASONING_FALLBACK_MODEL = os.getenv("REASONING_FALLBACK_MODEL")
+REASONING_FALLBACK_BASE_URL = os.getenv("REASONING_FALLBACK_BASE_URL")
+REASONING_FALLBACK_API_KEY = os.getenv("REASONING_FALLBACK_API_KEY")
+BASIC_FALLBACK_MODEL = os.getenv("BASIC_FALLBACK_MODEL")
+BASIC_FALLBACK_BASE_URL = os.getenv("BASIC_FALLBACK_BASE_URL")
+BASIC_FALLBACK_API_KEY = os.getenv("BASIC_FALLBACK_API_KEY")
+VL_FALLBACK_MODEL = os.getenv("VL_FALLBACK_MODEL")
+VL_FALLBACK_BASE_URL = os.getenv("VL_FALLBACK_BASE_URL")
+VL_FALLBACK_API_KEY = os.getenv("VL_FALLBACK_API_KEY")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "10"))
+LLM_FALLBACK_TIMEOUT = float(os.getenv("LLM_FALLBACK_TIMEOUT", "300"))
+
+# Prompt assembly configuration
+# With PROMPT_CACHE_FRIENDLY (default True) every prompt is ordered from the most to the
+# least stable content: static instructions and team, then the conversation history, then
+# CURRENT_TIME as a last message, so that consecutive calls share a long prefix that the
+# provider can serve from its prompt cache. CURRENT_TIME is rounded down to
+# PROMPT_TIME_RESOLUTION seconds (default 60, i.e. to the minute; 1 for the exact time,
+# larger values such as 3600 keep the time unchanged across more calls).
+PROMPT_CACHE_FRIENDLY = os.getenv("PROMPT_CACHE_FRIENDLY", "True") == "True"
+PROMPT_TIME_RESOLUTION = int(os.getenv("PROMPT_TIME_RESOLUTION", "60"))
+
+# Prompt budget configuration
+# Prompts are counted with the model's tiktoken tokenizer (TOKEN_COUNTER=tiktoken, the
+# default; models tiktoken does not know use cl100k_base) or estimated from the text length
+# (TOKEN_COUNTER=approximate, faster and needs no tokenizer files). Besides each agent's
+# history budget, prompts are trimmed to fit the context window of the agent's model
+# ({REASONING,BASIC,VL}_CONTEXT_WINDOW, 0 for unknown) minus CONTEXT_OUTPUT_RESERVE tokens
+# left for the answer.
+TOKEN_COUNTER = os.getenv("TOKEN_COUNTER", "tiktoken")
+REASONING_CONTEXT_WINDOW = int(os.getenv("REASONING_CONTEXT_WINDOW", "0"))
+BASIC_CONTEXT_WINDOW = int(os.getenv("BASIC_CONTEXT_WINDOW", "0"))
+VL_CONTEXT_WINDOW = int(os.getenv("VL_CONTEXT_WINDOW", "0"))
+CONTEXT_OUTPUT_RESERVE = int(os.getenv("CONTEXT_OUTPUT_RESERVE", "4096"))
+
+# Python worker pool configuration
+# python_repl_tool runs each workflow's code in a worker process of its own, with the
+# PYTHON_WORKER_PRELOAD modules (comma-separated) imported in advance. Each execution is
+# limited to PYTHON_WORKER_CPU_SECONDS of CPU time and PYTHON_WORKER_TIMEOUT seconds of wall
+# time, and each worker to PYTHON_WORKER_MEMORY_MB of memory (0 for unlimited). Sessions idle
+# for PYTHON_WORKER_IDLE_TIMEOUT seconds are recycled. PYTHON_WORKER_POOL_SIZE=0 runs the
+# code in the server process, as before.
+PYTHON_WORKER_POOL_SIZE = int(os.getenv("PYTHON_WORKER_POOL_SIZE", "4"))
+PYTHON_WORKER_WARM = int(os.getenv("PYTHON_WORKER_WARM", "1"))
+PYTHON_WORKER_PRELOAD = [
+    module.strip()
+    for module in os.getenv("PYTHON_WORKER_PRELOAD", "numpy,pandas,yfinance").split(",")
+    if module.strip()
+]
+PYTHON_WORKER_CPU_SECONDS = float(os.getenv("PYTHON_WORKER_CPU_SECONDS", "60"))
+PYTHON_WORKER_MEMORY_MB = int(os.getenv("PYTHON_WORKER_MEMORY_MB", "2048"))
+PYTHON_WORKER_TIMEOUT = float(os.getenv("PYTHON_WORKER_TIMEOUT", "120"))
+PYTHON_WORKER_IDLE_TIMEOUT = float(os.getenv("PYTHON_WORKER_IDLE_TIMEOUT", "600"))
+
+# Bash tool configuration
+# Commands are killed, together with the processes they started, after BASH_TIMEOUT seconds.
+# Only the first BASH_OUTPUT_HEAD and last BASH_OUTPUT_TAIL characters of stdout and stderr
+# are returned to the agent; longer output is written in full to a log file in BASH_LOG_DIR.
+BASH_TIMEOUT = float(os.getenv("BASH_TIMEOUT", "300"))
+BASH_OUTPUT_HEAD = int(os.getenv("BASH_OUTPUT_HEAD", "4000"))
+BASH_OUTPUT_TAIL = int(os.getenv("BASH_OUTPUT_TAIL", "4000"))
+BASH_LOG_DIR = os.getenv(
+    "BASH_LOG_DIR", os.path.join(tempfile.gettempdir(), "langmanus", "bash")
+)
+
+# Search cache configuration
+# Tavily search results are cached by normalized query and search options, in memory (the
+# SEARCH_CACHE_SIZE most recently used) and, with SEARCH_CACHE_DB_PATH, in SQLite, where at
+# most SEARCH_CACHE_DB_SIZE results are kept. SEARCH_CACHE_TTL is in seconds, 0 disables the
+# cache. Concurrent identical searches always share one request.
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "900"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+SEARCH_CACHE_DB_PATH = os.getenv("SEARCH_CACHE_DB_PATH")
+SEARCH_CACHE_DB_SIZE = int(os.getenv("SEARCH_CACHE_DB_SIZE", "10000"))
+
+# Tool execution configuration
+# Tool calls that a model makes in one turn run concurrently, at most TOOL_MAX_CONCURRENCY
+# at a time (0 for unlimited). TOOL_CONCURRENCY_LIMITS caps the calls of a tool in flight
+# across all workflows, as comma-separated tool_name=limit pairs.
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "8"))
+
+
+def _tool_limits(name: str, default: str) -> dict[str, int]:
+    """Parse comma-separated tool_name=limit pairs."""
+    return {
+        tool.strip(): int(limit)
+        for tool, limit in (
+            pair.split("=")
+            for pair in os.getenv(name, default).split(",")
+            if pair.strip()
+        )
+    }
+
+
+TOOL_CONCURRENCY_LIMITS = _tool_limits(
+    "TOOL_CONCURRENCY_LIMITS", "browser=1,crawl_tool=4,tavily_search=4"
+)
+
+# Tool output configuration
+# Tool outputs longer than TOOL_OUTPUT_MAX_TOKENS tokens or TOOL_OUTPUT_MAX_BYTES bytes (0 for
+# unlimited) are shortened before they enter the message history; TOOL_OUTPUT_TOKEN_LIMITS and
+# TOOL_OUTPUT_BYTE_LIMITS override the caps per tool, as comma-separated tool_name=limit pairs.
+# TOOL_OUTPUT_SELECTION is "relevant" to keep the passages most relevant to the search query or
+# the user's request, or "head_tail" to keep the beginning and the end. The full outputs are kept
+# for TOOL_OUTPUT_TTL seconds, in memory (the TOOL_OUTPUT_STORE_SIZE most recent) and, with
+# TOOL_OUTPUT_DB_PATH, in SQLite, where agents can read them with read_tool_output.
+TOOL_OUTPUT_MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "2000"))
+TOOL_OUTPUT_MAX_BYTES = int(os.getenv("TOOL_OUTPUT_MAX_BYTES", "16000"))
+TOOL_OUTPUT_TOKEN_LIMITS = _tool_limits(
+    "TOOL_OUTPUT_TOKEN_LIMITS", "crawl_tool=3000,tavily_search=3000"
+)
+TOOL_OUTPUT_BYTE_LIMITS = _tool_limits("TOOL_OUTPUT_BYTE_LIMITS", "")
+TOOL_OUTPUT_SELECTION = os.getenv("TOOL_OUTPUT_SELECTION", "relevant")
+TOOL_OUTPUT_STORE_SIZE = int(os.getenv("TOOL_OUTPUT_STORE_SIZE", "256"))
+TOOL_OUTPUT_TTL = int(os.getenv("TOOL_OUTPUT_TTL", "86400"))
+TOOL_OUTPUT_DB_PATH = os.getenv("TOOL_OUTPUT_DB_PATH")
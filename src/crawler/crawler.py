@@ -1,3 +1,4 @@
+import asyncio
 import sys
 
 from .article import Article
@@ -24,6 +25,16 @@ class Crawler:
         article.url = url
         return article
 
+    async def acrawl(self, url: str) -> Article:
+        # Same as `crawl`. Extraction is CPU-bound and runs in a thread, so
+        # that concurrent crawls do not wait for each other's extraction.
+        jina_client = JinaClient()
+        html = await jina_client.acrawl(url, return_format="html")
+        extractor = ReadabilityExtractor()
+        article = await asyncio.to_thread(extractor.extract_article, html)
+        article.url = url
+        return article
+
 
 if __name__ == "__main__":
     if len(sys.argv) == 2:
@@ -1,13 +1,49 @@
 import logging
 import os
+import threading
+from typing import Optional
 
+import httpx
 import requests
 
+from src.llms.http import LoopAsyncClient
+
 logger = logging.getLogger(__name__)
 
+# Jina renders the page before answering, which can take a while
+TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# Connection pools shared by all async crawls, created on first use
+_async_client: Optional[LoopAsyncClient] = None
+_client_lock = threading.Lock()
+
+
+def get_async_client() -> LoopAsyncClient:
+    """
+    Get the HTTP client shared by all async crawls, which keeps a connection
+    pool per event loop.
+    """
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = LoopAsyncClient(timeout=TIMEOUT)
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """
+    Close the shared connection pools, called when the server shuts down.
+    """
+    global _async_client
+    with _client_lock:
+        async_client, _async_client = _async_client, None
+    if async_client is not None:
+        await async_client.aclose()
+
 
 class JinaClient:
-    def crawl(self, url: str, return_format: str = "html") -> str:
+    def _build_headers(self, return_format: str) -> dict[str, str]:
         headers = {
             "Content-Type": "application/json",
             "X-Return-Format": return_format,
@@ -18,6 +54,18 @@ class JinaClient:
             logger.warning(
                 "Jina API key is not set. Provide your own key to access a higher rate limit. See https://jina.ai/reader for more information."
             )
+        return headers
+
+    def crawl(self, url: str, return_format: str = "html") -> str:
+        headers = self._build_headers(return_format)
         data = {"url": url}
         response = requests.post("https://r.jina.ai/", headers=headers, json=data)
         return response.text
+
+    async def acrawl(self, url: str, return_format: str = "html") -> str:
+        headers = self._build_headers(return_format)
+        data = {"url": url}
+        response = await get_async_client().post(
+            "https://r.jina.ai/", headers=headers, json=data
+        )
+        return response.text
@@ -1,5 +1,6 @@
-from .builder import build_graph
+from .builder import build_graph, get_graph
 
 __all__ = [
     "build_graph",
+    "get_graph",
 ]
@@ -1,18 +1,47 @@
+from typing import Callable, Optional, get_args, get_type_hints
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, START
+from langgraph.utils.runnable import RunnableCallable
+
+from src.utils.lazy import lazy_singleton
 
 from .types import State
 from .nodes import (
     supervisor_node,
+    asupervisor_node,
     research_node,
+    aresearch_node,
     code_node,
+    acode_node,
     coordinator_node,
+    acoordinator_node,
     browser_node,
+    abrowser_node,
     reporter_node,
+    areporter_node,
     planner_node,
+    aplanner_node,
+    executor_node,
+    aexecutor_node,
 )
 
 
-def build_graph():
+def _add_node(builder: StateGraph, name: str, func: Callable, afunc: Callable):
+    """添加同时具有同步和异步实现的节点。
+
+    同步调用(invoke/stream)时执行func，异步调用(ainvoke/astream_events)时执行afunc。
+    节点可跳转的目标从func的Command返回类型注解中获取，用于绘制工作流图。
+    """
+    destinations = get_args(get_args(get_type_hints(func)["return"])[0])
+    builder.add_node(
+        name,
+        RunnableCallable(func, afunc, name=name, trace=False),
+        destinations=destinations,
+    )
+
+
+def build_graph(checkpointer: Optional[BaseCheckpointSaver] = None):
     """构建并返回代理工作流图。
 
     LangGraph工作流程结构:
@@ -23,6 +52,16 @@ def build_graph():
     5. 每个专家代理完成任务后返回给supervisor监督者
     6. 监督者根据情况可能结束工作流或分配新任务
 
+    每个节点都注册了同步和异步两种实现，graph.astream_events等异步调用
+    会在事件循环中直接执行异步实现，不占用线程池中的工作线程。
+
+    并行执行模式(parallel_execution)下，规划者将计划交给executor执行器，
+    执行器将互不依赖的步骤同时分派给多个专家代理，代理完成后返回给执行器，
+    所有步骤执行完毕后结束工作流。
+
+    参数:
+        checkpointer: 可选的检查点存储，用于持久化工作流状态以便之后恢复
+
     返回:
         编译好的LangGraph工作流图
     """
@@ -35,25 +74,34 @@ def build_graph():
     # 添加各类节点:
 
     # 1. 协调者节点 - 与用户交互并决定是否需要规划
-    builder.add_node("coordinator", coordinator_node)
+    _add_node(builder, "coordinator", coordinator_node, acoordinator_node)
 
     # 2. 规划者节点 - 生成完整的任务执行计划
-    builder.add_node("planner", planner_node)
+    _add_node(builder, "planner", planner_node, aplanner_node)
 
     # 3. 监督者节点 - 中央控制器，根据情况分配任务给不同代理
-    builder.add_node("supervisor", supervisor_node)
+    _add_node(builder, "supervisor", supervisor_node, asupervisor_node)
 
     # 4. 研究者节点 - 执行信息搜索和研究任务
-    builder.add_node("researcher", research_node)
+    _add_node(builder, "researcher", research_node, aresearch_node)
 
     # 5. 编码者节点 - 执行代码相关任务
-    builder.add_node("coder", code_node)
+    _add_node(builder, "coder", code_node, acode_node)
 
     # 6. 浏览器节点 - 执行网页浏览和交互任务
-    builder.add_node("browser", browser_node)
+    _add_node(builder, "browser", browser_node, abrowser_node)
 
     # 7. 报告者节点 - 生成最终报告和结论
-    builder.add_node("reporter", reporter_node)
+    _add_node(builder, "reporter", reporter_node, areporter_node)
+
+    # 8. 执行器节点 - 并行执行模式下并发调度互不依赖的计划步骤
+    _add_node(builder, "executor", executor_node, aexecutor_node)
 
     # 编译图并返回可执行的工作流
-    return builder.compile()
+    return builder.compile(checkpointer=checkpointer)
+
+
+@lazy_singleton
+def get_graph():
+    """获取共享的工作流图(不带检查点)，首次调用时构建，之后复用同一个实例。"""
+    return build_graph()
@@ -0,0 +1,234 @@
+import importlib
+import logging
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from src.config import COORDINATOR_CLASSIFIER
+
+logger = logging.getLogger(__name__)
+
+# 预分类器的决策：
+# reply: 直接使用模板回复，不调用LLM
+# handoff: 直接移交给planner，不调用LLM
+# llm: 无法确定，交给协调者LLM处理
+Decision = Literal["reply", "handoff", "llm"]
+
+
+@dataclass
+class Classification:
+    """预分类器对一条用户请求的分类结果。
+
+    Attributes:
+        decision: 分类决策
+        confidence: 决策的置信度(0~1)，decision为llm时为移交给planner的置信度
+        reply: decision为reply时的回复内容
+        reason: 决策依据，用于日志和统计
+    """
+
+    decision: Decision
+    confidence: float
+    reply: Optional[str] = None
+    reason: str = ""
+
+
+class CoordinatorClassifier(ABC):
+    """协调者预分类器的基类。
+
+    在协调者调用LLM之前对用户请求进行本地分类：简单的问候、闲聊直接用模板回复，
+    明显的研究任务直接移交给planner，其余情况交给协调者LLM处理。
+    自定义分类器(例如训练好的小模型)继承此类并实现classify方法，
+    通过COORDINATOR_CLASSIFIER环境变量以"模块:类名"的形式配置。
+    """
+
+    @abstractmethod
+    def classify(self, text: str) -> Classification:
+        """对一条用户请求分类。"""
+
+
+def _contains_cjk(text: str) -> bool:
+    return re.search(r"[一-鿿]", text) is not None
+
+
+def _keyword_pattern(keyword: str, whole_word: bool = True) -> re.Pattern:
+    """
+    关键词的匹配模式。
+
+    拉丁文关键词按单词边界匹配，避免"search"匹配"research"、"list"匹配"journalist"；
+    whole_word为False时只要求词首在单词边界上，以匹配复数等变形。
+    中文没有单词边界，按子串匹配。
+    """
+    if _contains_cjk(keyword):
+        return re.compile(re.escape(keyword))
+    return re.compile(rf"\b{re.escape(keyword)}" + (r"\b" if whole_word else ""))
+
+
+class KeywordClassifier(CoordinatorClassifier):
+    """基于规则和关键词打分的预分类器，只使用CPU，无需加载模型。"""
+
+    # 完整匹配整条消息的问候、闲聊规则：(名称, 正则, 英文回复, 中文回复)
+    REPLY_RULES = [
+        (
+            "greeting",
+            r"(hi|hello|hey|hiya|good (morning|afternoon|evening)|你好|您好|嗨|哈喽|早上好|下午好|晚上好)",
+            "Hello! I'm Langmanus. How can I help you today?",
+            "你好！我是Langmanus，有什么可以帮你的吗？",
+        ),
+        (
+            "thanks",
+            r"(thanks|thank you|thx|thanks a lot|谢谢|谢谢你|多谢|感谢)",
+            "You're welcome! Let me know if there is anything else I can help with.",
+            "不客气！如果还有其他需要帮忙的，随时告诉我。",
+        ),
+        (
+            "identity",
+            r"(who are you|what are you|what'?s your name|你是谁|你叫什么(名字)?)",
+            "I'm Langmanus, an AI assistant that can research, browse the web, "
+            "write code and produce reports for you. What would you like to do?",
+            "我是Langmanus，一个可以为你调研、浏览网页、编写代码并撰写报告的AI助手。"
+            "需要我做些什么？",
+        ),
+        (
+            "farewell",
+            r"(bye|goodbye|see you|再见|拜拜)",
+            "Goodbye! Feel free to come back any time.",
+            "再见！有需要随时来找我。",
+        ),
+    ]
+    # 规则之外允许出现在消息中的称呼和标点
+    REPLY_SUFFIX = r"(\s*(there|langmanus))?[\s!！.。~～?？,，]*"
+
+    # 研究任务关键词，每命中一个提高置信度
+    TASK_KEYWORDS = [
+        "research", "analyze", "analyse", "analysis", "compare", "comparison",
+        "investigate", "summarize", "summarise", "report", "find", "search",
+        "calculate", "implement", "write a", "list", "latest", "trend",
+        "market", "paper", "how does", "how do", "what are the", "pros and cons",
+        "调研", "研究", "分析", "比较", "对比", "总结", "报告", "搜索", "查找",
+        "查询", "计算", "编写", "写一", "代码", "实现", "列出", "最新", "趋势",
+        "市场", "论文", "优缺点", "介绍一下",
+    ]  # fmt: skip
+    # 可能涉及提示泄露或有害内容的关键词，交给协调者LLM判断是否拒绝
+    RISK_KEYWORDS = [
+        "system prompt", "your prompt", "your instructions", "ignore previous",
+        "ignore all", "jailbreak", "提示词", "系统提示", "忽略之前", "忽略以上",
+        "synthesize", "synthesis of", "methamphetamine", "cocaine",
+        "heroin", "fentanyl", "drug", "explosive", "bomb", "weapon", "firearm",
+        "poison", "nerve agent", "bioweapon", "malware", "ransomware", "exploit",
+        "keylogger", "ddos", "phishing", "hack into", "steal", "credit card",
+        "kill", "suicide", "self-harm", "terror", "child",
+        "合成", "毒品", "冰毒", "制毒", "炸药", "炸弹", "爆炸物", "武器", "枪支",
+        "毒药", "病毒", "木马", "勒索", "攻击", "黑客", "入侵", "钓鱼", "盗取",
+        "窃取", "自杀", "自残", "杀人", "恐怖", "儿童",
+    ]  # fmt: skip
+
+    def __init__(self, handoff_threshold: float = 0.8):
+        self.handoff_threshold = handoff_threshold
+        self._task_patterns = [
+            (keyword, _keyword_pattern(keyword)) for keyword in self.TASK_KEYWORDS
+        ]
+        # 风险关键词宁可多匹配，允许变形
+        self._risk_patterns = [
+            _keyword_pattern(keyword, whole_word=False)
+            for keyword in self.RISK_KEYWORDS
+        ]
+        self._reply_patterns = [
+            (name, re.compile(rf"^\s*{pattern}{self.REPLY_SUFFIX}$", re.I), en, zh)
+            for name, pattern, en, zh in self.REPLY_RULES
+        ]
+
+    def classify(self, text: str) -> Classification:
+        lowered = text.lower()
+        if any(pattern.search(lowered) for pattern in self._risk_patterns):
+            return Classification("llm", 1.0, reason="risk")
+
+        for name, pattern, en_reply, zh_reply in self._reply_patterns:
+            if pattern.match(text):
+                reply = zh_reply if _contains_cjk(text) else en_reply
+                return Classification("reply", 0.95, reply=reply, reason=name)
+
+        hits = [
+            keyword
+            for keyword, pattern in self._task_patterns
+            if pattern.search(lowered)
+        ]
+        # 以百分点计分，避免浮点数累加的误差(0.3+0.2*2+0.1 < 0.8)
+        # 长请求和包含链接的请求更可能是需要规划的任务
+        score = 30 + 20 * min(len(hits), 3)
+        if len(text) >= (20 if _contains_cjk(text) else 60):
+            score += 10
+        if "http://" in lowered or "https://" in lowered:
+            score += 10
+        score = min(score, 95)
+        confidence = score / 100
+        if hits and score >= round(self.handoff_threshold * 100):
+            return Classification(
+                "handoff", confidence, reason="keywords: " + ", ".join(hits)
+            )
+        return Classification("llm", confidence, reason="below handoff threshold")
+
+
+class ClassifierStats:
+    """统计预分类器的决策，用于衡量节省了多少次协调者LLM调用。"""
+
+    def __init__(self):
+        self.decisions = Counter()
+
+    def record(self, classification: Classification) -> None:
+        self.decisions[classification.decision] += 1
+
+    def summary(self) -> dict:
+        total = sum(self.decisions.values())
+        saved = self.decisions["reply"] + self.decisions["handoff"]
+        return {
+            "total": total,
+            "decisions": dict(self.decisions),
+            "llm_calls_saved": saved,
+            "saved_ratio": saved / total if total else 0.0,
+        }
+
+
+classifier_stats = ClassifierStats()
+
+_classifier: Optional[CoordinatorClassifier] = None
+
+
+def _load_classifier(spec: str) -> Optional[CoordinatorClassifier]:
+    """根据配置加载预分类器：keyword、none或"模块:类名"。"""
+    if spec in ("", "none"):
+        return None
+    if spec == "keyword":
+        return KeywordClassifier()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def get_coordinator_classifier() -> Optional[CoordinatorClassifier]:
+    """获取配置的协调者预分类器，未启用时返回None。"""
+    global _classifier
+    if _classifier is None:
+        _classifier = _load_classifier(COORDINATOR_CLASSIFIER)
+    return _classifier
+
+
+def classify_request(text) -> Optional[Classification]:
+    """使用预分类器对用户请求分类并记录决策。
+
+    Args:
+        text: 用户最后一条消息的内容，非文本(例如包含图片)的消息不分类
+
+    Returns:
+        分类结果；未启用预分类器或消息不是文本时返回None
+    """
+    classifier = get_coordinator_classifier()
+    if classifier is None or not isinstance(text, str):
+        return None
+    classification = classifier.classify(text)
+    classifier_stats.record(classification)
+    logger.info(
+        f"Coordinator classifier decision: {classification.decision} "
+        f"(confidence {classification.confidence:.2f}, {classification.reason})"
+    )
+    return classification
@@ -2,22 +2,39 @@ import logging
 import json
 import json_repair
 import logging
-from copy import deepcopy
-from typing import Literal
+from contextlib import aclosing, closing
+from typing import Literal, Optional, Sequence
 from langchain_core.messages import HumanMessage, BaseMessage
 
 import json_repair
 from langchain_core.messages import HumanMessage
-from langgraph.types import Command
+from langchain_core.output_parsers import JsonOutputParser
+from langgraph.types import Command, Send
 
-from src.agents import research_agent, coder_agent, browser_agent
+from src.agents import get_research_agent, get_coder_agent, get_browser_agent
+from src.llms.cache import cache_response
 from src.llms.llm import get_llm_by_type
+from src.llms.replay import ReplayChatModel
 from src.config import TEAM_MEMBERS
 from src.config.agents import AGENT_LLM_MAP
 from src.prompts.template import apply_prompt_template
 from src.tools.search import tavily_tool
-from src.utils.json_utils import repair_json_output
-from .types import State, Router
+from src.utils.json_utils import JSONFieldScanner, repair_json_output
+from src.utils.message_view import MessageView, with_content
+from .plan_cache import get_plan_cache_key, get_cached_plan, cache_plan
+from .classifier import Classification, classify_request
+from .speculation import (
+    start_speculative_search,
+    discard_speculative_search,
+    take_speculative_search,
+)
+from .plan import (
+    parse_plan_steps,
+    get_next_wave,
+    get_planned_next,
+    format_step_task,
+)
+from .types import State, Router, OPTIONS
 
 # 设置日志记录器
 logger = logging.getLogger(__name__)
@@ -26,40 +43,72 @@ logger = logging.getLogger(__name__)
 # {}: 第一个占位符用于代理名称，第二个占位符用于代理的响应内容
 RESPONSE_FORMAT = "Response from {}:\n\n<response>\n{}\n</response>\n\n*Please execute the next step.*"
 
+# 每个节点都提供同步实现(xxx_node)和异步实现(axxx_node)：
+# - 同步实现用于graph.invoke等同步调用(例如命令行工作流)
+# - 异步实现用于graph.astream_events等异步调用(例如API服务)，
+#   在事件循环中直接等待LLM和工具调用，不占用工作线程
 
-def research_node(state: State) -> Command[Literal["supervisor"]]:
-    """研究代理节点，负责执行研究任务。
 
-    这个节点会调用research_agent来处理当前状态，并将结果格式化后返回给监督者节点。
+def _get_agent_return_node(state: State) -> str:
+    """代理完成任务后返回的节点：并行执行模式下返回executor，否则返回supervisor。"""
+    return "executor" if state.get("parallel_execution") else "supervisor"
+
+
+def _agent_command(state: State, agent_name: str, result: dict) -> Command:
+    """将专家代理的执行结果格式化为返回的Command对象。
 
     Args:
-        state: 当前工作流状态，包含消息历史等信息
+        state: 当前工作流状态
+        agent_name: 代理名称
+        result: 代理的执行结果，包含消息历史
 
     Returns:
-        Command对象，包含更新指令和下一步去向（固定返回supervisor节点）
+        Command对象，包含代理的响应消息和下一步去向
     """
-    logger.info("Research agent starting task")
-    # 调用研究代理处理当前状态
-    result = research_agent.invoke(state)
-    logger.info("Research agent completed task")
     response_content = result["messages"][-1].content
     # 尝试修复可能的JSON输出
     response_content = repair_json_output(response_content)
-    logger.debug(f"Research agent response: {response_content}")
+    logger.debug(f"{agent_name} agent response: {response_content}")
     return Command(
         update={
             "messages": [
                 HumanMessage(
                     content=response_content,
-                    name="researcher",
+                    name=agent_name,
                 )
             ]
         },
-        goto="supervisor",
+        goto=_get_agent_return_node(state),
     )
 
 
-def code_node(state: State) -> Command[Literal["supervisor"]]:
+def research_node(state: State) -> Command[Literal["supervisor", "executor"]]:
+    """研究代理节点，负责执行研究任务。
+
+    这个节点会调用research_agent来处理当前状态，并将结果格式化后返回给监督者节点。
+
+    Args:
+        state: 当前工作流状态，包含消息历史等信息
+
+    Returns:
+        Command对象，包含更新指令和下一步去向（supervisor节点，并行执行模式下为executor节点）
+    """
+    logger.info("Research agent starting task")
+    # 调用研究代理处理当前状态
+    result = get_research_agent().invoke(state)
+    logger.info("Research agent completed task")
+    return _agent_command(state, "researcher", result)
+
+
+async def aresearch_node(state: State) -> Command[Literal["supervisor", "executor"]]:
+    """研究代理节点的异步实现。"""
+    logger.info("Research agent starting task")
+    result = await get_research_agent().ainvoke(state)
+    logger.info("Research agent completed task")
+    return _agent_command(state, "researcher", result)
+
+
+def code_node(state: State) -> Command[Literal["supervisor", "executor"]]:
     """编程代理节点，负责执行Python代码相关任务。
 
     这个节点调用coder_agent来处理当前状态，执行代码写作、调试等任务，
@@ -69,30 +118,24 @@ def code_node(state: State) -> Command[Literal["supervisor"]]:
         state: 当前工作流状态，包含消息历史等信息
 
     Returns:
-        Command对象，包含更新指令和下一步去向（固定返回supervisor节点）
+        Command对象，包含更新指令和下一步去向（supervisor节点，并行执行模式下为executor节点）
     """
     logger.info("Code agent starting task")
     # 调用编程代理处理当前状态
-    result = coder_agent.invoke(state)
+    result = get_coder_agent().invoke(state)
     logger.info("Code agent completed task")
-    response_content = result["messages"][-1].content
-    # 尝试修复可能的JSON输出
-    response_content = repair_json_output(response_content)
-    logger.debug(f"Code agent response: {response_content}")
-    return Command(
-        update={
-            "messages": [
-                HumanMessage(
-                    content=response_content,
-                    name="coder",
-                )
-            ]
-        },
-        goto="supervisor",
-    )
+    return _agent_command(state, "coder", result)
+
+
+async def acode_node(state: State) -> Command[Literal["supervisor", "executor"]]:
+    """编程代理节点的异步实现。"""
+    logger.info("Code agent starting task")
+    result = await get_coder_agent().ainvoke(state)
+    logger.info("Code agent completed task")
+    return _agent_command(state, "coder", result)
 
 
-def browser_node(state: State) -> Command[Literal["supervisor"]]:
+def browser_node(state: State) -> Command[Literal["supervisor", "executor"]]:
     """浏览器代理节点，负责执行网页浏览和交互任务。
 
     这个节点调用browser_agent来处理当前状态，执行网页访问、信息抓取等任务，
@@ -102,58 +145,151 @@ def browser_node(state: State) -> Command[Literal["supervisor"]]:
         state: 当前工作流状态，包含消息历史等信息
 
     Returns:
-        Command对象，包含更新指令和下一步去向（固定返回supervisor节点）
+        Command对象，包含更新指令和下一步去向（supervisor节点，并行执行模式下为executor节点）
     """
     logger.info("Browser agent starting task")
     # 调用浏览器代理处理当前状态
-    result = browser_agent.invoke(state)
+    result = get_browser_agent().invoke(state)
     logger.info("Browser agent completed task")
-    response_content = result["messages"][-1].content
-    # 尝试修复可能的JSON输出
-    response_content = repair_json_output(response_content)
-    logger.debug(f"Browser agent response: {response_content}")
-    return Command(
-        update={
-            "messages": [
-                HumanMessage(
-                    content=response_content,
-                    name="browser",
-                )
-            ]
-        },
-        goto="supervisor",
+    return _agent_command(state, "browser", result)
+
+
+async def abrowser_node(state: State) -> Command[Literal["supervisor", "executor"]]:
+    """浏览器代理节点的异步实现。"""
+    logger.info("Browser agent starting task")
+    result = await get_browser_agent().ainvoke(state)
+    logger.info("Browser agent completed task")
+    return _agent_command(state, "browser", result)
+
+
+def _build_supervisor_messages(state: State) -> Sequence:
+    """构造LLM监督者的输入消息。"""
+    # 应用监督者提示模板
+    messages = apply_prompt_template("supervisor", state)
+
+    # preprocess messages to make supervisor execute better.
+    # 通过消息视图在读取时包装团队成员的输出，无需深复制整个消息历史
+    def format_response(index: int, message):
+        if isinstance(message, BaseMessage) and message.name in TEAM_MEMBERS:
+            return with_content(
+                message, RESPONSE_FORMAT.format(message.name, message.content)
+            )
+        return message
+
+    return MessageView(messages, format_response)
+
+
+def _get_supervisor_llm():
+    """获取以JSON模式流式输出Router结构的监督者LLM。"""
+    return get_llm_by_type(AGENT_LLM_MAP["supervisor"]).bind(
+        response_format={"type": "json_object"}
     )
 
 
-def supervisor_node(state: State) -> Command[Literal[*TEAM_MEMBERS, "__end__"]]:
-    """监督者节点，负责决策下一步应该由哪个代理执行。
+def _scan_router_chunk(
+    scanner: JSONFieldScanner, chunk: BaseMessage
+) -> tuple[str, Optional[str]]:
+    """读取监督者流式输出的一个片段。
 
-    这是整个工作流的核心控制器，它会根据当前状态评估并决定下一步行动：
-    - 可能分配任务给团队成员之一(researcher, coder, browser, reporter)
-    - 或者结束整个工作流(FINISH -> __end__)
+    Returns:
+        (片段文本, 提前确定的路由决策)；决策尚未完整或不是有效选项时为None
+    """
+    text = chunk.text()
+    if scanner.value is not None or scanner.failed:
+        return text, None
+    goto = scanner.feed(text)
+    if goto is not None and goto not in OPTIONS:
+        logger.warning(f"Supervisor streamed unknown option {goto!r}, parsing in full")
+        return text, None
+    return text, goto
+
+
+def _parse_router(content: str) -> str:
+    """完整解析监督者的JSON响应，作为提前解析失败时的回退。"""
+    router: Router = JsonOutputParser().parse(content)
+    logger.debug(f"Supervisor response: {router}")
+    return router["next"]
+
+
+def _route_by_llm(state: State) -> str:
+    """流式调用监督者LLM，next字段的值完整后立即停止生成并返回路由决策。"""
+    scanner = JSONFieldScanner("next")
+    content = ""
+    messages = _build_supervisor_messages(state)
+    llm = _get_supervisor_llm()
+    with closing(llm.stream(messages)) as stream:
+        for chunk in stream:
+            text, goto = _scan_router_chunk(scanner, chunk)
+            content += text
+            if goto is not None:
+                # 退出with语句时关闭流，取消剩余的生成；
+                # 未完成的流不会被响应缓存保存，由这里缓存已读取的部分
+                logger.debug(f"Supervisor decided early: {content}")
+                cache_response(llm, messages, content)
+                return goto
+    return _parse_router(content)
+
+
+async def _aroute_by_llm(state: State) -> str:
+    """_route_by_llm的异步实现。"""
+    scanner = JSONFieldScanner("next")
+    content = ""
+    messages = _build_supervisor_messages(state)
+    llm = _get_supervisor_llm()
+    async with aclosing(llm.astream(messages)) as stream:
+        async for chunk in stream:
+            text, goto = _scan_router_chunk(scanner, chunk)
+            content += text
+            if goto is not None:
+                logger.debug(f"Supervisor decided early: {content}")
+                cache_response(llm, messages, content)
+                return goto
+    return _parse_router(content)
+
+
+def _route_by_plan(state: State) -> tuple[Optional[list[dict]], Optional[str]]:
+    """确定性路由模式下根据计划游标确定下一个代理。
+
+    Returns:
+        (计划步骤列表, 下一个代理名称)；未启用确定性路由或无法按计划确定时对应项为None
+    """
+    if not state.get("deterministic_routing"):
+        return None, None
+    steps = parse_plan_steps(state.get("full_plan"))
+    if steps is None:
+        return None, None
+    cursor = state.get("plan_cursor", 0)
+    return steps, get_planned_next(steps, cursor, state["messages"][-1])
+
+
+def _supervisor_command(
+    state: State, steps: Optional[list[dict]], goto: str, routed_by_plan: bool
+) -> Command:
+    """根据路由决策生成监督者的Command对象，并同步计划游标。
 
     Args:
-        state: 当前工作流状态，包含消息历史等信息
+        state: 当前工作流状态
+        steps: 确定性路由模式下的计划步骤列表，未启用时为None
+        goto: 下一个代理名称，或"FINISH"表示完成
+        routed_by_plan: 决策是否直接来自计划(而非LLM)
 
     Returns:
         Command对象，指示下一步转到哪个节点，以及状态更新
     """
-    logger.info("Supervisor evaluating next action")
-    # 应用监督者提示模板
-    messages = apply_prompt_template("supervisor", state)
-    # preprocess messages to make supervisor execute better.
-    messages = deepcopy(messages)
-    for message in messages:
-        if isinstance(message, BaseMessage) and message.name in TEAM_MEMBERS:
-            message.content = RESPONSE_FORMAT.format(message.name, message.content)
-    response = (
-        get_llm_by_type(AGENT_LLM_MAP["supervisor"])
-        .with_structured_output(schema=Router, method="json_mode")
-        .invoke(messages)
-    )
-    goto = response["next"]
-    logger.debug(f"Current state messages: {state['messages']}")
-    logger.debug(f"Supervisor response: {response}")
+    cursor = state.get("plan_cursor", 0)
+    update = {}
+    if routed_by_plan:
+        logger.info("Supervisor routing by plan")
+        update["plan_cursor"] = cursor + 1
+    elif steps is not None:
+        # LLM回退决策后同步计划游标，偏离计划时退出确定性路由
+        if cursor < len(steps) and goto == steps[cursor]["agent_name"]:
+            update["plan_cursor"] = cursor + 1
+        elif goto != "FINISH" and not (
+            cursor > 0 and goto == steps[cursor - 1]["agent_name"]
+        ):
+            logger.info("Supervisor deviated from plan, disabling plan routing")
+            update["deterministic_routing"] = False
 
     # 处理特殊的"FINISH"指令，转换为langgraph的结束标记"__end__"
     if goto == "FINISH":
@@ -163,47 +299,157 @@ def supervisor_node(state: State) -> Command[Literal[*TEAM_MEMBERS, "__end__"]]:
         logger.info(f"Supervisor delegating to: {goto}")
 
     # 创建Command对象，更新状态中的next字段并指示下一个节点
-    return Command(goto=goto, update={"next": goto})
+    return Command(goto=goto, update={"next": goto, **update})
 
 
-def planner_node(state: State) -> Command[Literal["supervisor", "__end__"]]:
-    """计划者节点，负责生成完整的执行计划。
+def supervisor_node(state: State) -> Command[Literal[*TEAM_MEMBERS, "__end__"]]:
+    """监督者节点，负责决策下一步应该由哪个代理执行。
 
-    这个节点生成整个任务的详细执行计划，支持以下高级功能：
-    - 深度思考模式：使用更强大的推理型LLM
-    - 搜索辅助计划：在规划前执行网络搜索以获取更多信息
+    这是整个工作流的核心控制器，它会根据当前状态评估并决定下一步行动：
+    - 可能分配任务给团队成员之一(researcher, coder, browser, reporter)
+    - 或者结束整个工作流(FINISH -> __end__)
+
+    确定性路由模式(deterministic_routing)下，监督者根据计划游标直接推进到
+    计划中的下一个代理，只有在上一步失败或输出不明确时才调用LLM决策。
 
     Args:
         state: 当前工作流状态，包含消息历史等信息
 
     Returns:
-        Command对象，包含计划更新和下一步指示(通常是supervisor，失败则直接结束)
+        Command对象，指示下一步转到哪个节点，以及状态更新
     """
-    logger.info("Planner generating full plan")
-    # 应用计划者提示模板
-    messages = apply_prompt_template("planner", state)
+    logger.info("Supervisor evaluating next action")
+    # 确定性路由模式下，计划已经给出下一个代理时直接按计划推进，无需调用LLM
+    steps, goto = _route_by_plan(state)
+    if goto is not None:
+        return _supervisor_command(state, steps, goto, routed_by_plan=True)
+
+    logger.debug(f"Current state messages: {state['messages']}")
+    goto = _route_by_llm(state)
+    return _supervisor_command(state, steps, goto, routed_by_plan=False)
+
+
+async def asupervisor_node(
+    state: State,
+) -> Command[Literal[*TEAM_MEMBERS, "__end__"]]:
+    """监督者节点的异步实现。"""
+    logger.info("Supervisor evaluating next action")
+    steps, goto = _route_by_plan(state)
+    if goto is not None:
+        return _supervisor_command(state, steps, goto, routed_by_plan=True)
+
+    logger.debug(f"Current state messages: {state['messages']}")
+    goto = await _aroute_by_llm(state)
+    return _supervisor_command(state, steps, goto, routed_by_plan=False)
+
+
+def executor_node(
+    state: State,
+) -> Command[Literal[*TEAM_MEMBERS, "supervisor", "__end__"]]:
+    """执行器节点，负责在并行执行模式下按计划调度代理。
+
+    执行器根据计划推导步骤间的依赖关系，将互不依赖的一批步骤通过Send
+    同时分派给对应的代理。所有代理完成后，它们的输出合并回State中的messages，
+    执行器再调度下一批步骤，直到计划执行完毕。
+
+    Args:
+        state: 当前工作流状态，包含计划和计划游标
 
-    # 根据状态选择不同的LLM
-    llm = get_llm_by_type("basic")
+    Returns:
+        Command对象，包含并发分派的代理任务；计划无法解析时交还给supervisor
+    """
+    steps = parse_plan_steps(state.get("full_plan"))
+    if steps is None:
+        # 计划无法解析，回退到由supervisor逐步调度
+        logger.warning("Plan could not be parsed, falling back to supervisor")
+        return Command(goto="supervisor", update={"parallel_execution": False})
+
+    cursor = state.get("plan_cursor", 0)
+    wave = get_next_wave(steps, cursor)
+    if not wave:
+        logger.info("Workflow completed")
+        return Command(goto="__end__", update={"next": "__end__"})
+
+    logger.info(
+        f"Executor dispatching steps {[index + 1 for index in wave]} "
+        f"to {[steps[index]['agent_name'] for index in wave]}"
+    )
+    # 为每个步骤构造独立的输入状态，附加该步骤的任务说明
+    sends = [
+        Send(
+            steps[index]["agent_name"],
+            {
+                **state,
+                "messages": state["messages"]
+                + [
+                    HumanMessage(
+                        content=format_step_task(index, steps[index]),
+                        name="executor",
+                    )
+                ],
+            },
+        )
+        for index in wave
+    ]
+    return Command(
+        goto=sends,
+        update={
+            "next": steps[wave[-1]]["agent_name"],
+            "plan_cursor": cursor + len(wave),
+        },
+    )
+
+
+async def aexecutor_node(
+    state: State,
+) -> Command[Literal[*TEAM_MEMBERS, "supervisor", "__end__"]]:
+    """执行器节点的异步实现，调度过程不涉及I/O，直接复用同步实现。"""
+    return executor_node(state)
+
+
+def _get_planner_llm(state: State):
+    """根据状态选择计划者使用的LLM。"""
     if state.get("deep_thinking_mode"):
         # 如果启用深度思考模式，使用更强大的推理型LLM
-        llm = get_llm_by_type("reasoning")
-
-    # 如果启用了搜索辅助规划，先执行搜索
-    if state.get("search_before_planning"):
-        # 使用Tavily搜索工具基于用户最后一条消息执行搜索
-        searched_content = tavily_tool.invoke({"query": state["messages"][-1].content})
-        messages = deepcopy(messages)
-        # 将搜索结果添加到提示中
-        messages[
-            -1
-        ].content += f"\n\n# Relative Search Results\n\n{json.dumps([{'title': elem['title'], 'content': elem['content']} for elem in searched_content], ensure_ascii=False)}"
+        return get_llm_by_type("reasoning")
+    return get_llm_by_type("basic")
+
+
+# 计划者提示中合并步骤的规则；并行执行模式下独立的researcher步骤保持分开，以便并发执行，
+# 顺序执行时拆分步骤只会增加LLM调用
+STEP_MERGE_RULE = (
+    "Merge consecutive steps assigned to the same agent into a single step."
+)
+PARALLEL_STEP_MERGE_RULE = (
+    "Merge consecutive steps assigned to the same agent into a single step, "
+    "except for `researcher` steps on independent sub-topics, which should stay "
+    "separate so they can be executed in parallel."
+)
+
+
+def _build_planner_messages(state: State, searched_content: Optional[list]) -> list:
+    """构造计划者的输入消息，如果有搜索结果则附加到对话的最后一条消息中。"""
+    search_results = ""
+    if searched_content is not None:
+        search_results = f"\n\n# Relative Search Results\n\n{json.dumps([{'title': elem['title'], 'content': elem['content']} for elem in searched_content], ensure_ascii=False)}"
+    # 应用计划者提示模板，搜索结果附加在CURRENT_TIME消息之前的最后一条消息中
+    merge_rule = (
+        PARALLEL_STEP_MERGE_RULE if state.get("parallel_execution") else STEP_MERGE_RULE
+    )
+    return apply_prompt_template(
+        "planner",
+        {**state, "STEP_MERGE_RULE": merge_rule},
+        extra_context=search_results,
+    )
 
-    # 流式调用LLM以获取响应
-    stream = llm.stream(messages)
-    full_response = ""
-    for chunk in stream:
-        full_response += chunk.content
+
+def _planner_command(
+    state: State, full_response: str, cache_key: Optional[str] = None
+) -> Command:
+    """校验计划者的响应，生成包含计划的Command对象。
+
+    计划有效且给出了cache_key时，将计划写入计划缓存。
+    """
     logger.debug(f"Current state messages: {state['messages']}")
     logger.debug(f"Planner response: {full_response}")
 
@@ -214,8 +460,8 @@ def planner_node(state: State) -> Command[Literal["supervisor", "__end__"]]:
     if full_response.endswith("```"):
         full_response = full_response.removesuffix("```")
 
-    # 默认下一步是supervisor
-    goto = "supervisor"
+    # 默认下一步是supervisor，并行执行模式下交给executor调度
+    goto = "executor" if state.get("parallel_execution") else "supervisor"
     # 验证返回的JSON是否有效
     try:
         repaired_response = json_repair.loads(full_response)
@@ -224,6 +470,8 @@ def planner_node(state: State) -> Command[Literal["supervisor", "__end__"]]:
         # 如果解析失败，记录警告并结束流程
         logger.warning("Planner response is not a valid JSON")
         goto = "__end__"
+    else:
+        cache_plan(cache_key, full_response)
 
     # 创建Command对象，更新消息和计划，并指示下一步
     return Command(
@@ -235,24 +483,85 @@ def planner_node(state: State) -> Command[Literal["supervisor", "__end__"]]:
     )
 
 
-def coordinator_node(state: State) -> Command[Literal["planner", "__end__"]]:
-    """协调者节点，负责与客户交流并决定是否需要规划。
+def planner_node(state: State) -> Command[Literal["supervisor", "executor", "__end__"]]:
+    """计划者节点，负责生成完整的执行计划。
 
-    这个节点是与客户直接交互的接口，它会评估客户的请求并决定：
-    - 直接结束会话
-    - 或者转交给planner节点进行任务规划
+    这个节点生成整个任务的详细执行计划，支持以下高级功能：
+    - 深度思考模式：使用更强大的推理型LLM
+    - 搜索辅助计划：在规划前执行网络搜索以获取更多信息
+    - 计划缓存：相同请求和运行模式下直接复用之前生成的计划
 
     Args:
         state: 当前工作流状态，包含消息历史等信息
 
     Returns:
-        Command对象，指示下一步(planner或__end__)
+        Command对象，包含计划更新和下一步指示(通常是supervisor，并行执行模式下为executor，失败则直接结束)
+    """
+    logger.info("Planner generating full plan")
+    cache_key = get_plan_cache_key(state)
+    cached_plan = get_cached_plan(cache_key)
+    searched_content = None
+    if cached_plan is not None:
+        # 命中计划缓存时无需搜索和调用LLM，以流式方式输出缓存的计划，
+        # 客户端收到的事件与生成计划时相同
+        llm = ReplayChatModel(content=cached_plan)
+        cache_key = None
+    else:
+        llm = _get_planner_llm(state)
+        # 如果启用了搜索辅助规划，先执行搜索
+        if state.get("search_before_planning"):
+            # 使用Tavily搜索工具基于用户最后一条消息执行搜索
+            searched_content = tavily_tool.invoke(
+                {"query": state["messages"][-1].content}
+            )
+    messages = _build_planner_messages(state, searched_content)
+
+    # 流式调用LLM以获取响应
+    stream = llm.stream(messages)
+    full_response = ""
+    for chunk in stream:
+        full_response += chunk.content
+    return _planner_command(state, full_response, cache_key)
+
+
+async def aplanner_node(
+    state: State,
+) -> Command[Literal["supervisor", "executor", "__end__"]]:
+    """计划者节点的异步实现。"""
+    logger.info("Planner generating full plan")
+    cache_key = get_plan_cache_key(state)
+    cached_plan = get_cached_plan(cache_key)
+    searched_content = None
+    if cached_plan is not None:
+        llm = ReplayChatModel(content=cached_plan)
+        cache_key = None
+        discard_speculative_search(state.get("speculative_search_id"))
+    else:
+        llm = _get_planner_llm(state)
+        if state.get("search_before_planning"):
+            # 优先使用协调者决策时提前开始的推测性搜索结果
+            searched_content = await take_speculative_search(
+                state.get("speculative_search_id")
+            )
+            if searched_content is None:
+                searched_content = await tavily_tool.ainvoke(
+                    {"query": state["messages"][-1].content}
+                )
+    messages = _build_planner_messages(state, searched_content)
+
+    full_response = ""
+    async for chunk in llm.astream(messages):
+        full_response += chunk.content
+    return _planner_command(state, full_response, cache_key)
+
+
+def _coordinator_command(
+    state: State, response: BaseMessage, speculative_search_id: Optional[str] = None
+) -> Command:
+    """根据协调者的响应决定是否移交给planner。
+
+    如果已经开始了推测性搜索，移交给planner时将搜索ID交给planner，否则丢弃搜索。
     """
-    logger.info("Coordinator talking.")
-    # 应用协调者提示模板
-    messages = apply_prompt_template("coordinator", state)
-    # 调用LLM获取响应
-    response = get_llm_by_type(AGENT_LLM_MAP["coordinator"]).invoke(messages)
     logger.debug(f"Current state messages: {state['messages']}")
     response_content = response.content
     # 尝试修复可能的JSON输出
@@ -269,35 +578,94 @@ def coordinator_node(state: State) -> Command[Literal["planner", "__end__"]]:
     # 更新response.content为修复后的内容
     response.content = response_content
 
+    update = {}
+    if speculative_search_id is not None:
+        if goto == "planner":
+            update["speculative_search_id"] = speculative_search_id
+        else:
+            discard_speculative_search(speculative_search_id)
+
     return Command(
         goto=goto,
+        update=update,
     )
 
 
-def reporter_node(state: State) -> Command[Literal["supervisor"]]:
-    """报告者节点，负责生成最终报告。
+# 预分类器直接移交给planner时使用的响应，与协调者LLM的移交指令一致
+HANDOFF_RESPONSE = "handoff_to_planner()"
 
-    这个节点会整合之前所有工作的结果，生成一份结构化的最终报告，
-    并将结果返回给监督者节点进行下一步决策。
+
+def _get_coordinator_llm(classification: Optional[Classification]):
+    """根据预分类器的结果获取协调者使用的LLM。
+
+    预分类器能够确定回复或移交时，返回直接输出该结果的ReplayChatModel，
+    使其与LLM生成的响应一样流式输出给客户端，从而省去一次LLM调用；
+    否则返回协调者LLM。
+    """
+    if classification is not None:
+        if classification.decision == "reply":
+            return ReplayChatModel(content=classification.reply)
+        if classification.decision == "handoff":
+            return ReplayChatModel(content=HANDOFF_RESPONSE)
+    return get_llm_by_type(AGENT_LLM_MAP["coordinator"])
+
+
+def coordinator_node(state: State) -> Command[Literal["planner", "__end__"]]:
+    """协调者节点，负责与客户交流并决定是否需要规划。
+
+    这个节点是与客户直接交互的接口，它会评估客户的请求并决定：
+    - 直接结束会话
+    - 或者转交给planner节点进行任务规划
 
     Args:
         state: 当前工作流状态，包含消息历史等信息
 
     Returns:
-        Command对象，包含报告更新和下一步去向(固定返回supervisor)
+        Command对象，指示下一步(planner或__end__)
     """
-    logger.info("Reporter write final report")
-    # 应用报告者提示模板
-    messages = apply_prompt_template("reporter", state)
+    logger.info("Coordinator talking.")
+    # 先由本地预分类器处理问候、闲聊和明显的研究任务
+    classification = classify_request(state["messages"][-1].content)
+    # 应用协调者提示模板
+    messages = apply_prompt_template("coordinator", state)
     # 调用LLM获取响应
-    response = get_llm_by_type(AGENT_LLM_MAP["reporter"]).invoke(messages)
+    response = _get_coordinator_llm(classification).invoke(messages)
+    return _coordinator_command(state, response)
+
+
+async def acoordinator_node(state: State) -> Command[Literal["planner", "__end__"]]:
+    """协调者节点的异步实现。
+
+    启用推测性搜索时，在协调者调用LLM的同时开始规划前搜索，
+    移交给planner后planner可以直接使用搜索结果。
+    """
+    logger.info("Coordinator talking.")
+    classification = classify_request(state["messages"][-1].content)
+    speculative_search_id = None
+    if (
+        state.get("search_before_planning")
+        and state.get("speculative_search")
+        and (classification is None or classification.decision != "reply")
+    ):
+        speculative_search_id = start_speculative_search(state["messages"][-1].content)
+    messages = apply_prompt_template("coordinator", state)
+    try:
+        response = await _get_coordinator_llm(classification).ainvoke(messages)
+    except BaseException:
+        discard_speculative_search(speculative_search_id)
+        raise
+    return _coordinator_command(state, response, speculative_search_id)
+
+
+def _reporter_command(state: State, response: BaseMessage) -> Command:
+    """将报告者的响应格式化为返回的Command对象。"""
     logger.debug(f"Current state messages: {state['messages']}")
     response_content = response.content
     # 尝试修复可能的JSON输出
     response_content = repair_json_output(response_content)
     logger.debug(f"reporter response: {response_content}")
 
-    # 创建Command对象，更新消息并指示下一步转到supervisor节点
+    # 创建Command对象，更新消息并指示下一步
     return Command(
         update={
             "messages": [
@@ -307,5 +675,33 @@ def reporter_node(state: State) -> Command[Literal["supervisor"]]:
                 )
             ]
         },
-        goto="supervisor",
+        goto=_get_agent_return_node(state),
     )
+
+
+def reporter_node(state: State) -> Command[Literal["supervisor", "executor"]]:
+    """报告者节点，负责生成最终报告。
+
+    这个节点会整合之前所有工作的结果，生成一份结构化的最终报告，
+    并将结果返回给监督者节点进行下一步决策。
+
+    Args:
+        state: 当前工作流状态，包含消息历史等信息
+
+    Returns:
+        Command对象，包含报告更新和下一步去向(supervisor，并行执行模式下为executor)
+    """
+    logger.info("Reporter write final report")
+    # 应用报告者提示模板
+    messages = apply_prompt_template("reporter", state)
+    # 调用LLM获取响应
+    response = get_llm_by_type(AGENT_LLM_MAP["reporter"]).invoke(messages)
+    return _reporter_command(state, response)
+
+
+async def areporter_node(state: State) -> Command[Literal["supervisor", "executor"]]:
+    """报告者节点的异步实现。"""
+    logger.info("Reporter write final report")
+    messages = apply_prompt_template("reporter", state)
+    response = await get_llm_by_type(AGENT_LLM_MAP["reporter"]).ainvoke(messages)
+    return _reporter_command(state, response)
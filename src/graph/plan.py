@@ -0,0 +1,137 @@
+import logging
+from typing import Optional
+
+import json_repair
+from langchain_core.messages import BaseMessage
+
+from src.config import TEAM_MEMBERS
+
+logger = logging.getLogger(__name__)
+
+# 可以并行执行的代理：它们只依赖计划开始前的上下文，彼此之间互不依赖
+# - researcher: 各自调研独立的子主题
+# - browser: 各自完成独立的网页交互任务
+PARALLELIZABLE_AGENTS = ["researcher", "browser"]
+
+# 代理输出中表示执行失败的标记，出现时不再按计划直接推进
+FAILURE_MARKERS = [
+    "Failed to",
+    "Error executing",
+    "Command failed with exit code",
+]
+
+
+def parse_plan_steps(full_plan: Optional[str]) -> Optional[list[dict]]:
+    """解析planner生成的计划，返回步骤列表。
+
+    Args:
+        full_plan: planner生成的完整计划(JSON格式)
+
+    Returns:
+        步骤列表；如果计划无法解析或包含未知代理则返回None
+    """
+    if not full_plan:
+        return None
+    try:
+        plan = json_repair.loads(full_plan)
+    except Exception as e:
+        logger.warning(f"Failed to parse plan: {e}")
+        return None
+    if not isinstance(plan, dict) or not isinstance(plan.get("steps"), list):
+        return None
+
+    steps = plan["steps"]
+    for step in steps:
+        if not isinstance(step, dict) or step.get("agent_name") not in TEAM_MEMBERS:
+            logger.warning(f"Plan contains an invalid step: {step}")
+            return None
+    return steps
+
+
+def derive_step_dependencies(steps: list[dict]) -> list[list[int]]:
+    """推导计划步骤之间的依赖关系。
+
+    计划中的步骤没有显式声明依赖，因此按代理类型推导：
+    - researcher/browser 只依赖它之前最近的一个非并行步骤(例如coder)及其依赖
+    - coder/reporter 依赖它之前的所有步骤
+
+    Args:
+        steps: 计划步骤列表
+
+    Returns:
+        每个步骤所依赖的步骤下标列表
+    """
+    dependencies = []
+    barrier = []  # 最近一个非并行步骤及其之前的所有步骤
+    for index, step in enumerate(steps):
+        if step["agent_name"] in PARALLELIZABLE_AGENTS:
+            dependencies.append(list(barrier))
+        else:
+            dependencies.append(list(range(index)))
+            barrier = list(range(index + 1))
+    return dependencies
+
+
+def get_next_wave(steps: list[dict], cursor: int) -> list[int]:
+    """获取从cursor开始可以并发执行的一批步骤。
+
+    一批步骤中的每个步骤都只依赖cursor之前已完成的步骤。
+
+    Args:
+        steps: 计划步骤列表
+        cursor: 第一个尚未执行的步骤下标
+
+    Returns:
+        可以并发执行的步骤下标列表；如果计划已执行完毕则返回空列表
+    """
+    dependencies = derive_step_dependencies(steps)
+    wave = []
+    for index in range(cursor, len(steps)):
+        if any(dep >= cursor for dep in dependencies[index]):
+            break
+        wave.append(index)
+    return wave
+
+
+def format_step_task(index: int, step: dict) -> str:
+    """将计划步骤格式化为分派给代理的任务说明。"""
+    task = (
+        f"Please execute step {index + 1} of the plan: **{step.get('title', '')}**\n\n"
+    )
+    task += step.get("description", "")
+    if step.get("note"):
+        task += f"\n\nNote: {step['note']}"
+    task += (
+        "\n\nOnly work on this step. Other steps of the plan are handled separately."
+    )
+    return task
+
+
+def get_planned_next(
+    steps: list[dict], cursor: int, last_message: BaseMessage
+) -> Optional[str]:
+    """根据计划游标确定下一个应执行的代理，无需调用LLM。
+
+    只有当上一步明确成功完成时才会按计划推进；如果上一步的输出
+    为空、包含失败标记或者不是由计划中的代理给出，则返回None，
+    交由LLM监督者决策。
+
+    Args:
+        steps: 计划步骤列表
+        cursor: 下一个待执行的计划步骤下标
+        last_message: 消息历史中的最后一条消息
+
+    Returns:
+        下一个代理名称，计划执行完毕时返回"FINISH"，无法确定时返回None
+    """
+    expected_name = "planner" if cursor == 0 else steps[cursor - 1]["agent_name"]
+    if last_message.name != expected_name:
+        return None
+    content = last_message.content
+    if not isinstance(content, str) or not content.strip():
+        return None
+    if any(marker in content for marker in FAILURE_MARKERS):
+        return None
+    if cursor >= len(steps):
+        return "FINISH"
+    return steps[cursor]["agent_name"]
@@ -0,0 +1,65 @@
+import logging
+from typing import Optional
+
+from src.config import PLAN_CACHE_TTL, PLAN_CACHE_SIZE, PLAN_CACHE_DB_PATH
+from src.prompts.template import get_compiled_prompt
+from src.utils.cache import TTLCache, make_cache_key, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# 计划缓存，PLAN_CACHE_TTL为0时不启用
+plan_cache: Optional[TTLCache] = (
+    TTLCache("plans", PLAN_CACHE_SIZE, PLAN_CACHE_TTL, PLAN_CACHE_DB_PATH)
+    if PLAN_CACHE_TTL > 0
+    else None
+)
+
+
+def get_plan_cache_key(state) -> Optional[str]:
+    """根据用户最后一条消息、团队成员、运行模式和planner提示词生成计划缓存键。
+
+    键中包含planner提示词的摘要，修改提示词后不再复用按旧提示词生成的计划。
+
+    只缓存单轮请求的计划：多轮对话中的后续消息(例如"好的，开始吧")
+    依赖之前的对话，不能只按最后一条消息复用计划。
+
+    Returns:
+        缓存键；未启用计划缓存、对话有多条用户消息或最后一条消息不是文本时返回None
+    """
+    if plan_cache is None:
+        return None
+    # 代理的输出也是带name的HumanMessage，只统计用户的消息
+    user_turns = [
+        message
+        for message in state["messages"]
+        if message.type == "human" and not message.name
+    ]
+    if len(user_turns) > 1:
+        return None
+    query = state["messages"][-1].content
+    if not isinstance(query, str):
+        return None
+    return make_cache_key(
+        normalize_query(query),
+        state.get("TEAM_MEMBERS"),
+        bool(state.get("deep_thinking_mode")),
+        bool(state.get("search_before_planning")),
+        bool(state.get("parallel_execution")),
+        get_compiled_prompt("planner").digest,
+    )
+
+
+def get_cached_plan(key: Optional[str]) -> Optional[str]:
+    """获取缓存的计划，未命中时返回None。"""
+    if key is None:
+        return None
+    plan = plan_cache.get(key)
+    if plan is not None:
+        logger.info("Plan cache hit")
+    return plan
+
+
+def cache_plan(key: Optional[str], plan: str) -> None:
+    """缓存生成的计划。"""
+    if key is not None:
+        plan_cache.set(key, plan)
@@ -0,0 +1,76 @@
+import asyncio
+import functools
+import logging
+import uuid
+from typing import Optional
+
+from src.tools.search import tavily_tool
+
+logger = logging.getLogger(__name__)
+
+# 推测性搜索结果在没有被planner取走时的保留时间(秒)
+SPECULATIVE_SEARCH_TTL = 300
+
+# 进行中或已完成、但尚未被planner取走的推测性搜索，键为搜索ID
+_speculative_searches: dict[str, asyncio.Task] = {}
+
+
+def start_speculative_search(query: str) -> str:
+    """在协调者决策的同时，提前开始规划前搜索。
+
+    搜索任务在后台运行，结果由planner通过take_speculative_search取走；
+    协调者结束会话时通过discard_speculative_search丢弃。
+    超过SPECULATIVE_SEARCH_TTL仍未被取走的结果会被自动清理。
+
+    Args:
+        query: 搜索内容，与planner规划前搜索使用的内容相同
+
+    Returns:
+        搜索ID，用于之后取走或丢弃搜索结果
+    """
+    search_id = str(uuid.uuid4())
+    task = asyncio.create_task(tavily_tool.ainvoke({"query": query}))
+    _speculative_searches[search_id] = task
+    task.add_done_callback(functools.partial(_on_search_done, search_id))
+    logger.info("Speculative planning search started")
+    return search_id
+
+
+def _on_search_done(search_id: str, task: asyncio.Task) -> None:
+    """记录搜索的异常，并在SPECULATIVE_SEARCH_TTL后清理未被取走的结果。
+
+    在这里取出异常，被丢弃或过期的失败搜索也不会在回收时报
+    "Task exception was never retrieved"。
+    """
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Speculative planning search failed: {task.exception()}")
+    asyncio.get_running_loop().call_later(
+        SPECULATIVE_SEARCH_TTL, discard_speculative_search, search_id
+    )
+
+
+def discard_speculative_search(search_id: Optional[str]) -> None:
+    """丢弃推测性搜索，搜索仍在进行时取消它。"""
+    task = _speculative_searches.pop(search_id, None)
+    if task is not None and not task.done():
+        task.cancel()
+        logger.info("Speculative planning search discarded")
+
+
+async def take_speculative_search(search_id: Optional[str]) -> Optional[list]:
+    """取走推测性搜索的结果，必要时等待搜索完成。
+
+    Returns:
+        搜索结果；搜索不存在(例如工作流从检查点恢复)或失败时返回None，
+        此时planner应重新执行搜索
+    """
+    task = _speculative_searches.pop(search_id, None)
+    if task is None:
+        return None
+    try:
+        result = await task
+    except Exception:
+        # 异常已由_on_search_done记录
+        return None
+    logger.info("Using speculative planning search result")
+    return result
@@ -35,6 +35,11 @@ class State(MessagesState):
         full_plan: 由planner生成的完整计划(JSON格式)
         deep_thinking_mode: 是否启用深度思考模式(使用更强大的推理LLM)
         search_before_planning: 是否在规划前执行相关搜索
+        parallel_execution: 是否由executor并发执行计划中互不依赖的步骤
+        plan_cursor: 下一个待执行的计划步骤下标
+        deterministic_routing: 是否由supervisor按计划游标直接路由，仅在失败时调用LLM
+        speculative_search: 是否在协调者决策的同时提前开始规划前搜索(仅异步执行时生效)
+        speculative_search_id: 协调者移交给planner的推测性搜索ID
     """
 
     # 常量
@@ -45,3 +50,8 @@ class State(MessagesState):
     full_plan: str  # 完整计划(JSON格式)
     deep_thinking_mode: bool  # 是否启用深度思考模式
     search_before_planning: bool  # 是否在规划前搜索
+    parallel_execution: bool  # 是否并发执行互不依赖的计划步骤
+    plan_cursor: int  # 下一个待执行的计划步骤下标
+    deterministic_routing: bool  # 是否按计划游标直接路由
+    speculative_search: bool  # 是否提前开始规划前搜索
+    speculative_search_id: str  # 推测性搜索ID
@@ -0,0 +1,262 @@
+import asyncio
+import functools
+import logging
+import operator
+import re
+from typing import Any, AsyncIterator, Iterator, List, Optional, Type
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    message_chunk_to_message,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableBinding
+
+from src.config import (
+    LLM_CACHE_TTL,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_DB_PATH,
+    LLM_CACHE_DB_SIZE,
+)
+from src.llms.replay import iter_message_chunks
+from src.utils.cache import TTLCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Response cache shared by all LLMs, disabled when LLM_CACHE_TTL is 0
+llm_response_cache: Optional[TTLCache] = (
+    TTLCache(
+        "llm_responses",
+        LLM_CACHE_SIZE,
+        LLM_CACHE_TTL,
+        LLM_CACHE_DB_PATH,
+        max_db_size=LLM_CACHE_DB_SIZE,
+    )
+    if LLM_CACHE_TTL > 0
+    else None
+)
+
+# Generation info of responses served from the cache, so that the workflow
+# summary does not count them as model calls
+CACHE_HIT_INFO = {"llm_cache_hit": True}
+
+# Prompt lines that change on every call without changing the request,
+# masked so that they do not make every cache key unique
+VOLATILE_PATTERNS = [re.compile(r"^CURRENT_TIME: .*$", re.MULTILINE)]
+
+
+def _mask_volatile(text: str) -> str:
+    for pattern in VOLATILE_PATTERNS:
+        text = pattern.sub("", text)
+    return text
+
+
+def canonicalize_message(message: BaseMessage) -> dict:
+    """
+    Reduce a message to the parts that determine the model's answer.
+
+    Message ids, tool call ids and response metadata differ between otherwise
+    identical runs and are left out.
+    """
+    content = message.content
+    if isinstance(content, str):
+        content = _mask_volatile(content)
+    canonical = {"type": message.type, "content": content}
+    if message.name:
+        canonical["name"] = message.name
+    if isinstance(message, AIMessage) and message.tool_calls:
+        canonical["tool_calls"] = [
+            {"name": tool_call["name"], "args": tool_call["args"]}
+            for tool_call in message.tool_calls
+        ]
+    return canonical
+
+
+def _load_message(data: dict) -> AIMessage:
+    return messages_from_dict([data])[0]
+
+
+def _dump_message(message: BaseMessage) -> dict:
+    data = message_to_dict(message)
+    # Replayed responses get a new id from the run, like a generated response
+    data["data"]["id"] = None
+    return data
+
+
+class CachedLLMMixin:
+    """
+    A mixin class that answers repeated requests from the LLM response cache.
+
+    Requests are keyed on the model, its parameters, bound arguments such as
+    tools, and the canonicalized messages. Cached responses are returned by
+    invoke calls and replayed as chunks by stream calls.
+    """
+
+    def _cache_key(
+        self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: dict
+    ) -> str:
+        return make_cache_key(
+            self._llm_type,
+            self._identifying_params,
+            stop,
+            kwargs,
+            [canonicalize_message(message) for message in messages],
+        )
+
+    def _cached_message(self, key: str) -> Optional[AIMessage]:
+        data = llm_response_cache.get(key)
+        if data is None:
+            return None
+        logger.debug(f"LLM response cache hit for {self._llm_type}")
+        return _load_message(data)
+
+    def _cache_result(self, key: str, result: ChatResult) -> None:
+        if len(result.generations) == 1:
+            llm_response_cache.set(key, _dump_message(result.generations[0].message))
+
+    def _cache_chunks(self, key: str, chunks: List[ChatGenerationChunk]) -> None:
+        if chunks:
+            message = functools.reduce(operator.add, chunks).message
+            llm_response_cache.set(
+                key, _dump_message(message_chunk_to_message(message))
+            )
+
+    async def _in_thread(self, fn, *args):
+        """Run a cache call in a thread when it reads or writes SQLite."""
+        if llm_response_cache.persistent:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._cache_key(messages, stop, kwargs)
+        message = self._cached_message(key)
+        if message is not None:
+            generation = ChatGeneration(
+                message=message, generation_info=dict(CACHE_HIT_INFO)
+            )
+            return ChatResult(generations=[generation])
+        result = super()._generate(messages, stop, run_manager, **kwargs)
+        self._cache_result(key, result)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._cache_key(messages, stop, kwargs)
+        message = await self._in_thread(self._cached_message, key)
+        if message is not None:
+            generation = ChatGeneration(
+                message=message, generation_info=dict(CACHE_HIT_INFO)
+            )
+            return ChatResult(generations=[generation])
+        result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+        await self._in_thread(self._cache_result, key, result)
+        return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        key = self._cache_key(messages, stop, kwargs)
+        message = self._cached_message(key)
+        if message is not None:
+            for chunk in iter_message_chunks(message, generation_info=CACHE_HIT_INFO):
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        chunks = []
+        for chunk in super()._stream(messages, stop, run_manager, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # Only complete streams reach this point and are cached
+        self._cache_chunks(key, chunks)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        key = self._cache_key(messages, stop, kwargs)
+        message = await self._in_thread(self._cached_message, key)
+        if message is not None:
+            for chunk in iter_message_chunks(message, generation_info=CACHE_HIT_INFO):
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        chunks = []
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        await self._in_thread(self._cache_chunks, key, chunks)
+
+
+def cache_response(llm: Runnable, messages: Any, content: str) -> None:
+    """
+    Cache a response that the caller stopped streaming early.
+
+    Only complete streams are cached by CachedLLMMixin. A caller that closes
+    the stream as soon as it has what it needs (e.g. the supervisor once the
+    routing decision is parsed) stores the part it read, and a repeated
+    request replays that part.
+
+    Args:
+        llm: The model the messages were streamed from, possibly with bound arguments
+        messages: The input of the stream call
+        content: The text read before the stream was closed
+    """
+    kwargs = {}
+    if isinstance(llm, RunnableBinding):
+        kwargs = dict(llm.kwargs)
+        llm = llm.bound
+    if not isinstance(llm, CachedLLMMixin) or llm_response_cache is None:
+        return
+    stop = kwargs.pop("stop", None)
+    key = llm._cache_key(llm._convert_input(messages).to_messages(), stop, kwargs)
+    llm_response_cache.set(key, _dump_message(AIMessage(content=content)))
+
+
+@functools.cache
+def create_cached_llm(
+    base_llm_class: Type[BaseChatModel],
+) -> Type[BaseChatModel]:
+    """
+    Factory function to create a cached version of any LangChain chat model.
+
+    Args:
+        base_llm_class: The original chat model class to be wrapped
+
+    Returns:
+        A new class that inherits from both CachedLLMMixin and the base class
+    """
+
+    class CachedLLM(CachedLLMMixin, base_llm_class):
+        pass
+
+    # Set a more descriptive name for the class
+    CachedLLM.__name__ = f"Cached{base_llm_class.__name__}"
+    return CachedLLM
@@ -0,0 +1,127 @@
+import asyncio
+import importlib.util
+import logging
+import threading
+from typing import Optional
+from weakref import WeakKeyDictionary
+
+import httpx
+
+from src.config import (
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_HTTP_KEEPALIVE_EXPIRY,
+    LLM_HTTP_TIMEOUT,
+    LLM_HTTP_CONNECT_TIMEOUT,
+    LLM_HTTP2,
+)
+
+logger = logging.getLogger(__name__)
+
+# Connection pools shared by all LLM clients, created on first use
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional["LoopAsyncClient"] = None
+_http_lock = threading.Lock()
+
+
+def _client_options() -> dict:
+    """
+    Connection pool options shared by the sync and async clients.
+    """
+    return {
+        "limits": httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(LLM_HTTP_TIMEOUT, connect=LLM_HTTP_CONNECT_TIMEOUT),
+        # HTTP/2 needs the optional h2 package
+        "http2": LLM_HTTP2 and importlib.util.find_spec("h2") is not None,
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the pooled HTTP client shared by all sync LLM calls.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(**_client_options())
+    return _http_client
+
+
+class LoopAsyncClient(httpx.AsyncClient):
+    """
+    Async HTTP client that sends each request through a connection pool of
+    the running event loop.
+
+    Pooled connections belong to the event loop that opened them, and some
+    callers (e.g. BrowserTool) run LLM calls on a new event loop each time,
+    so every loop gets its own pool. Pools of closed loops are dropped.
+    """
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._options = options
+        self._clients: WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def loop_client(self) -> httpx.AsyncClient:
+        """
+        Get the connection pool of the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._clients if other.is_closed()]:
+                del self._clients[closed]
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = httpx.AsyncClient(**self._options)
+        return client
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await self.loop_client().send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        """
+        Close the pool of the running event loop and drop the others, whose
+        connections can only be closed on their own loops.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            self._clients.clear()
+        if client is not None:
+            await client.aclose()
+        await super().aclose()
+
+
+def get_async_http_client() -> LoopAsyncClient:
+    """
+    Get the HTTP client shared by all async LLM calls, which keeps a
+    connection pool per event loop.
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        with _http_lock:
+            if _async_http_client is None:
+                _async_http_client = LoopAsyncClient(**_client_options())
+    return _async_http_client
+
+
+async def close_http_clients() -> None:
+    """
+    Close the shared connection pools, called when the server shuts down.
+    """
+    global _http_client, _async_http_client
+    with _http_lock:
+        http_client, _http_client = _http_client, None
+        async_http_client, _async_http_client = _async_http_client, None
+    if http_client is not None:
+        http_client.close()
+    if async_http_client is not None:
+        await async_http_client.aclose()
@@ -1,6 +1,8 @@
 from langchain_openai import ChatOpenAI, AzureChatOpenAI
 from langchain_deepseek import ChatDeepSeek
 from langchain_community.chat_models import ChatLiteLLM
+import functools
+import threading
 from typing import Optional
 
 from src.config import (
@@ -19,8 +21,62 @@ from src.config import (
     BASIC_AZURE_DEPLOYMENT,
     VL_AZURE_DEPLOYMENT,
     REASONING_AZURE_DEPLOYMENT,
+    REASONING_FALLBACK_MODEL,
+    REASONING_FALLBACK_BASE_URL,
+    REASONING_FALLBACK_API_KEY,
+    BASIC_FALLBACK_MODEL,
+    BASIC_FALLBACK_BASE_URL,
+    BASIC_FALLBACK_API_KEY,
+    VL_FALLBACK_MODEL,
+    VL_FALLBACK_BASE_URL,
+    VL_FALLBACK_API_KEY,
 )
 from src.config.agents import LLMType
+from src.llms.cache import create_cached_llm, llm_response_cache
+from src.llms.http import get_http_client, get_async_http_client
+from src.llms.rate_limit import create_rate_limited_llm, get_rate_limiter
+from src.llms.router import create_hedged_llm, get_llm_router
+
+
+# Secondary backend (model, base url, api key) per LLM type
+_FALLBACK_LLMS: dict[LLMType, tuple[Optional[str], Optional[str], Optional[str]]] = {
+    "reasoning": (
+        REASONING_FALLBACK_MODEL,
+        REASONING_FALLBACK_BASE_URL,
+        REASONING_FALLBACK_API_KEY,
+    ),
+    "basic": (BASIC_FALLBACK_MODEL, BASIC_FALLBACK_BASE_URL, BASIC_FALLBACK_API_KEY),
+    "vision": (VL_FALLBACK_MODEL, VL_FALLBACK_BASE_URL, VL_FALLBACK_API_KEY),
+}
+
+
+def _llm_class(base_class, llm_type: Optional[LLMType] = None):
+    """
+    Apply the optional wrappers (rate limits of the LLM type, hedging and
+    fallback to its secondary backend, response cache) to a chat model class.
+    Cache hits are not rate limited, and the secondary backend is not limited
+    by the primary's rate limits.
+    """
+    if llm_type is not None and get_rate_limiter(llm_type) is not None:
+        base_class = create_rate_limited_llm(base_class, llm_type)
+    if llm_type is not None and _FALLBACK_LLMS[llm_type][0]:
+        router = get_llm_router(
+            llm_type, functools.partial(_create_fallback_llm, llm_type)
+        )
+        base_class = create_hedged_llm(base_class, router)
+    if llm_response_cache is not None:
+        base_class = create_cached_llm(base_class)
+    return base_class
+
+
+def _http_clients() -> dict:
+    """
+    Shared connection pools for OpenAI-compatible clients.
+    """
+    return {
+        "http_client": get_http_client(),
+        "http_async_client": get_async_http_client(),
+    }
 
 
 def create_openai_llm(
@@ -28,13 +84,21 @@ def create_openai_llm(
     base_url: Optional[str] = None,
     api_key: Optional[str] = None,
     temperature: float = 0.0,
+    llm_type: Optional[LLMType] = None,
     **kwargs,
 ) -> ChatOpenAI:
     """
     Create a ChatOpenAI instance with the specified configuration
     """
     # Only include base_url in the arguments if it's not None or empty
-    llm_kwargs = {"model": model, "temperature": temperature, **kwargs}
+    llm_kwargs = {
+        "model": model,
+        "temperature": temperature,
+        # Report token usage for streamed responses too
+        "stream_usage": True,
+        **_http_clients(),
+        **kwargs,
+    }
 
     if base_url:  # This will handle None or empty string
         llm_kwargs["base_url"] = base_url
@@ -42,7 +106,7 @@ def create_openai_llm(
     if api_key:  # This will handle None or empty string
         llm_kwargs["api_key"] = api_key
 
-    return ChatOpenAI(**llm_kwargs)
+    return _llm_class(ChatOpenAI, llm_type)(**llm_kwargs)
 
 
 def create_deepseek_llm(
@@ -50,13 +114,21 @@ def create_deepseek_llm(
     base_url: Optional[str] = None,
     api_key: Optional[str] = None,
     temperature: float = 0.0,
+    llm_type: Optional[LLMType] = None,
     **kwargs,
 ) -> ChatDeepSeek:
     """
     Create a ChatDeepSeek instance with the specified configuration
     """
     # Only include base_url in the arguments if it's not None or empty
-    llm_kwargs = {"model": model, "temperature": temperature, **kwargs}
+    llm_kwargs = {
+        "model": model,
+        "temperature": temperature,
+        # Report token usage for streamed responses too
+        "stream_usage": True,
+        **_http_clients(),
+        **kwargs,
+    }
 
     if base_url:  # This will handle None or empty string
         llm_kwargs["api_base"] = base_url
@@ -64,7 +136,7 @@ def create_deepseek_llm(
     if api_key:  # This will handle None or empty string
         llm_kwargs["api_key"] = api_key
 
-    return ChatDeepSeek(**llm_kwargs)
+    return _llm_class(ChatDeepSeek, llm_type)(**llm_kwargs)
 
 
 def create_azure_llm(
@@ -73,16 +145,18 @@ def create_azure_llm(
     api_version: str,
     api_key: str,
     temperature: float = 0.0,
+    llm_type: Optional[LLMType] = None,
 ) -> AzureChatOpenAI:
     """
     create azure llm instance with specified configuration
     """
-    return AzureChatOpenAI(
+    return _llm_class(AzureChatOpenAI, llm_type)(
         azure_deployment=azure_deployment,
         azure_endpoint=azure_endpoint,
         api_version=api_version,
         api_key=api_key,
         temperature=temperature,
+        **_http_clients(),
     )
 
 
@@ -91,11 +165,17 @@ def create_litellm_model(
     base_url: Optional[str] = None,
     api_key: Optional[str] = None,
     temperature: float = 0.0,
+    llm_type: Optional[LLMType] = None,
     **kwargs,
 ) -> ChatLiteLLM:
     """
     Support various different model's through LiteLLM's capabilities.
     """
+    import litellm
+
+    # LiteLLM keeps its HTTP sessions at module level
+    litellm.client_session = litellm.client_session or get_http_client()
+    litellm.aclient_session = litellm.aclient_session or get_async_http_client()
 
     llm_kwargs = {"model": model, "temperature": temperature, **kwargs}
 
@@ -105,23 +185,46 @@ def create_litellm_model(
     if api_key:  # This will handle None or empty string
         llm_kwargs["api_key"] = api_key
 
-    return ChatLiteLLM(**llm_kwargs)
+    return _llm_class(ChatLiteLLM, llm_type)(**llm_kwargs)
+
+
+def _create_fallback_llm(llm_type: LLMType) -> ChatOpenAI | ChatLiteLLM:
+    """
+    Create the secondary backend of an LLM type.
+    """
+    model, base_url, api_key = _FALLBACK_LLMS[llm_type]
+    if "/" in model:
+        return create_litellm_model(model=model, base_url=base_url, api_key=api_key)
+    return create_openai_llm(model=model, base_url=base_url, api_key=api_key)
 
 
 # Cache for LLM instances
 _llm_cache: dict[LLMType, ChatOpenAI | ChatDeepSeek | AzureChatOpenAI | ChatLiteLLM] = (
     {}
 )
+_llm_lock = threading.Lock()
 
 
 def get_llm_by_type(
     llm_type: LLMType,
 ) -> ChatOpenAI | ChatDeepSeek | AzureChatOpenAI | ChatLiteLLM:
     """
-    Get LLM instance by type. Returns cached instance if available.
+    Get LLM instance by type. The instance is created on first use and shared.
     """
     if llm_type in _llm_cache:
         return _llm_cache[llm_type]
+    with _llm_lock:
+        if llm_type not in _llm_cache:
+            _llm_cache[llm_type] = _create_llm(llm_type)
+    return _llm_cache[llm_type]
+
+
+def _create_llm(
+    llm_type: LLMType,
+) -> ChatOpenAI | ChatDeepSeek | AzureChatOpenAI | ChatLiteLLM:
+    """
+    Create a new LLM instance for the given type.
+    """
 
     # TODO: A pretty ugly patch. Since that LiteLLM always uses `provider/model` to represent a model,
     #       we assume that if the model name contains a `/`, it's a LiteLLM model.
@@ -133,18 +236,21 @@ def get_llm_by_type(
                 azure_endpoint=AZURE_API_BASE,
                 api_version=AZURE_API_VERSION,
                 api_key=AZURE_API_KEY,
+                llm_type=llm_type,
             )
         elif "/" in BASIC_MODEL:
             llm = create_litellm_model(
                 model=REASONING_MODEL,
                 base_url=REASONING_BASE_URL,
                 api_key=REASONING_API_KEY,
+                llm_type=llm_type,
             )
         else:
             llm = create_openai_llm(
                 model=REASONING_MODEL,
                 base_url=REASONING_BASE_URL,
                 api_key=REASONING_API_KEY,
+                llm_type=llm_type,
             )
     elif llm_type == "basic":
         if BASIC_AZURE_DEPLOYMENT:
@@ -153,18 +259,21 @@ def get_llm_by_type(
                 azure_endpoint=AZURE_API_BASE,
                 api_version=AZURE_API_VERSION,
                 api_key=AZURE_API_KEY,
+                llm_type=llm_type,
             )
         elif "/" in BASIC_MODEL:
             llm = create_litellm_model(
                 model=BASIC_MODEL,
                 base_url=BASIC_BASE_URL,
                 api_key=BASIC_API_KEY,
+                llm_type=llm_type,
             )
         else:
             llm = create_openai_llm(
                 model=BASIC_MODEL,
                 base_url=BASIC_BASE_URL,
                 api_key=BASIC_API_KEY,
+                llm_type=llm_type,
             )
     elif llm_type == "vision":
         if VL_AZURE_DEPLOYMENT:
@@ -173,33 +282,47 @@ def get_llm_by_type(
                 azure_endpoint=AZURE_API_BASE,
                 api_version=AZURE_API_VERSION,
                 api_key=AZURE_API_KEY,
+                llm_type=llm_type,
             )
         elif "/" in VL_MODEL:
             llm = create_litellm_model(
                 model=VL_MODEL,
                 base_url=VL_BASE_URL,
                 api_key=VL_API_KEY,
+                llm_type=llm_type,
             )
         else:
             llm = create_openai_llm(
                 model=VL_MODEL,
                 base_url=VL_BASE_URL,
                 api_key=VL_API_KEY,
+                llm_type=llm_type,
             )
     else:
         raise ValueError(f"Unknown LLM type: {llm_type}")
 
-    _llm_cache[llm_type] = llm
     return llm
 
 
-# Initialize LLMs for different purposes - now these will be cached
-reasoning_llm = get_llm_by_type("reasoning")
-basic_llm = get_llm_by_type("basic")
-vl_llm = get_llm_by_type("vision")
+# LLMs for different purposes, created on first access
+_LLM_ALIASES: dict[str, LLMType] = {
+    "reasoning_llm": "reasoning",
+    "basic_llm": "basic",
+    "vl_llm": "vision",
+}
+
+
+def __getattr__(name: str):
+    if name in _LLM_ALIASES:
+        return get_llm_by_type(_LLM_ALIASES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
+    reasoning_llm = get_llm_by_type("reasoning")
+    basic_llm = get_llm_by_type("basic")
+    vl_llm = get_llm_by_type("vision")
+
     stream = reasoning_llm.stream("what is mcp?")
     full_response = ""
     for chunk in stream:
@@ -0,0 +1,298 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, ClassVar, Iterator, List, Optional, Type
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.config import (
+    REASONING_MAX_CONCURRENCY,
+    REASONING_RPM,
+    REASONING_TPM,
+    BASIC_MAX_CONCURRENCY,
+    BASIC_RPM,
+    BASIC_TPM,
+    VL_MAX_CONCURRENCY,
+    VL_RPM,
+    VL_TPM,
+)
+from src.config.agents import LLMType
+from src.utils.context_utils import count_message_tokens
+
+logger = logging.getLogger(__name__)
+
+# (max concurrent calls, requests per minute, tokens per minute) per LLM type,
+# 0 means unlimited
+LLM_RATE_LIMITS: dict[LLMType, tuple[int, int, int]] = {
+    "reasoning": (REASONING_MAX_CONCURRENCY, REASONING_RPM, REASONING_TPM),
+    "basic": (BASIC_MAX_CONCURRENCY, BASIC_RPM, BASIC_TPM),
+    "vision": (VL_MAX_CONCURRENCY, VL_RPM, VL_TPM),
+}
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously up to `per_minute` tokens.
+
+    Callers reserve tokens in arrival order and are told how long to wait
+    for them. The bucket may go negative, so later callers wait behind
+    earlier ones instead of overtaking them.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+
+    def reserve(self, amount: int) -> float:
+        """Take `amount` tokens and return the seconds until they are available."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        # A single request larger than the bucket waits for a full bucket
+        self._tokens -= min(amount, self.capacity)
+        return max(0.0, -self._tokens / self.rate)
+
+
+class LLMRateLimiter:
+    """
+    Client-side limits for one LLM type, or one tool.
+
+    Limits the number of calls in flight and the requests and estimated prompt
+    tokens per minute. Waiting callers, sync and async alike, are served in
+    arrival order. The time spent waiting is recorded as a metric.
+
+    Args:
+        name: Name used in logs and metrics, usually the LLM type
+        max_concurrency: Maximum calls in flight, 0 for unlimited
+        requests_per_minute: Maximum requests per minute, 0 for unlimited
+        tokens_per_minute: Maximum prompt tokens per minute, 0 for unlimited
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # Waiters for a free slot: threading.Event or (event loop, future)
+        self._waiters: deque = deque()
+        self.calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _reserve(self, tokens: int) -> float:
+        """Reserve a request and `tokens` from the buckets, return the delay."""
+        with self._lock:
+            delay = 0.0
+            if self._requests is not None:
+                delay = self._requests.reserve(1)
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.reserve(tokens))
+            return delay
+
+    def _try_acquire_slot(self, waiter) -> bool:
+        """Take a free slot, or queue `waiter` behind the current waiters."""
+        with self._lock:
+            if not self.max_concurrency or (
+                self._in_flight < self.max_concurrency and not self._waiters
+            ):
+                self._in_flight += 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _release_slot(self) -> None:
+        """Hand the slot to the first waiter, or free it."""
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                if not future.done():
+                    loop.call_soon_threadsafe(_grant, future, self)
+                    return
+            self._in_flight -= 1
+
+    def _record(self, wait: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        if wait > 1:
+            logger.info(f"Call of {self.name} waited {wait:.2f}s for rate limits")
+
+    @contextmanager
+    def limit(self, tokens: int) -> Iterator[None]:
+        """Wait for a slot and the rate limits, then hold the slot."""
+        start = time.monotonic()
+        event = threading.Event()
+        if not self._try_acquire_slot(event):
+            event.wait()
+        try:
+            time.sleep(self._reserve(tokens))
+            self._record(time.monotonic() - start)
+            yield
+        finally:
+            self._release_slot()
+
+    @asynccontextmanager
+    async def alimit(self, tokens: int) -> AsyncIterator[None]:
+        """Wait for a slot and the rate limits without blocking the event loop."""
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._try_acquire_slot((loop, future)):
+            try:
+                await future
+            except asyncio.CancelledError:
+                # The slot may have been handed over just before cancellation
+                if future.done() and not future.cancelled():
+                    self._release_slot()
+                raise
+        try:
+            await asyncio.sleep(self._reserve(tokens))
+            self._record(time.monotonic() - start)
+            yield
+        finally:
+            self._release_slot()
+
+    def stats(self) -> dict:
+        """Return the queue wait statistics."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "avg_wait": self.total_wait / self.calls if self.calls else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+def _grant(future: asyncio.Future, limiter: LLMRateLimiter) -> None:
+    """Give a handed over slot to an async waiter, or pass it on if it left."""
+    if future.done():
+        limiter._release_slot()
+    else:
+        future.set_result(None)
+
+
+_rate_limiters: dict[LLMType, LLMRateLimiter] = {}
+
+
+def get_rate_limiter(llm_type: LLMType) -> Optional[LLMRateLimiter]:
+    """
+    Get the rate limiter for an LLM type, or None if it has no limits.
+    """
+    if not any(LLM_RATE_LIMITS.get(llm_type, ())):
+        return None
+    if llm_type not in _rate_limiters:
+        _rate_limiters[llm_type] = LLMRateLimiter(llm_type, *LLM_RATE_LIMITS[llm_type])
+    return _rate_limiters[llm_type]
+
+
+def rate_limit_stats() -> dict:
+    """Return the queue wait statistics of every rate limited LLM type."""
+    return {name: limiter.stats() for name, limiter in _rate_limiters.items()}
+
+
+def _estimate_tokens(messages: List[BaseMessage]) -> int:
+    return sum(count_message_tokens(message) for message in messages)
+
+
+class RateLimitedLLMMixin:
+    """
+    A mixin class that makes every call of a chat model wait for its
+    LLM type's rate limiter. Streams hold their slot until they finish.
+    """
+
+    llm_rate_limiter: ClassVar[LLMRateLimiter]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with self.llm_rate_limiter.limit(_estimate_tokens(messages)):
+            return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        async with self.llm_rate_limiter.alimit(_estimate_tokens(messages)):
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        with self.llm_rate_limiter.limit(_estimate_tokens(messages)):
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async with self.llm_rate_limiter.alimit(_estimate_tokens(messages)):
+            async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+                yield chunk
+
+
+@functools.cache
+def create_rate_limited_llm(
+    base_llm_class: Type[BaseChatModel], llm_type: LLMType
+) -> Type[BaseChatModel]:
+    """
+    Factory function to create a rate limited version of any LangChain chat
+    model, sharing the limits of the given LLM type.
+
+    Args:
+        base_llm_class: The original chat model class to be wrapped
+        llm_type: The LLM type whose rate limiter is used
+
+    Returns:
+        A new class that inherits from both RateLimitedLLMMixin and the base class
+    """
+
+    class RateLimitedLLM(RateLimitedLLMMixin, base_llm_class):
+        llm_rate_limiter: ClassVar[LLMRateLimiter] = get_rate_limiter(llm_type)
+
+    # Set a more descriptive name for the class
+    RateLimitedLLM.__name__ = f"RateLimited{base_llm_class.__name__}"
+    return RateLimitedLLM
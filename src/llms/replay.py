@@ -0,0 +1,116 @@
+import json
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def iter_message_chunks(
+    message: AIMessage, chunk_size: int = 8, generation_info: Optional[dict] = None
+) -> Iterator[ChatGenerationChunk]:
+    """
+    Split a complete AI message into stream chunks.
+
+    The text content is split into chunks of `chunk_size` characters. Tool
+    calls and metadata are sent in a final chunk, so that adding all chunks
+    together gives back the original message. `generation_info` is attached
+    to the first chunk, so that it is kept when a stream is closed early.
+    """
+    for index, chunk in enumerate(_message_chunks(message, chunk_size)):
+        if index == 0 and generation_info:
+            chunk.generation_info = dict(generation_info)
+        yield chunk
+
+
+def _message_chunks(
+    message: AIMessage, chunk_size: int
+) -> Iterator[ChatGenerationChunk]:
+    content = message.content
+    has_text = isinstance(content, str) and content
+    if has_text:
+        for start in range(0, len(content), chunk_size):
+            text = content[start : start + chunk_size]
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        content = ""
+    if (
+        not has_text
+        or message.tool_calls
+        or message.additional_kwargs
+        or message.response_metadata
+    ):
+        tool_call_chunks = [
+            {
+                "name": tool_call["name"],
+                "args": json.dumps(tool_call["args"], ensure_ascii=False),
+                "id": tool_call["id"],
+                "index": index,
+            }
+            for index, tool_call in enumerate(message.tool_calls)
+        ]
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content=content,
+                tool_call_chunks=tool_call_chunks,
+                additional_kwargs=message.additional_kwargs,
+                response_metadata=message.response_metadata,
+            )
+        )
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    A chat model that answers with a fixed, already known content.
+
+    Used to return locally produced responses (template replies, cached
+    results) through the regular chat model interface, so they are streamed
+    and reported to the client exactly like a generated response.
+    """
+
+    content: str
+    chunk_size: int = 8
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _chunks(self) -> Iterator[ChatGenerationChunk]:
+        return iter_message_chunks(AIMessage(content=self.content), self.chunk_size)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = AIMessage(content=self.content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        for chunk in self._chunks():
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for chunk in self._chunks():
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
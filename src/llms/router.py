@@ -0,0 +1,400 @@
+import asyncio
+import functools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    ClassVar,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Type,
+    TypeVar,
+)
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.config import (
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_DELAY,
+    LLM_FALLBACK_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+Backend = Literal["primary", "secondary"]
+# Latency of complete responses and time to first chunk of streams are tracked
+# separately, since they differ by the length of the answer
+CallKind = Literal["generate", "stream"]
+
+# Threads for sync calls, so that a slow backend can be abandoned
+_executor = ThreadPoolExecutor(thread_name_prefix="llm-router")
+
+# Event loop that races sync calls, see _router_loop
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _router_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get the event loop that races sync calls, starting it on first use.
+
+    It runs in a thread of its own, so that sync calls also work from code
+    that is itself running in an event loop.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="llm-router-loop", daemon=True
+            ).start()
+    return _loop
+
+
+class LatencyTracker:
+    """Latencies of the most recent successful calls to one backend."""
+
+    def __init__(self, window: int = 100):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.wins = 0
+
+    def percentile(self, percent: float) -> float:
+        ordered = sorted(self.latencies)
+        index = max(0, math.ceil(len(ordered) * percent / 100) - 1)
+        return ordered[index]
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "wins": self.wins,
+            "p50": self.percentile(50) if self.latencies else None,
+            "p95": self.percentile(95) if self.latencies else None,
+        }
+
+
+class LLMRouter:
+    """
+    Routes the calls of one LLM type between a primary and a secondary backend.
+
+    The primary backend is called first. The secondary backend is called when
+    the primary fails or times out, or as a hedged duplicate when the primary
+    has not answered within its usual latency; the first successful answer is
+    used and the other call is cancelled.
+
+    Args:
+        name: Name used in logs and metrics, usually the LLM type
+        create_secondary: Creates the secondary chat model on first use
+        hedge_percentile: Percentile of the primary's recent latencies after
+            which a hedged request is sent, 0 to only fall back on failures
+        min_samples: Calls to measure before the percentile is used
+        default_hedge_delay: Hedge delay in seconds until then
+        timeout: Seconds after which a call is abandoned as failed
+    """
+
+    def __init__(
+        self,
+        name: str,
+        create_secondary: Callable[[], BaseChatModel],
+        hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+        min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        default_hedge_delay: float = LLM_HEDGE_DELAY,
+        timeout: float = LLM_FALLBACK_TIMEOUT,
+    ):
+        self.name = name
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.default_hedge_delay = default_hedge_delay
+        self.timeout = timeout
+        self._create_secondary = create_secondary
+        self._secondary: Optional[BaseChatModel] = None
+        self._lock = threading.Lock()
+        self.trackers: dict[tuple[Backend, CallKind], LatencyTracker] = {
+            (backend, kind): LatencyTracker()
+            for backend in ("primary", "secondary")
+            for kind in ("generate", "stream")
+        }
+        self.hedges = 0
+        self.fallbacks = 0
+
+    @property
+    def secondary(self) -> BaseChatModel:
+        if self._secondary is None:
+            with self._lock:
+                if self._secondary is None:
+                    self._secondary = self._create_secondary()
+        return self._secondary
+
+    def hedge_delay(self, kind: CallKind) -> Optional[float]:
+        """Seconds to wait for the primary before hedging, None to not hedge."""
+        if not self.hedge_percentile:
+            return None
+        tracker = self.trackers[("primary", kind)]
+        if len(tracker.latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return tracker.percentile(self.hedge_percentile)
+
+    async def _attempt(
+        self, backend: Backend, kind: CallKind, call: Callable[[], Awaitable[T]]
+    ) -> T:
+        tracker = self.trackers[(backend, kind)]
+        tracker.calls += 1
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(), self.timeout)
+        except asyncio.TimeoutError:
+            tracker.timeouts += 1
+            raise
+        except Exception:
+            tracker.errors += 1
+            raise
+        tracker.latencies.append(time.monotonic() - start)
+        return result
+
+    async def race(
+        self,
+        kind: CallKind,
+        primary: Callable[[], Awaitable[T]],
+        secondary: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        Call the primary backend, and the secondary one when the primary fails,
+        times out or is slower than its hedge delay.
+
+        Returns:
+            The first successful result
+        """
+        tasks = {
+            asyncio.ensure_future(self._attempt("primary", kind, primary)): "primary"
+        }
+        hedge_delay = self.hedge_delay(kind)
+        secondary_started = False
+        error = None
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    tasks,
+                    timeout=None if secondary_started else hedge_delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    backend = tasks.pop(task)
+                    if task.exception() is None:
+                        self.trackers[(backend, kind)].wins += 1
+                        return task.result()
+                    error = task.exception()
+                    logger.warning(
+                        f"{backend} backend for {self.name} failed: {error!r}"
+                    )
+                if not secondary_started:
+                    if done:
+                        self.fallbacks += 1
+                    else:
+                        self.hedges += 1
+                        logger.info(
+                            f"Hedging {self.name} call after {hedge_delay:.2f}s"
+                        )
+                    task = asyncio.ensure_future(
+                        self._attempt("secondary", kind, secondary)
+                    )
+                    tasks[task] = "secondary"
+                    secondary_started = True
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let the losing calls finish cancelling, so that the streams they
+            # were reading are no longer running once the race returns
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def summary(self) -> dict:
+        return {
+            "hedges": self.hedges,
+            "fallbacks": self.fallbacks,
+            "backends": {
+                f"{backend}_{kind}": tracker.summary()
+                for (backend, kind), tracker in self.trackers.items()
+            },
+        }
+
+
+_routers: dict[str, LLMRouter] = {}
+
+
+def get_llm_router(
+    llm_type: str, create_secondary: Callable[[], BaseChatModel]
+) -> LLMRouter:
+    """
+    Get the router of an LLM type, creating it on first use.
+    """
+    if llm_type not in _routers:
+        _routers[llm_type] = LLMRouter(llm_type, create_secondary)
+    return _routers[llm_type]
+
+
+def router_stats() -> dict:
+    """Return the hedging, fallback and latency statistics of every router."""
+    return {name: router.summary() for name, router in _routers.items()}
+
+
+async def _first_chunk(
+    stream: AsyncIterator[ChatGenerationChunk],
+) -> tuple[AsyncIterator[ChatGenerationChunk], Optional[ChatGenerationChunk]]:
+    """Wait for the first chunk of a stream, None if the stream is empty."""
+    return stream, await anext(stream, None)
+
+
+class HedgedLLMMixin:
+    """
+    A mixin class that routes the calls of a chat model through the LLM
+    router of its type, with the model itself as the primary backend.
+
+    Both backends are called without the callback manager; tokens are
+    reported for the winning backend only. Streams race for the first chunk
+    and do not fall back once a chunk has been sent. Sync streams only fall
+    back on errors before the first chunk.
+    """
+
+    llm_router: ClassVar[LLMRouter]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        primary = functools.partial(super()._generate, messages, stop, None, **kwargs)
+
+        def secondary() -> ChatResult:
+            return self.llm_router.secondary._generate(messages, stop, None, **kwargs)
+
+        async def race() -> ChatResult:
+            loop = asyncio.get_running_loop()
+            return await self.llm_router.race(
+                "generate",
+                lambda: loop.run_in_executor(_executor, primary),
+                lambda: loop.run_in_executor(_executor, secondary),
+            )
+
+        return asyncio.run_coroutine_threadsafe(race(), _router_loop()).result()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        primary = functools.partial(super()._agenerate, messages, stop, None, **kwargs)
+
+        def secondary() -> Awaitable[ChatResult]:
+            return self.llm_router.secondary._agenerate(messages, stop, None, **kwargs)
+
+        return await self.llm_router.race("generate", primary, secondary)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        router = self.llm_router
+        router.trackers[("primary", "stream")].calls += 1
+        stream = super()._stream(messages, stop, None, **kwargs)
+        try:
+            chunk = next(stream, None)
+        except Exception as e:
+            logger.warning(f"primary backend for {router.name} failed: {e!r}")
+            router.trackers[("primary", "stream")].errors += 1
+            router.fallbacks += 1
+            stream = router.secondary._stream(messages, stop, None, **kwargs)
+            chunk = next(stream, None)
+        while chunk is not None:
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            chunk = next(stream, None)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        primary = super()._astream(messages, stop, None, **kwargs)
+        streams = [primary]
+
+        def secondary() -> AsyncIterator[ChatGenerationChunk]:
+            stream = self.llm_router.secondary._astream(messages, stop, None, **kwargs)
+            streams.append(stream)
+            return stream
+
+        stream = None
+        try:
+            stream, chunk = await self.llm_router.race(
+                "stream",
+                lambda: _first_chunk(primary),
+                lambda: _first_chunk(secondary()),
+            )
+        finally:
+            # Close the losing stream now rather than when it is collected
+            for loser in streams:
+                if loser is not stream:
+                    await loser.aclose()
+        try:
+            while chunk is not None:
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                chunk = await anext(stream, None)
+        finally:
+            await stream.aclose()
+
+
+@functools.cache
+def create_hedged_llm(
+    base_llm_class: Type[BaseChatModel], router: LLMRouter
+) -> Type[BaseChatModel]:
+    """
+    Factory function to create a version of any LangChain chat model that
+    hedges and falls back to the secondary backend of the given router.
+
+    Args:
+        base_llm_class: The original chat model class to be wrapped
+        router: The LLM router of the model's LLM type
+
+    Returns:
+        A new class that inherits from both HedgedLLMMixin and the base class
+    """
+
+    class HedgedLLM(HedgedLLMMixin, base_llm_class):
+        llm_router: ClassVar[LLMRouter] = router
+
+    # Set a more descriptive name for the class
+    HedgedLLM.__name__ = f"Hedged{base_llm_class.__name__}"
+    return HedgedLLM
@@ -1,6 +1,15 @@
-from .template import apply_prompt_template, get_prompt_template
+from .template import (
+    apply_prompt_template,
+    get_compiled_prompt,
+    get_prompt_template,
+    load_token_counters,
+    reload_prompt_templates,
+)
 
 __all__ = [
     "apply_prompt_template",
+    "get_compiled_prompt",
     "get_prompt_template",
+    "load_token_counters",
+    "reload_prompt_templates",
 ]
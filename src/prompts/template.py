@@ -1,13 +1,81 @@
+import hashlib
 import os
 import re
+import time
 from datetime import datetime
+from string import Formatter
+from typing import Optional
 
-from langchain_core.prompts import PromptTemplate
 from langgraph.prebuilt.chat_agent_executor import AgentState
 
+from src.config import (
+    TEAM_MEMBERS,
+    PROMPT_CACHE_FRIENDLY,
+    PROMPT_TIME_RESOLUTION,
+    REASONING_MODEL,
+    BASIC_MODEL,
+    VL_MODEL,
+    TOKEN_COUNTER,
+    REASONING_CONTEXT_WINDOW,
+    BASIC_CONTEXT_WINDOW,
+    VL_CONTEXT_WINDOW,
+    CONTEXT_OUTPUT_RESERVE,
+)
+from src.config.agents import (
+    AGENT_LLM_MAP,
+    AGENT_CONTEXT_BUDGET,
+    CONTEXT_KEEP_RECENT_MESSAGES,
+    CONTEXT_SUMMARY_TOKENS,
+    LLMType,
+)
+from src.utils.context_utils import compact_messages
+from src.utils.message_view import get_content, with_content
+from src.utils.token_utils import TokenCounter, get_token_counter
 
-def get_prompt_template(prompt_name: str) -> str:
-    template = open(os.path.join(os.path.dirname(__file__), f"{prompt_name}.md")).read()
+PROMPTS_DIR = os.path.dirname(__file__)
+
+# Model name and context window (0 for unknown) of each LLM type
+_LLM_CONTEXT: dict[LLMType, tuple[str, int]] = {
+    "reasoning": (REASONING_MODEL, REASONING_CONTEXT_WINDOW),
+    "basic": (BASIC_MODEL, BASIC_CONTEXT_WINDOW),
+    "vision": (VL_MODEL, VL_CONTEXT_WINDOW),
+}
+
+# The CURRENT_TIME front matter at the top of every prompt
+_CURRENT_TIME_HEADER = re.compile(r"^---\nCURRENT_TIME: \{CURRENT_TIME\}\n---\n\s*")
+
+
+class CompiledPrompt:
+    """
+    A prompt template split once into literal text and variables, so that
+    formatting it only joins strings.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        # Identifies the prompt's content, e.g. in cache keys
+        self.digest = hashlib.sha256(template.encode("utf-8")).hexdigest()
+        self._parts = [
+            (literal, field) for literal, field, _, _ in Formatter().parse(template)
+        ]
+        self.input_variables = sorted(
+            {field for _, field in self._parts if field is not None}
+        )
+
+    def format(self, **kwargs) -> str:
+        return "".join(
+            literal if field is None else literal + str(kwargs[field])
+            for literal, field in self._parts
+        )
+
+
+# Compiled prompts by (name, cache friendly), with the file mtime they were read at
+_compiled_prompts: dict[tuple[str, bool], tuple[int, CompiledPrompt]] = {}
+
+
+def _read_prompt_template(path: str) -> str:
+    with open(path) as f:
+        template = f.read()
     # Escape curly braces using backslash
     template = template.replace("{", "{{").replace("}", "}}")
     # Replace `<<VAR>>` with `{VAR}`
@@ -15,9 +83,118 @@ def get_prompt_template(prompt_name: str) -> str:
     return template
 
 
-def apply_prompt_template(prompt_name: str, state: AgentState) -> list:
-    system_prompt = PromptTemplate(
-        input_variables=["CURRENT_TIME"],
-        template=get_prompt_template(prompt_name),
-    ).format(CURRENT_TIME=datetime.now().strftime("%a %b %d %Y %H:%M:%S %z"), **state)
-    return [{"role": "system", "content": system_prompt}] + state["messages"]
+def get_compiled_prompt(
+    prompt_name: str, cache_friendly: bool = PROMPT_CACHE_FRIENDLY
+) -> CompiledPrompt:
+    """
+    Get a prompt compiled on first use. It is compiled again when its file
+    changes, so edited prompts take effect without a restart.
+    """
+    path = os.path.join(PROMPTS_DIR, f"{prompt_name}.md")
+    mtime = os.stat(path).st_mtime_ns
+    cached = _compiled_prompts.get((prompt_name, cache_friendly))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    template = _read_prompt_template(path)
+    if cache_friendly:
+        template = _CURRENT_TIME_HEADER.sub("", template)
+    compiled = CompiledPrompt(template)
+    _compiled_prompts[(prompt_name, cache_friendly)] = (mtime, compiled)
+    return compiled
+
+
+def reload_prompt_templates() -> None:
+    """Drop every compiled prompt, so that they are read again on next use."""
+    _compiled_prompts.clear()
+
+
+def get_prompt_template(prompt_name: str) -> str:
+    return get_compiled_prompt(prompt_name, cache_friendly=False).template
+
+
+def current_time(resolution: int = PROMPT_TIME_RESOLUTION) -> str:
+    """The current time for prompts, rounded down to `resolution` seconds."""
+    now = time.time()
+    if resolution > 1:
+        now -= now % resolution
+    return datetime.fromtimestamp(now).strftime("%a %b %d %Y %H:%M:%S %z")
+
+
+def load_token_counters() -> None:
+    """
+    Load the token counter of every LLM type's model.
+
+    The first load of a tiktoken encoding may download it, so the server calls
+    this at startup, in a thread, instead of on the event loop in the first
+    apply_prompt_template call.
+    """
+    for model, _ in _LLM_CONTEXT.values():
+        get_token_counter(model, TOKEN_COUNTER)
+
+
+def _history_budget(
+    prompt_name: str, instructions: str, context_window: int, counter: TokenCounter
+) -> Optional[int]:
+    """
+    Tokens available to the conversation: the agent's budget, capped by what
+    the model's context window leaves after the instructions and the answer.
+    """
+    budget = AGENT_CONTEXT_BUDGET.get(prompt_name)
+    if context_window:
+        available = context_window - CONTEXT_OUTPUT_RESERVE
+        available -= counter.count(instructions)
+        budget = available if budget is None else min(budget, available)
+    return budget
+
+
+def apply_prompt_template(
+    prompt_name: str,
+    state: AgentState,
+    cache_friendly: bool = PROMPT_CACHE_FRIENDLY,
+    extra_context: str = "",
+) -> list:
+    """
+    Build the messages for an agent from its prompt and the conversation.
+
+    In cache friendly mode the system prompt only holds the static
+    instructions and the team, and CURRENT_TIME follows the conversation as
+    a last system message, so that consecutive calls share their prefix up
+    to the newest message and the provider can serve it from its prompt cache.
+
+    `extra_context` (e.g. search results for the planner) is appended to the
+    newest message of the conversation, before CURRENT_TIME.
+    """
+    now = current_time()
+    system_prompt = get_compiled_prompt(prompt_name, cache_friendly).format(
+        CURRENT_TIME=now, **state
+    )
+    messages = state["messages"]
+    model, context_window = _LLM_CONTEXT.get(AGENT_LLM_MAP.get(prompt_name), ("", 0))
+    counter = get_token_counter(model, TOKEN_COUNTER)
+    time_message = f"CURRENT_TIME: {now}"
+    budget = _history_budget(
+        prompt_name,
+        system_prompt + (time_message if cache_friendly else "") + extra_context,
+        context_window,
+        counter,
+    )
+    # Compact tool and agent outputs so the prompt stays within the budget
+    if budget is not None:
+        messages = compact_messages(
+            messages,
+            max_tokens=max(budget, 0),
+            keep_recent=CONTEXT_KEEP_RECENT_MESSAGES,
+            summary_tokens=CONTEXT_SUMMARY_TOKENS,
+            compactable_names=TEAM_MEMBERS,
+            counter=counter,
+        )
+    if extra_context:
+        last = messages[-1]
+        messages = [
+            *messages[:-1],
+            with_content(last, get_content(last) + extra_context),
+        ]
+    messages = [{"role": "system", "content": system_prompt}] + messages
+    if cache_friendly:
+        messages.append({"role": "system", "content": time_message})
+    return messages
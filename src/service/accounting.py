@@ -0,0 +1,266 @@
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+from src.utils.context_utils import count_message_tokens
+from src.utils.token_utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CallRecord:
+    """一次LLM调用或工具调用的记录。
+
+    Attributes:
+        kind: 调用类型，llm或tool
+        name: 模型名称或工具名称
+        node: 发起调用的顶层节点，例如planner、researcher
+        langgraph_step: 发起调用的顶层节点所在的langgraph步骤
+        latency: 调用总耗时(秒)
+        ttft: 首个token的耗时(秒)，仅流式LLM调用有值
+        prompt_tokens: 提示token数量
+        completion_tokens: 生成token数量
+        cached_tokens: 命中服务商提示缓存的提示token数量，服务商未返回时为None
+        estimated: token数量是否为估算值(服务商未返回用量时)
+        error: 调用是否失败
+        source: LLM调用的来源：model为调用服务商，replay为本地回放的响应
+            (预分类器的模板回复、计划缓存)，cache为命中LLM响应缓存；
+            replay和cache不计入LLM调用次数和token用量
+    """
+
+    kind: str
+    name: str
+    node: str
+    langgraph_step: Optional[int]
+    latency: float = 0.0
+    ttft: Optional[float] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: Optional[int] = None
+    estimated: bool = False
+    error: bool = False
+    source: str = "model"
+
+
+class WorkflowAccountant(BaseCallbackHandler):
+    """记录一次工作流中每次LLM调用和工具调用的token用量和耗时。
+
+    作为回调处理器传入工作流的运行配置，LLM调用和工具调用按发起调用的
+    顶层节点和langgraph步骤分组，ReAct代理内部的调用归属于代理节点。
+    服务商未返回token用量时根据消息内容估算。
+    """
+
+    # 在事件循环中直接执行回调，不切换到线程池
+    run_inline = True
+
+    def __init__(self, workflow_id: str):
+        self.workflow_id = workflow_id
+        self.records: list[CallRecord] = []
+        self._lock = threading.Lock()
+        # 进行中的调用：run_id -> (记录, 开始时间, 估算的提示token数量)
+        self._pending: dict[UUID, tuple[CallRecord, float, int]] = {}
+        # 顶层任务到其所在langgraph步骤的映射
+        self._task_steps: dict[str, int] = {}
+
+    def _locate(self, metadata: Optional[dict]) -> tuple[str, Optional[int]]:
+        """根据回调元数据确定顶层节点和所在的langgraph步骤。"""
+        metadata = metadata or {}
+        checkpoint_ns = metadata.get("langgraph_checkpoint_ns") or ""
+        top_level_task = checkpoint_ns.split("|")[0]
+        step = metadata.get("langgraph_step")
+        with self._lock:
+            if "|" not in checkpoint_ns and step is not None:
+                self._task_steps[top_level_task] = step
+            step = self._task_steps.get(top_level_task, step)
+        node = top_level_task.split(":")[0] or metadata.get("langgraph_node", "")
+        return node, step
+
+    def _start(self, run_id: UUID, record: CallRecord, prompt_tokens: int = 0):
+        with self._lock:
+            self._pending[run_id] = (record, time.monotonic(), prompt_tokens)
+
+    def _finish(self, run_id: UUID) -> Optional[tuple[CallRecord, int]]:
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+            if pending is None:
+                return None
+            record, start, prompt_tokens = pending
+            record.latency = time.monotonic() - start
+            self.records.append(record)
+            return record, prompt_tokens
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        self._locate(metadata)
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        node, step = self._locate(metadata)
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get(
+            "name", ""
+        )
+        record = CallRecord("llm", name, node, step)
+        if (kwargs.get("invocation_params") or {}).get("_type") == "replay":
+            record.source = "replay"
+            self._start(run_id, record)
+            return
+        prompt_tokens = sum(
+            count_message_tokens(message) for batch in messages for message in batch
+        )
+        self._start(run_id, record, prompt_tokens)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any):
+        chunk = kwargs.get("chunk")
+        with self._lock:
+            pending = self._pending.get(run_id)
+            if pending is not None and pending[0].ttft is None:
+                pending[0].ttft = time.monotonic() - pending[1]
+                # 从缓存回放的流在第一个片段中标记，提前关闭的流也能识别
+                if chunk is not None and _is_cache_hit(chunk):
+                    pending[0].source = "cache"
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id)
+        if finished is None:
+            return
+        record, prompt_tokens = finished
+        generation = response.generations[0][0] if response.generations else None
+        message = getattr(generation, "message", None)
+        if generation is not None and _is_cache_hit(generation):
+            record.source = "cache"
+        if record.source != "model":
+            # 没有调用服务商，不计算token用量
+            return
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            record.prompt_tokens = usage.get("input_tokens", 0)
+            record.completion_tokens = usage.get("output_tokens", 0)
+            record.cached_tokens = usage.get("input_token_details", {}).get(
+                "cache_read"
+            )
+            if record.cached_tokens is None:
+                # DeepSeek在非流式响应的用量中单独返回提示缓存命中的token数量
+                token_usage = (response.llm_output or {}).get("token_usage") or {}
+                record.cached_tokens = token_usage.get("prompt_cache_hit_tokens")
+        else:
+            record.prompt_tokens = prompt_tokens
+            record.completion_tokens = count_tokens(
+                generation.text if generation else ""
+            )
+            record.estimated = True
+        logger.debug(
+            f"LLM call in {record.node}: {record.prompt_tokens} prompt tokens, "
+            f"{record.cached_tokens} from the provider's prompt cache"
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        if isinstance(error, GeneratorExit) and kwargs.get("response"):
+            # 调用方已得到所需内容并提前停止了流式生成，按已生成的部分计算
+            self.on_llm_end(kwargs["response"], run_id=run_id)
+            return
+        finished = self._finish(run_id)
+        if finished is not None:
+            finished[0].error = True
+
+    def on_tool_start(
+        self,
+        serialized: dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        node, step = self._locate(metadata)
+        name = (serialized or {}).get("name", "")
+        self._start(run_id, CallRecord("tool", name, node, step))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id)
+        if finished is not None:
+            finished[0].error = True
+
+    def summary(self) -> dict:
+        """按节点汇总token用量和耗时。
+
+        Returns:
+            包含workflow_id、总计、按节点的汇总和每次调用记录的字典
+        """
+        with self._lock:
+            records = list(self.records)
+        nodes: dict[str, dict] = {}
+        total = _empty_totals()
+        for record in records:
+            totals = nodes.setdefault(record.node, _empty_totals())
+            for bucket in (totals, total):
+                _add_record(bucket, record)
+        for totals in [*nodes.values(), total]:
+            ttfts = totals.pop("ttfts")
+            totals["avg_ttft"] = sum(ttfts) / len(ttfts) if ttfts else None
+        return {
+            "workflow_id": self.workflow_id,
+            "total": total,
+            "nodes": nodes,
+            "calls": [asdict(record) for record in records],
+        }
+
+
+def _is_cache_hit(generation) -> bool:
+    """生成结果是否来自LLM响应缓存。"""
+    if (generation.generation_info or {}).get("llm_cache_hit"):
+        return True
+    # 流式调用时generation_info被合并到消息的response_metadata中
+    message = getattr(generation, "message", None)
+    return bool(getattr(message, "response_metadata", {}).get("llm_cache_hit"))
+
+
+def _empty_totals() -> dict:
+    return {
+        "llm_calls": 0,
+        "replayed_calls": 0,
+        "cached_calls": 0,
+        "tool_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "llm_time": 0.0,
+        "tool_time": 0.0,
+        "errors": 0,
+        "ttfts": [],
+    }
+
+
+def _add_record(totals: dict, record: CallRecord) -> None:
+    if record.kind == "llm" and record.source == "replay":
+        totals["replayed_calls"] += 1
+    elif record.kind == "llm" and record.source == "cache":
+        totals["cached_calls"] += 1
+    elif record.kind == "llm":
+        totals["llm_calls"] += 1
+        totals["llm_time"] += record.latency
+        totals["prompt_tokens"] += record.prompt_tokens
+        totals["completion_tokens"] += record.completion_tokens
+        totals["cached_tokens"] += record.cached_tokens or 0
+        if record.ttft is not None:
+            totals["ttfts"].append(record.ttft)
+    else:
+        totals["tool_calls"] += 1
+        totals["tool_time"] += record.latency
+    totals["errors"] += int(record.error)
@@ -1,10 +1,17 @@
+import asyncio
 import logging
+from typing import Optional
 
-from src.config import TEAM_MEMBERS
-from src.graph import build_graph
+from src.config import TEAM_MEMBERS, CHECKPOINT_DB_PATH
+from src.graph import build_graph, get_graph
+from src.tools.bash_tool import TOOL_OUTPUT_EVENT
+from src.tools.python_pool import python_worker_pool
 from langchain_community.adapters.openai import convert_message_to_dict
 import uuid
 
+from .accounting import WorkflowAccountant
+from .workflow_store import WorkflowStore
+
 # 配置基础日志系统
 logging.basicConfig(
     level=logging.INFO,  # 默认日志级别为INFO
@@ -23,12 +30,77 @@ def enable_debug_logging():
 # 获取当前模块的日志记录器
 logger = logging.getLogger(__name__)
 
-# 创建代理工作流图
-graph = build_graph()
+# 协调者消息缓存的最大大小，用于特殊处理协调者的输出
+MAX_CACHE_SIZE = 3
+
+# 事件日志批量写入的大小，message事件会先缓存再批量写入
+EVENT_FLUSH_SIZE = 50
+
+# 数量很多、先缓存再批量写入的事件类型
+BUFFERED_EVENTS = ("message", "tool_call_progress")
+
+# 启用检查点时使用的持久化存储和带检查点的工作流图，首次使用时在事件循环中创建
+workflow_store: Optional[WorkflowStore] = None
+durable_graph = None
+_durable_setup_lock = asyncio.Lock()
+
+# 当前进程中正在运行的工作流ID
+running_workflows: set[str] = set()
+
+
+async def _get_durable_runtime():
+    """获取持久化存储和带检查点的工作流图。
+
+    Returns:
+        (工作流图, 持久化存储)；未配置CHECKPOINT_DB_PATH时返回(共享的工作流图, None)
+    """
+    global workflow_store, durable_graph
+    if not CHECKPOINT_DB_PATH:
+        return get_graph(), None
+    async with _durable_setup_lock:
+        if workflow_store is None:
+            store = WorkflowStore(CHECKPOINT_DB_PATH)
+            await store.setup()
+            durable_graph = build_graph(checkpointer=store.checkpointer)
+            workflow_store = store
+    return durable_graph, workflow_store
+
 
-# 协调者消息缓存，用于特殊处理协调者的输出
-coordinator_cache = []
-MAX_CACHE_SIZE = 3  # 最大缓存大小
+async def close_durable_runtime():
+    """关闭持久化存储的数据库连接，在服务退出时调用。"""
+    global workflow_store, durable_graph
+    async with _durable_setup_lock:
+        if workflow_store is not None:
+            await workflow_store.close()
+            workflow_store = None
+            durable_graph = None
+
+
+async def _persist_events(
+    store: Optional[WorkflowStore],
+    workflow_id: str,
+    events,
+):
+    """将事件写入事件日志并原样转发。
+
+    message等事件数量很多，先缓存再批量写入；其他事件会触发立即写入。
+    连接中断时缓存中的事件同样会被写入。
+    """
+    buffer = []
+    try:
+        async for step, ydata in events:
+            if store is not None:
+                buffer.append((step, ydata))
+                if (
+                    ydata["event"] not in BUFFERED_EVENTS
+                    or len(buffer) >= EVENT_FLUSH_SIZE
+                ):
+                    await store.append_events(workflow_id, buffer)
+                    buffer = []
+            yield ydata
+    finally:
+        if store is not None:
+            await store.append_events(workflow_id, buffer)
 
 
 async def run_agent_workflow(
@@ -36,6 +108,9 @@ async def run_agent_workflow(
     debug: bool = False,
     deep_thinking_mode: bool = False,
     search_before_planning: bool = False,
+    parallel_execution: bool = False,
+    deterministic_routing: bool = False,
+    speculative_search: bool = False,
 ):
     """运行代理工作流处理用户输入。
 
@@ -49,6 +124,9 @@ async def run_agent_workflow(
         debug: 如果为True，启用调试级别日志
         deep_thinking_mode: 是否启用深度思考模式（使用更强大的推理LLM）
         search_before_planning: 是否在规划前执行搜索
+        parallel_execution: 是否并发执行计划中互不依赖的步骤
+        deterministic_routing: 是否按计划直接路由，仅在失败时调用LLM监督者
+        speculative_search: 是否在协调者决策的同时提前开始规划前搜索
 
     Returns:
         异步生成器，产生工作流执行过程中的各类事件
@@ -68,26 +146,228 @@ async def run_agent_workflow(
     # 为每次工作流生成唯一ID
     workflow_id = str(uuid.uuid4())
 
+    graph_input = {
+        # 常量
+        "TEAM_MEMBERS": TEAM_MEMBERS,
+        # 运行时变量
+        "messages": user_input_messages,  # 用户输入消息
+        "deep_thinking_mode": deep_thinking_mode,  # 是否使用更强大的推理模型
+        "search_before_planning": search_before_planning,  # 是否在规划前执行搜索
+        "parallel_execution": parallel_execution,  # 是否并发执行互不依赖的计划步骤
+        "plan_cursor": 0,  # 计划游标，从第一个步骤开始
+        "deterministic_routing": deterministic_routing,  # 是否按计划直接路由
+        "speculative_search": speculative_search,  # 是否提前开始规划前搜索
+    }
+
+    # 启用检查点时，以workflow_id作为线程ID保存检查点，用于之后恢复工作流
+    workflow_graph, store = await _get_durable_runtime()
+    config = {}
+    if store is not None:
+        config = {"configurable": {"thread_id": workflow_id}}
+        await store.create_workflow(
+            workflow_id,
+            user_input_messages,
+            {"parallel_execution": parallel_execution},
+        )
+
+    running_workflows.add(workflow_id)
+    try:
+        async for ydata in _persist_events(
+            store,
+            workflow_id,
+            _stream_workflow_events(
+                workflow_graph,
+                graph_input,
+                config,
+                workflow_id,
+                user_input_messages,
+                parallel_execution,
+            ),
+        ):
+            yield ydata
+        if store is not None:
+            await store.set_status(workflow_id, "completed")
+    except Exception:
+        # 工作流图执行出错时标记为失败；客户端断开连接等中断不是失败，
+        # 工作流保持running状态，之后可以恢复
+        if store is not None:
+            await store.set_status(workflow_id, "failed")
+        raise
+    finally:
+        running_workflows.discard(workflow_id)
+        # 工作流结束后回收其Python会话的进程
+        python_worker_pool.end_session(workflow_id)
+
+
+async def get_workflow(workflow_id: str) -> Optional[dict]:
+    """获取持久化的工作流记录。
+
+    Returns:
+        工作流记录；未启用检查点或工作流不存在时返回None
+    """
+    _, store = await _get_durable_runtime()
+    if store is None:
+        return None
+    return await store.get_workflow(workflow_id)
+
+
+async def resume_agent_workflow(workflow_id: str, debug: bool = False):
+    """根据workflow_id恢复或重新连接到一个工作流。
+
+    已完成步骤的事件直接从事件日志中重放，不会重新计算；
+    如果工作流尚未完成(被中断或执行失败)，则从最近的检查点继续执行剩余步骤，
+    失败的步骤会重新执行。
+
+    Args:
+        workflow_id: 工作流ID
+        debug: 如果为True，启用调试级别日志
+
+    Returns:
+        异步生成器，产生重放的事件和后续执行产生的事件
+
+    Raises:
+        ValueError: 当未启用检查点、工作流不存在或工作流正在运行时抛出
+    """
+    if debug:
+        enable_debug_logging()
+
+    workflow_graph, store = await _get_durable_runtime()
+    if store is None:
+        raise ValueError("Workflow checkpointing is not enabled")
+    workflow = await store.get_workflow(workflow_id)
+    if workflow is None:
+        raise ValueError(f"Workflow {workflow_id} not found")
+    if workflow_id in running_workflows:
+        raise ValueError(f"Workflow {workflow_id} is already running")
+
+    logger.info(f"Resuming workflow {workflow_id}")
+    config = {"configurable": {"thread_id": workflow_id}}
+    state = await workflow_graph.aget_state(config)
+    if workflow["status"] != "completed" and state.next:
+        # 丢弃未完成检查点的步骤产生的事件，这些步骤会重新执行
+        await store.truncate_events(workflow_id, state.metadata.get("step", -1))
+
+    events = await store.list_events(workflow_id)
+    for ydata in events:
+        yield ydata
+    if workflow["status"] == "completed":
+        return
+
+    # 已经开始规划说明协调者已经移交给planner
+    is_handoff_case = any(event["event"] == "start_of_workflow" for event in events)
+    running_workflows.add(workflow_id)
+    try:
+        if workflow["status"] == "failed":
+            logger.info(f"Retrying failed workflow {workflow_id}")
+            await store.set_status(workflow_id, "running")
+        if state.next:
+            async for ydata in _persist_events(
+                store,
+                workflow_id,
+                _stream_workflow_events(
+                    workflow_graph,
+                    None,
+                    config,
+                    workflow_id,
+                    workflow["input"],
+                    workflow["options"].get("parallel_execution", False),
+                    is_handoff_case=is_handoff_case,
+                ),
+            ):
+                yield ydata
+        else:
+            # 工作流已执行完毕，但结束事件没有写入事件日志
+            final_events = [
+                (None, event)
+                for event in _final_events(
+                    workflow_id, state.values.get("messages", []), is_handoff_case
+                )
+            ]
+            await store.append_events(workflow_id, final_events)
+            for _, ydata in final_events:
+                yield ydata
+        await store.set_status(workflow_id, "completed")
+    except Exception:
+        await store.set_status(workflow_id, "failed")
+        raise
+    finally:
+        running_workflows.discard(workflow_id)
+        # 工作流结束后回收其Python会话的进程
+        python_worker_pool.end_session(workflow_id)
+
+
+def _final_events(workflow_id: str, messages: list, is_handoff_case: bool) -> list:
+    """生成工作流结束时发送的事件。"""
+    events = []
+    # 特殊处理移交情况的工作流结束事件
+    if is_handoff_case:
+        # TODO: remove messages attributes after Frontend being compatible with final_session_state event.
+        events.append(
+            {
+                "event": "end_of_workflow",
+                "data": {
+                    "workflow_id": workflow_id,
+                    "messages": [convert_message_to_dict(msg) for msg in messages],
+                },
+            }
+        )
+    events.append(
+        {
+            "event": "final_session_state",
+            "data": {
+                "messages": [convert_message_to_dict(msg) for msg in messages],
+            },
+        }
+    )
+    return events
+
+
+async def _stream_workflow_events(
+    workflow_graph,
+    graph_input: Optional[dict],
+    config: dict,
+    workflow_id: str,
+    user_input_messages: list,
+    parallel_execution: bool,
+    is_handoff_case: bool = False,
+):
+    """执行工作流图，并将LangGraph事件转换为客户端事件。
+
+    Args:
+        workflow_graph: 要执行的工作流图
+        graph_input: 工作流初始状态；从检查点恢复时为None
+        config: 工作流运行配置
+        workflow_id: 工作流ID
+        user_input_messages: 用户请求消息列表
+        parallel_execution: 是否并发执行计划中互不依赖的步骤
+        is_handoff_case: 协调者是否已经移交给planner
+
+    Returns:
+        异步生成器，产生(所属的顶层langgraph步骤, 客户端事件)，
+        最后产生按节点汇总token用量和耗时的workflow_summary事件
+    """
     # 定义需要流式输出的代理列表
     streaming_llm_agents = [*TEAM_MEMBERS, "planner", "coordinator"]
 
-    # 在每次工作流开始时重置协调者缓存
-    global coordinator_cache
+    # 记录每次LLM调用和工具调用的token用量和耗时，在事件流结束时汇总发送
+    accountant = WorkflowAccountant(workflow_id)
+    # 工具通过metadata中的workflow_id区分所属的工作流，例如每个工作流使用独立的Python进程
+    config = {
+        **config,
+        "callbacks": [accountant],
+        "metadata": {"workflow_id": workflow_id},
+    }
+
+    # 协调者消息缓存，每次工作流独立
     coordinator_cache = []
-    global is_handoff_case
-    is_handoff_case = False
+    # 顶层节点任务ID到其所在langgraph步骤的映射，用于确定事件属于哪个步骤
+    task_steps = {}
 
     # 开始异步流式执行工作流图
     # TODO: extract message content from object, specifically for on_chat_model_stream
-    async for event in graph.astream_events(
-        {
-            # 常量
-            "TEAM_MEMBERS": TEAM_MEMBERS,
-            # 运行时变量
-            "messages": user_input_messages,  # 用户输入消息
-            "deep_thinking_mode": deep_thinking_mode,  # 是否使用更强大的推理模型
-            "search_before_planning": search_before_planning,  # 是否在规划前执行搜索
-        },
+    async for event in workflow_graph.astream_events(
+        graph_input,
+        config,
         version="v2",  # 使用v2版本的事件流API
     ):
         # 解析事件信息
@@ -108,12 +388,23 @@ async def run_agent_workflow(
             else str(metadata["langgraph_step"])
         )
         run_id = "" if (event.get("run_id") is None) else str(event["run_id"])
+        # 子图(ReAct代理)内部事件的langgraph_step是子图自身的步骤，
+        # 因此通过顶层任务ID找到事件所属的顶层步骤
+        checkpoint_ns = metadata.get("langgraph_checkpoint_ns") or ""
+        top_level_task = checkpoint_ns.split("|")[0]
+        if "|" not in checkpoint_ns and metadata.get("langgraph_step") is not None:
+            task_steps[top_level_task] = metadata["langgraph_step"]
+        step = task_steps.get(top_level_task)
+        # 并行执行模式下同一步骤可能有多个同名代理，使用任务ID区分
+        agent_id = f"{workflow_id}_{name}_{langgraph_step}"
+        if parallel_execution and metadata.get("langgraph_checkpoint_ns"):
+            agent_id += "_" + metadata["langgraph_checkpoint_ns"].split(":")[-1]
 
         # 处理链开始事件 - 当代理开始工作时
         if kind == "on_chain_start" and name in streaming_llm_agents:
             # 特殊处理planner代理开始事件 - 标记整个工作流的开始
             if name == "planner":
-                yield {
+                yield step, {
                     "event": "start_of_workflow",
                     "data": {"workflow_id": workflow_id, "input": user_input_messages},
                 }
@@ -122,7 +413,7 @@ async def run_agent_workflow(
                 "event": "start_of_agent",
                 "data": {
                     "agent_name": name,
-                    "agent_id": f"{workflow_id}_{name}_{langgraph_step}",
+                    "agent_id": agent_id,
                 },
             }
         # 处理链结束事件 - 当代理完成工作时
@@ -131,7 +422,7 @@ async def run_agent_workflow(
                 "event": "end_of_agent",
                 "data": {
                     "agent_name": name,
-                    "agent_id": f"{workflow_id}_{name}_{langgraph_step}",
+                    "agent_id": agent_id,
                 },
             }
         # 处理LLM开始事件 - 当语言模型开始生成时
@@ -216,6 +507,21 @@ async def run_agent_workflow(
                     "tool_input": data.get("input"),
                 },
             }
+        # 处理工具执行过程中的输出事件，例如bash命令的stdout和stderr
+        elif (
+            kind == "on_custom_event"
+            and name == TOOL_OUTPUT_EVENT
+            and node in TEAM_MEMBERS
+        ):
+            ydata = {
+                "event": "tool_call_progress",
+                "data": {
+                    "tool_call_id": f"{workflow_id}_{node}_{data['tool_name']}_{run_id}",
+                    "tool_name": data["tool_name"],
+                    "stream": data["stream"],
+                    "delta": data["delta"],
+                },
+            }
         # 处理工具调用结束事件
         elif kind == "on_tool_end" and node in TEAM_MEMBERS:
             ydata = {
@@ -231,27 +537,13 @@ async def run_agent_workflow(
             continue
 
         # 将处理后的事件发送给客户端
-        yield ydata
+        yield step, ydata
 
-    # 特殊处理移交情况的工作流结束事件
-    if is_handoff_case:
-        # TODO: remove messages attributes after Frontend being compatible with final_session_state event.
-        yield {
-            "event": "end_of_workflow",
-            "data": {
-                "workflow_id": workflow_id,
-                "messages": [
-                    convert_message_to_dict(msg)
-                    for msg in data["output"].get("messages", [])
-                ],
-            },
-        }
-    yield {
-        "event": "final_session_state",
-        "data": {
-            "messages": [
-                convert_message_to_dict(msg)
-                for msg in data["output"].get("messages", [])
-            ],
-        },
-    }
+    for ydata in _final_events(
+        workflow_id, data["output"].get("messages", []), is_handoff_case
+    ):
+        yield None, ydata
+
+    summary = accountant.summary()
+    logger.info(f"Workflow {workflow_id} usage: {summary['total']}")
+    yield None, {"event": "workflow_summary", "data": summary}
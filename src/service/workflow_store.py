@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowStore:
+    """基于SQLite的工作流持久化存储。
+
+    同一个数据库连接同时用于：
+    1. LangGraph检查点(checkpoints/writes表)，由AsyncSqliteSaver管理
+    2. 工作流记录(workflows表)，保存输入和运行选项，用于恢复工作流
+    3. 事件日志(workflow_events表)，保存已发送给客户端的事件，恢复时直接重放
+
+    必须在事件循环中调用setup()之后才能使用。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.checkpointer: Optional[AsyncSqliteSaver] = None
+        self._conn: Optional[aiosqlite.Connection] = None
+
+    async def setup(self) -> None:
+        """连接数据库并创建所需的表。"""
+        if self._conn is not None:
+            return
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = aiosqlite.connect(self.db_path)
+        checkpointer = AsyncSqliteSaver(conn)
+        # 启动连接并创建检查点表
+        await checkpointer.setup()
+        await conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS workflows (
+                workflow_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                input TEXT NOT NULL,
+                options TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS workflow_events (
+                workflow_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                step INTEGER,
+                event TEXT NOT NULL,
+                PRIMARY KEY (workflow_id, seq)
+            );
+            """
+        )
+        await conn.commit()
+        self._conn = conn
+        self.checkpointer = checkpointer
+        logger.info(f"Workflow store ready at {self.db_path}")
+
+    async def close(self) -> None:
+        """关闭数据库连接。"""
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+            self.checkpointer = None
+
+    async def create_workflow(
+        self, workflow_id: str, user_input_messages: list, options: dict
+    ) -> None:
+        """记录一个新的工作流。"""
+        now = time.time()
+        await self._conn.execute(
+            "INSERT INTO workflows VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                workflow_id,
+                "running",
+                json.dumps(user_input_messages, ensure_ascii=False),
+                json.dumps(options),
+                now,
+                now,
+            ),
+        )
+        await self._conn.commit()
+
+    async def get_workflow(self, workflow_id: str) -> Optional[dict]:
+        """获取工作流记录，不存在时返回None。"""
+        async with self._conn.execute(
+            "SELECT status, input, options FROM workflows WHERE workflow_id = ?",
+            (workflow_id,),
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        return {
+            "workflow_id": workflow_id,
+            "status": row[0],
+            "input": json.loads(row[1]),
+            "options": json.loads(row[2]),
+        }
+
+    async def set_status(self, workflow_id: str, status: str) -> None:
+        """更新工作流状态(running、completed或failed)。"""
+        await self._conn.execute(
+            "UPDATE workflows SET status = ?, updated_at = ? WHERE workflow_id = ?",
+            (status, time.time(), workflow_id),
+        )
+        await self._conn.commit()
+
+    async def append_events(
+        self, workflow_id: str, events: list[tuple[Optional[int], dict]]
+    ) -> None:
+        """批量追加事件到事件日志。
+
+        Args:
+            workflow_id: 工作流ID
+            events: (langgraph步骤, 事件)列表，步骤未知时为None
+        """
+        if not events:
+            return
+        async with self._conn.execute(
+            "SELECT COALESCE(MAX(seq), -1) FROM workflow_events WHERE workflow_id = ?",
+            (workflow_id,),
+        ) as cursor:
+            (last_seq,) = await cursor.fetchone()
+        await self._conn.executemany(
+            "INSERT INTO workflow_events VALUES (?, ?, ?, ?)",
+            [
+                (
+                    workflow_id,
+                    last_seq + 1 + i,
+                    step,
+                    json.dumps(event, ensure_ascii=False),
+                )
+                for i, (step, event) in enumerate(events)
+            ],
+        )
+        await self._conn.commit()
+
+    async def list_events(self, workflow_id: str) -> list[dict]:
+        """按顺序获取工作流的所有事件。"""
+        async with self._conn.execute(
+            "SELECT event FROM workflow_events WHERE workflow_id = ? ORDER BY seq",
+            (workflow_id,),
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    async def truncate_events(self, workflow_id: str, after_step: int) -> None:
+        """删除晚于指定步骤的事件。
+
+        这些事件属于未完成检查点的步骤，恢复时这些步骤会重新执行并重新产生事件。
+        """
+        await self._conn.execute(
+            "DELETE FROM workflow_events WHERE workflow_id = ? AND step > ?",
+            (workflow_id, after_step),
+        )
+        await self._conn.commit()
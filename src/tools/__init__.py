@@ -1,9 +1,16 @@
-from .crawl import crawl_tool
-from .file_management import write_file_tool
-from .python_repl import python_repl_tool
-from .search import tavily_tool
-from .bash_tool import bash_tool
-from .browser import browser_tool
+import importlib
+
+# Tools are imported on first access, so that importing `src.tools` does not
+# load heavy dependencies (e.g. browser_use) before a tool is actually used
+_TOOL_MODULES = {
+    "bash_tool": ".bash_tool",
+    "crawl_tool": ".crawl",
+    "tavily_tool": ".search",
+    "python_repl_tool": ".python_repl",
+    "write_file_tool": ".file_management",
+    "browser_tool": ".browser",
+    "read_tool_output": ".tool_output",
+}
 
 __all__ = [
     "bash_tool",
@@ -12,4 +19,15 @@ __all__ = [
     "python_repl_tool",
     "write_file_tool",
     "browser_tool",
+    "read_tool_output",
 ]
+
+
+def __getattr__(name: str):
+    if name not in _TOOL_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    tool = getattr(importlib.import_module(_TOOL_MODULES[name], __name__), name)
+    # Importing a submodule binds it as a package attribute (e.g. `bash_tool`),
+    # so bind the tool itself to shadow it
+    globals()[name] = tool
+    return tool
@@ -1,37 +1,272 @@
+import asyncio
+import codecs
 import logging
+import os
+import signal
 import subprocess
-from typing import Annotated
-from langchain_core.tools import tool
+import threading
+import time
+import uuid
+from typing import Annotated, Optional
+from langchain_core.callbacks import adispatch_custom_event
+from langchain_core.tools import StructuredTool
+from src.config import BASH_TIMEOUT, BASH_OUTPUT_HEAD, BASH_OUTPUT_TAIL, BASH_LOG_DIR
 from .decorators import log_io
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Name of the custom event that streams the output of a running command
+TOOL_OUTPUT_EVENT = "tool_output"
 
-@tool
-@log_io
-def bash_tool(
+# Bytes read from a pipe at a time
+READ_SIZE = 4096
+
+# Seconds to wait for the rest of the output of a killed sync command
+READER_GRACE = 1.0
+
+
+class BoundedOutput:
+    """
+    One output stream of a command, of which only a bounded head and tail
+    are kept in memory.
+
+    Once output has to be dropped, the full output is written to a log file
+    in `log_dir`, whose path is given in the rendered output.
+
+    Args:
+        name: Name of the stream, e.g. stdout
+        head: Characters kept from the start of the output
+        tail: Characters kept from the end of the output
+        log_dir: Directory of the full output logs
+    """
+
+    def __init__(
+        self,
+        name: str,
+        head: int = BASH_OUTPUT_HEAD,
+        tail: int = BASH_OUTPUT_TAIL,
+        log_dir: str = BASH_LOG_DIR,
+    ):
+        self.name = name
+        self.head_limit = head
+        self.tail_limit = tail
+        self.log_dir = log_dir
+        self.head = ""
+        self.tail = ""
+        self.size = 0
+        self.log_path: Optional[str] = None
+        self._log = None
+        self._closed = False
+        # The sync path writes from reader threads
+        self._lock = threading.Lock()
+
+    def write(self, text: str):
+        with self._lock:
+            self._write(text)
+
+    def _write(self, text: str):
+        if not text or self._closed:
+            return
+        self.size += len(text)
+        if self._log is not None:
+            self._log.write(text)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += text[:room]
+            text = text[room:]
+        self.tail += text
+        if len(self.tail) > self.tail_limit:
+            if self._log is None:
+                # Nothing has been dropped yet, so head and tail are the full output
+                os.makedirs(self.log_dir, exist_ok=True)
+                self.log_path = os.path.join(
+                    self.log_dir, f"bash-{uuid.uuid4().hex}.{self.name}.log"
+                )
+                self._log = open(self.log_path, "w")
+                self._log.write(self.head + self.tail)
+            self.tail = self.tail[len(self.tail) - self.tail_limit :]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._log is not None:
+                self._log.close()
+
+    def render(self) -> str:
+        if self.log_path is None:
+            return self.head + self.tail
+        omitted = self.size - len(self.head) - len(self.tail)
+        return (
+            f"{self.head}\n... [{omitted} characters omitted, "
+            f"full output in {self.log_path}] ...\n{self.tail}"
+        )
+
+
+def _failure_message(returncode: int, stdout: str, stderr: str) -> str:
+    return (
+        f"Command failed with exit code {returncode}.\n"
+        f"Stdout: {stdout}\nStderr: {stderr}"
+    )
+
+
+def _timeout_message(timeout: float, stdout: str, stderr: str) -> str:
+    return (
+        f"Command timed out after {timeout:g} seconds.\n"
+        f"Stdout: {stdout}\nStderr: {stderr}"
+    )
+
+
+def _error_message(e: Exception) -> str:
+    error_message = f"Error executing command: {str(e)}"
+    logger.error(error_message)
+    return error_message
+
+
+def _result(
+    returncode: Optional[int], stdout: BoundedOutput, stderr: BoundedOutput
+) -> str:
+    """
+    Render the result of a command, `returncode` is None when it timed out.
+    """
+    if returncode is None:
+        error_message = _timeout_message(BASH_TIMEOUT, stdout.render(), stderr.render())
+    elif returncode != 0:
+        error_message = _failure_message(returncode, stdout.render(), stderr.render())
+    else:
+        # Return stdout as the result
+        return stdout.render()
+    logger.error(error_message)
+    return error_message
+
+
+# The command runs in a process group of its own, so that a timeout also
+# kills the processes it started
+_SPAWN_OPTIONS = {
+    "stdout": subprocess.PIPE,
+    "stderr": subprocess.PIPE,
+    "start_new_session": True,
+}
+
+
+def _kill_process_group(pid: int):
+    """Kill the shell and everything it started."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _decoder() -> codecs.IncrementalDecoder:
+    return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def _read_pipe(pipe, output: BoundedOutput):
+    """Read a pipe of a sync command into `output` until it is closed."""
+    decoder = _decoder()
+    while chunk := os.read(pipe.fileno(), READ_SIZE):
+        output.write(decoder.decode(chunk))
+    output.write(decoder.decode(b"", final=True))
+
+
+def _run_bash(
     cmd: Annotated[str, "The bash command to be executed."],
 ):
     """Use this to execute bash command and do necessary operations."""
     logger.info(f"Executing Bash Command: {cmd}")
     try:
-        # Execute the command and capture output
-        result = subprocess.run(
-            cmd, shell=True, check=True, text=True, capture_output=True
-        )
-        # Return stdout as the result
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        # If command fails, return error information
-        error_message = f"Command failed with exit code {e.returncode}.\nStdout: {e.stdout}\nStderr: {e.stderr}"
-        logger.error(error_message)
-        return error_message
+        process = subprocess.Popen(cmd, shell=True, **_SPAWN_OPTIONS)
     except Exception as e:
-        # Catch any other exceptions
-        error_message = f"Error executing command: {str(e)}"
-        logger.error(error_message)
-        return error_message
+        return _error_message(e)
+
+    stdout, stderr = BoundedOutput("stdout"), BoundedOutput("stderr")
+    readers = [
+        threading.Thread(target=_read_pipe, args=(pipe, output), daemon=True)
+        for pipe, output in ((process.stdout, stdout), (process.stderr, stderr))
+    ]
+    for reader in readers:
+        reader.start()
+    # As in the async path, the command has finished once the shell has exited
+    # and its pipes are closed, since processes it started may keep them open
+    deadline = time.monotonic() + BASH_TIMEOUT
+    returncode = None
+    try:
+        process.wait(BASH_TIMEOUT)
+        for reader in readers:
+            reader.join(max(deadline - time.monotonic(), 0))
+        if not any(reader.is_alive() for reader in readers):
+            returncode = process.returncode
+    except subprocess.TimeoutExpired:
+        pass
+    finally:
+        if returncode is None:
+            _kill_process_group(process.pid)
+            process.wait()
+            for reader in readers:
+                reader.join(READER_GRACE)
+        # A pipe still held open by a process that left the group is left to
+        # its reader, which stops writing once the output is closed
+        for reader, pipe in zip(readers, (process.stdout, process.stderr)):
+            if not reader.is_alive():
+                pipe.close()
+        stdout.close()
+        stderr.close()
+    return _result(returncode, stdout, stderr)
+
+
+async def _stream_output(stream: asyncio.StreamReader, output: BoundedOutput):
+    """Read a pipe into `output` and dispatch every chunk as it arrives."""
+    decoder = _decoder()
+    while chunk := await stream.read(READ_SIZE):
+        text = decoder.decode(chunk)
+        output.write(text)
+        if text:
+            await adispatch_custom_event(
+                TOOL_OUTPUT_EVENT,
+                {"tool_name": "bash_tool", "stream": output.name, "delta": text},
+            )
+    output.write(decoder.decode(b"", final=True))
+
+
+async def _arun_bash(
+    cmd: Annotated[str, "The bash command to be executed."],
+):
+    """Use this to execute bash command and do necessary operations."""
+    logger.info(f"Executing Bash Command: {cmd}")
+    try:
+        process = await asyncio.create_subprocess_shell(cmd, **_SPAWN_OPTIONS)
+    except Exception as e:
+        return _error_message(e)
+
+    stdout, stderr = BoundedOutput("stdout"), BoundedOutput("stderr")
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                _stream_output(process.stdout, stdout),
+                _stream_output(process.stderr, stderr),
+                process.wait(),
+            ),
+            BASH_TIMEOUT,
+        )
+        returncode = process.returncode
+    except asyncio.TimeoutError:
+        _kill_process_group(process.pid)
+        await process.wait()
+        returncode = None
+    except asyncio.CancelledError:
+        _kill_process_group(process.pid)
+        raise
+    finally:
+        stdout.close()
+        stderr.close()
+    return _result(returncode, stdout, stderr)
+
+
+bash_tool = StructuredTool.from_function(
+    func=log_io(_run_bash),
+    coroutine=log_io(_arun_bash),
+    name="bash_tool",
+)
 
 
 if __name__ == "__main__":
@@ -5,8 +5,9 @@ from typing import Optional, ClassVar, Type
 from langchain.tools import BaseTool
 from browser_use import AgentHistoryList, Browser, BrowserConfig
 from browser_use import Agent as BrowserAgent
-from src.llms.llm import vl_llm
+from src.llms.llm import get_llm_by_type
 from src.tools.decorators import create_logged_tool
+from src.utils.lazy import lazy_singleton
 from src.config import (
     CHROME_INSTANCE_PATH,
     CHROME_HEADLESS,
@@ -31,7 +32,11 @@ if CHROME_PROXY_SERVER:
         proxy_config["password"] = CHROME_PROXY_PASSWORD
     browser_config.proxy = proxy_config
 
-expected_browser = Browser(config=browser_config)
+
+@lazy_singleton
+def get_browser() -> Browser:
+    """Get the shared browser, created on first use."""
+    return Browser(config=browser_config)
 
 
 class BrowserUseInput(BaseModel):
@@ -62,8 +67,8 @@ class BrowserTool(BaseTool):
         """Run the browser task synchronously."""
         self._agent = BrowserAgent(
             task=instruction,  # Will be set per request
-            llm=vl_llm,
-            browser=expected_browser,
+            llm=get_llm_by_type("vision"),
+            browser=get_browser(),
             generate_gif=generated_gif_path,
         )
 
@@ -93,8 +98,8 @@ class BrowserTool(BaseTool):
         generated_gif_path = f"{BROWSER_HISTORY_DIR}/{uuid.uuid4()}.gif"
         self._agent = BrowserAgent(
             task=instruction,
-            llm=vl_llm,
-            browser=expected_browser,
+            llm=get_llm_by_type("vision"),
+            browser=get_browser(),
             generate_gif=generated_gif_path,  # Will be set per request
         )
         try:
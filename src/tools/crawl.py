@@ -2,7 +2,7 @@ import logging
 from typing import Annotated
 
 from langchain_core.messages import HumanMessage
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 from .decorators import log_io
 
 from src.crawler import Crawler
@@ -10,7 +10,6 @@ from src.crawler import Crawler
 logger = logging.getLogger(__name__)
 
 
-@tool
 @log_io
 def crawl_tool(
     url: Annotated[str, "The url to crawl."],
@@ -24,3 +23,24 @@ def crawl_tool(
         error_msg = f"Failed to crawl. Error: {repr(e)}"
         logger.error(error_msg)
         return error_msg
+
+
+@log_io
+async def acrawl_tool(
+    url: Annotated[str, "The url to crawl."],
+) -> HumanMessage:
+    """Use this to crawl a url and get a readable content in markdown format."""
+    try:
+        crawler = Crawler()
+        article = await crawler.acrawl(url)
+        return {"role": "user", "content": article.to_message()}
+    except Exception as e:
+        # Unlike the sync version, asyncio.CancelledError is not swallowed here.
+        error_msg = f"Failed to crawl. Error: {repr(e)}"
+        logger.error(error_msg)
+        return error_msg
+
+
+# Register both implementations so the tool doesn't block the event loop
+# when agents are run asynchronously.
+crawl_tool = StructuredTool.from_function(func=crawl_tool, coroutine=acrawl_tool)
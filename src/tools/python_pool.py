@@ -0,0 +1,355 @@
+import atexit
+import json
+import logging
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.config import (
+    PYTHON_WORKER_POOL_SIZE,
+    PYTHON_WORKER_WARM,
+    PYTHON_WORKER_PRELOAD,
+    PYTHON_WORKER_CPU_SECONDS,
+    PYTHON_WORKER_MEMORY_MB,
+    PYTHON_WORKER_TIMEOUT,
+    PYTHON_WORKER_IDLE_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "python_worker.py")
+
+# Seconds a new worker may take to start and import the preloaded libraries
+WORKER_START_TIMEOUT = 120
+
+# Session of tool calls made outside of a workflow
+DEFAULT_SESSION = "default"
+
+
+class PythonWorkerError(Exception):
+    """The worker died, or the pool was closed, while running code."""
+
+
+class PythonWorkerTimeout(PythonWorkerError):
+    """The code did not finish within the wall-clock timeout."""
+
+
+class PythonWorker:
+    """
+    A Python interpreter in a separate process, see `python_worker.py`.
+
+    The process starts importing the preloaded libraries right away;
+    the first execution waits until it is ready.
+    """
+
+    def __init__(self, preload: list[str], memory_mb: int, cpu_seconds: float):
+        options = {
+            "preload": preload,
+            "memory_mb": memory_mb,
+            "cpu_seconds": cpu_seconds,
+        }
+        # The protocol has pipes of its own, so that user code cannot read
+        # requests from stdin or write fake responses to stdout
+        request_read, request_write = os.pipe()
+        response_read, response_write = os.pipe()
+        options["request_fd"] = request_read
+        options["response_fd"] = response_write
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, WORKER_SCRIPT, json.dumps(options)],
+                stdin=subprocess.DEVNULL,
+                pass_fds=(request_read, response_write),
+                # Ctrl-C in the server's terminal must not interrupt the workers
+                start_new_session=True,
+            )
+        except BaseException:
+            for fd in (request_write, response_read):
+                os.close(fd)
+            raise
+        finally:
+            os.close(request_read)
+            os.close(response_write)
+        self.requests = os.fdopen(request_write, "w")
+        self.responses = os.fdopen(response_read, "r")
+        self.ready = False
+        self.last_used = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read(self, timeout: float) -> dict:
+        readable, _, _ = select.select([self.responses], [], [], timeout)
+        if not readable:
+            raise PythonWorkerTimeout(f"Execution timed out after {timeout:g} seconds")
+        line = self.responses.readline()
+        if not line:
+            code = self.process.wait()
+            raise PythonWorkerError(f"Python worker exited with code {code}")
+        return json.loads(line)
+
+    def execute(self, code: str, timeout: float) -> str:
+        """Run `code` and return its stdout, or the repr of the error it raised."""
+        if not self.ready:
+            self._read(WORKER_START_TIMEOUT)
+            self.ready = True
+        try:
+            self.requests.write(json.dumps({"code": code}) + "\n")
+            self.requests.flush()
+        except OSError:
+            code = self.process.wait()
+            raise PythonWorkerError(f"Python worker exited with code {code}")
+        return self._read(timeout)["output"]
+
+    def kill(self, close: bool = True):
+        """Kill the process; keep its pipes open if a thread is still reading them."""
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+        if close:
+            self.requests.close()
+            self.responses.close()
+
+
+class PythonWorkerPool:
+    """
+    Worker processes that run the code of `python_repl_tool`.
+
+    Every session, i.e. workflow, gets a worker of its own: variables persist
+    across the calls of one workflow but never leak into another, and a
+    runaway job only stalls its own workflow. Workers are never reused by
+    another session. A finished session's worker is killed and fresh workers
+    are started in the background, so that `warm` workers with the libraries
+    already imported are waiting for the next session.
+
+    When all `size` workers are taken, the least recently used idle session
+    is recycled; when every worker is running code, callers wait in a queue.
+    Sessions idle for `idle_timeout` seconds are recycled as well.
+
+    Args:
+        size: Maximum number of worker processes
+        warm: Number of started workers kept ready for new sessions
+        preload: Modules imported by every worker before it is used
+        memory_mb: Address space limit of a worker, 0 for unlimited
+        cpu_seconds: CPU time limit of an execution, 0 for unlimited
+        timeout: Wall-clock limit of an execution in seconds
+        idle_timeout: Seconds after which an idle session is recycled
+    """
+
+    def __init__(
+        self,
+        size: int,
+        warm: int,
+        preload: list[str],
+        memory_mb: int,
+        cpu_seconds: float,
+        timeout: float,
+        idle_timeout: float,
+    ):
+        self.size = size
+        self.warm = min(warm, size)
+        self.preload = preload
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._condition = threading.Condition()
+        self._warm_workers: list[PythonWorker] = []
+        self._sessions: OrderedDict[str, PythonWorker] = OrderedDict()
+        self._busy: set[str] = set()
+        self._waiting = 0
+        self._closed = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+        self.executions = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycled = 0
+        self.evicted = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+
+    def _spawn(self) -> PythonWorker:
+        return PythonWorker(self.preload, self.memory_mb, self.cpu_seconds)
+
+    def _workers(self) -> int:
+        return len(self._warm_workers) + len(self._sessions)
+
+    def _refill(self):
+        """Start workers until `warm` of them wait for new sessions."""
+        self._warm_workers = [worker for worker in self._warm_workers if worker.alive]
+        while len(self._warm_workers) < self.warm and self._workers() < self.size:
+            self._warm_workers.append(self._spawn())
+
+    def _end_session(self, session_id: str):
+        worker = self._sessions.pop(session_id, None)
+        if worker is not None:
+            worker.kill(close=session_id not in self._busy)
+
+    def _take_worker(self, session_id: str) -> Optional[PythonWorker]:
+        """Return the session's worker, or None if the caller has to wait."""
+        worker = self._sessions.get(session_id)
+        if worker is not None:
+            if session_id in self._busy:
+                return None
+            self._sessions.move_to_end(session_id)
+            return worker
+        self._warm_workers = [worker for worker in self._warm_workers if worker.alive]
+        if self._warm_workers:
+            worker = self._warm_workers.pop(0)
+        elif self._workers() < self.size:
+            worker = self._spawn()
+        else:
+            idle = next((s for s in self._sessions if s not in self._busy), None)
+            if idle is None:
+                return None
+            logger.info(f"Recycling the Python session of {idle} for {session_id}")
+            self._end_session(idle)
+            self.evicted += 1
+            worker = self._spawn()
+        self._sessions[session_id] = worker
+        return worker
+
+    def _acquire(self, session_id: str) -> PythonWorker:
+        with self._condition:
+            if self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=self._recycle_idle_sessions, daemon=True
+                )
+                self._reaper.start()
+            start = time.monotonic()
+            queued = False
+            while (worker := self._take_worker(session_id)) is None:
+                if not queued:
+                    queued = True
+                    self._waiting += 1
+                    self.max_queue_depth = max(self.max_queue_depth, self._waiting)
+                self._condition.wait()
+                if self._closed.is_set():
+                    self._waiting -= 1
+                    raise PythonWorkerError("Python worker pool is closed")
+            if queued:
+                self._waiting -= 1
+            self.total_wait += time.monotonic() - start
+            self._busy.add(session_id)
+            self._refill()
+            return worker
+
+    def _release(
+        self, session_id: str, worker: PythonWorker, error: Optional[Exception]
+    ):
+        with self._condition:
+            self._busy.discard(session_id)
+            worker.last_used = time.monotonic()
+            self.executions += 1
+            if isinstance(error, PythonWorkerTimeout):
+                self.timeouts += 1
+            elif error is not None:
+                self.crashes += 1
+            if self._sessions.get(session_id) is not worker:
+                # The session was ended while the code was running
+                worker.kill()
+            elif error is not None:
+                # Variables of the session are lost with its worker
+                self._end_session(session_id)
+            self._refill()
+            self._condition.notify_all()
+
+    def execute(self, session_id: str, code: str) -> str:
+        """
+        Run `code` in the session's worker.
+
+        Returns:
+            The stdout of the code, or the repr of the error it raised
+
+        Raises:
+            PythonWorkerError: If the worker timed out or died; the session
+                starts over with a fresh worker on its next execution
+        """
+        if self._closed.is_set():
+            raise PythonWorkerError("Python worker pool is closed")
+        worker = self._acquire(session_id)
+        error = None
+        try:
+            return worker.execute(code, self.timeout)
+        except PythonWorkerError as e:
+            error = e
+            raise
+        finally:
+            self._release(session_id, worker, error)
+
+    def end_session(self, session_id: str):
+        """Kill the session's worker, e.g. when its workflow has finished."""
+        with self._condition:
+            if session_id in self._sessions:
+                self._end_session(session_id)
+                self._refill()
+                self._condition.notify_all()
+
+    def _recycle_idle_sessions(self):
+        interval = max(min(self.idle_timeout / 2, 60), 0.1)
+        while not self._closed.wait(interval):
+            with self._condition:
+                now = time.monotonic()
+                idle = [
+                    session_id
+                    for session_id, worker in self._sessions.items()
+                    if session_id not in self._busy
+                    and now - worker.last_used > self.idle_timeout
+                ]
+                for session_id in idle:
+                    logger.info(f"Recycling the idle Python session of {session_id}")
+                    self._end_session(session_id)
+                    self.recycled += 1
+                if idle:
+                    self._refill()
+                    self._condition.notify_all()
+
+    def close(self):
+        """Kill all workers and fail the waiting callers."""
+        with self._condition:
+            self._closed.set()
+            for worker in self._warm_workers:
+                worker.kill()
+            self._warm_workers = []
+            for session_id in list(self._sessions):
+                self._end_session(session_id)
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        """Return the pool size, queue depth and execution counters."""
+        with self._condition:
+            return {
+                "size": self.size,
+                "workers": self._workers(),
+                "warm": len(self._warm_workers),
+                "sessions": len(self._sessions),
+                "busy": len(self._busy),
+                "queue_depth": self._waiting,
+                "max_queue_depth": self.max_queue_depth,
+                "executions": self.executions,
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+                "recycled": self.recycled,
+                "evicted": self.evicted,
+                "average_wait": (
+                    self.total_wait / self.executions if self.executions else 0.0
+                ),
+            }
+
+
+# Shared by all workflows; PYTHON_WORKER_POOL_SIZE=0 runs code in the server process
+python_worker_pool = PythonWorkerPool(
+    size=PYTHON_WORKER_POOL_SIZE,
+    warm=PYTHON_WORKER_WARM,
+    preload=PYTHON_WORKER_PRELOAD,
+    memory_mb=PYTHON_WORKER_MEMORY_MB,
+    cpu_seconds=PYTHON_WORKER_CPU_SECONDS,
+    timeout=PYTHON_WORKER_TIMEOUT,
+    idle_timeout=PYTHON_WORKER_IDLE_TIMEOUT,
+)
+atexit.register(python_worker_pool.close)
@@ -1,15 +1,32 @@
+import asyncio
 import logging
-from typing import Annotated
-from langchain_core.tools import tool
+from typing import Annotated, Optional
+from langchain_core.runnables import ensure_config
+from langchain_core.tools import StructuredTool
 from langchain_experimental.utilities import PythonREPL
 from .decorators import log_io
+from .python_pool import DEFAULT_SESSION, python_worker_pool
 
-# Initialize REPL and logger
+# Initialize REPL and logger, the REPL is used when the worker pool is disabled
 repl = PythonREPL()
 logger = logging.getLogger(__name__)
 
 
-@tool
+def _execute(code: str, workflow_id: Optional[str]) -> str:
+    # Every workflow runs its code in a worker process of its own
+    if python_worker_pool.size:
+        return python_worker_pool.execute(workflow_id or DEFAULT_SESSION, code)
+    return repl.run(code)
+
+
+def _workflow_id() -> Optional[str]:
+    return ensure_config().get("metadata", {}).get("workflow_id")
+
+
+def _success_message(code: str, result: str) -> str:
+    return f"Successfully executed:\n```python\n{code}\n```\nStdout: {result}"
+
+
 @log_io
 def python_repl_tool(
     code: Annotated[
@@ -20,11 +37,39 @@ def python_repl_tool(
     you should print it out with `print(...)`. This is visible to the user."""
     logger.info("Executing Python code")
     try:
-        result = repl.run(code)
+        result = _execute(code, _workflow_id())
         logger.info("Code execution successful")
     except BaseException as e:
         error_msg = f"Failed to execute. Error: {repr(e)}"
         logger.error(error_msg)
         return error_msg
-    result_str = f"Successfully executed:\n```python\n{code}\n```\nStdout: {result}"
-    return result_str
+    return _success_message(code, result)
+
+
+@log_io
+async def apython_repl_tool(
+    code: Annotated[
+        str, "The python code to execute to do further analysis or calculation."
+    ],
+):
+    """Use this to execute python code and do data analysis or calculation. If you want to see the output of a value,
+    you should print it out with `print(...)`. This is visible to the user."""
+    logger.info("Executing Python code")
+    try:
+        # Waiting for the worker blocks, so it happens off the event loop
+        result = await asyncio.to_thread(_execute, code, _workflow_id())
+        logger.info("Code execution successful")
+    except Exception as e:
+        # Unlike the sync version, asyncio.CancelledError is not swallowed here.
+        error_msg = f"Failed to execute. Error: {repr(e)}"
+        logger.error(error_msg)
+        return error_msg
+    return _success_message(code, result)
+
+
+# Both versions run the code in the pool worker of the workflow, or in the
+# in-process REPL when the pool is disabled, so that variables are kept
+# between calls whichever version an agent uses.
+python_repl_tool = StructuredTool.from_function(
+    func=python_repl_tool, coroutine=apython_repl_tool
+)
@@ -0,0 +1,90 @@
+"""
+Worker process of `PythonWorkerPool`, one interpreter session per workflow.
+
+The pool runs this file as a script, so the worker imports none of the
+application. Requests and responses are JSON objects, one per line: the
+worker reads `{"code": ...}` from the request pipe and answers
+`{"output": ...}` on the response pipe, whose fds the pool passes in the
+options. The pool starts the worker with /dev/null as stdin, and its stdout
+is redirected to stderr, so that neither user code nor the output of native
+code and subprocesses can interfere with the protocol.
+"""
+
+import contextlib
+import importlib
+import io
+import json
+import os
+import resource
+import signal
+import sys
+
+
+class CPUTimeLimitExceeded(Exception):
+    pass
+
+
+def _on_cpu_limit(signum, frame):
+    raise CPUTimeLimitExceeded("CPU time limit exceeded")
+
+
+def _cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _set_cpu_limit(seconds: float):
+    """Limit the CPU time of the next execution to `seconds`, 0 for unlimited."""
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(_cpu_time() + seconds) + 1 if seconds else hard
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _execute(code: str, namespace: dict, cpu_seconds: float) -> str:
+    """Run `code` like `PythonREPL.run`: return stdout, or the error's repr."""
+    output = io.StringIO()
+    _set_cpu_limit(cpu_seconds)
+    try:
+        with contextlib.redirect_stdout(output):
+            exec(code, namespace)
+        return output.getvalue()
+    except BaseException as e:
+        return repr(e)
+    finally:
+        _set_cpu_limit(0)
+
+
+def main():
+    options = json.loads(sys.argv[1])
+    requests = os.fdopen(options["request_fd"], "r")
+    channel = os.fdopen(options["response_fd"], "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    # Import the common data libraries before the worker is handed out
+    for module in options["preload"]:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    if options["memory_mb"]:
+        limit = options["memory_mb"] * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    channel.write(json.dumps({"ready": True}) + "\n")
+    channel.flush()
+    for line in requests:
+        request = json.loads(line)
+        output = _execute(request["code"], namespace, options["cpu_seconds"])
+        channel.write(json.dumps({"output": output}) + "\n")
+        channel.flush()
+
+
+if __name__ == "__main__":
+    main()
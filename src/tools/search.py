@@ -1,10 +1,137 @@
+import asyncio
 import logging
+from typing import Any, Optional, Type, TypeVar
 from langchain_community.tools.tavily_search import TavilySearchResults
-from src.config import TAVILY_MAX_RESULTS
+from src.config import (
+    TAVILY_MAX_RESULTS,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_DB_PATH,
+    SEARCH_CACHE_DB_SIZE,
+)
+from src.utils.cache import SingleFlight, TTLCache, make_cache_key, normalize_query
 from .decorators import create_logged_tool
 
 logger = logging.getLogger(__name__)
 
-# Initialize Tavily search tool with logging
+T = TypeVar("T")
+
+# Search result cache, disabled when SEARCH_CACHE_TTL is 0
+search_cache: Optional[TTLCache] = (
+    TTLCache(
+        "search_results",
+        SEARCH_CACHE_SIZE,
+        SEARCH_CACHE_TTL,
+        SEARCH_CACHE_DB_PATH,
+        SEARCH_CACHE_DB_SIZE,
+    )
+    if SEARCH_CACHE_TTL > 0
+    else None
+)
+
+# Concurrent identical searches share one request
+search_flight = SingleFlight()
+
+
+class CachedSearchMixin:
+    """
+    A mixin class that caches the results of a Tavily search tool by
+    normalized query and search options, and lets concurrent identical
+    searches share one request. Failed searches are not cached.
+    """
+
+    def _search_key(self, query: str) -> str:
+        return make_cache_key(
+            "tavily",
+            normalize_query(query),
+            self.max_results,
+            self.search_depth,
+            self.include_domains,
+            self.exclude_domains,
+            self.include_answer,
+            self.include_raw_content,
+            self.include_images,
+        )
+
+    def _cached(self, key: str, count: bool = True) -> Optional[tuple]:
+        if search_cache is None:
+            return None
+        result = search_cache.get(key) if count else search_cache.peek(key)
+        if result is None:
+            return None
+        logger.info("Search cache hit")
+        # (content, artifact) comes back from SQLite as a list
+        return tuple(result)
+
+    def _store(self, key: str, result: tuple) -> tuple:
+        content, _ = result
+        # Errors are returned as strings
+        if search_cache is not None and not isinstance(content, str):
+            search_cache.set(key, list(result))
+        return result
+
+    async def _in_thread(self, fn, *args):
+        """Run a cache call in a thread when it reads or writes SQLite."""
+        if search_cache is not None and search_cache.persistent:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def _run(self, query: str, run_manager: Any = None) -> tuple:
+        key = self._search_key(query)
+        run = super()._run
+
+        def search() -> tuple:
+            # The search may have finished between the lookup and the flight;
+            # this second lookup is not counted as another miss
+            cached = self._cached(key, count=False)
+            if cached is not None:
+                return cached
+            return self._store(key, run(query, run_manager))
+
+        return self._cached(key) or search_flight.do(key, search)
+
+    async def _arun(self, query: str, run_manager: Any = None) -> tuple:
+        key = self._search_key(query)
+        arun = super()._arun
+
+        async def search() -> tuple:
+            cached = await self._in_thread(self._cached, key, False)
+            if cached is not None:
+                return cached
+            result = await arun(query, run_manager)
+            return await self._in_thread(self._store, key, result)
+
+        cached = await self._in_thread(self._cached, key)
+        return cached or await search_flight.ado(key, search)
+
+
+def create_cached_search_tool(base_tool_class: Type[T]) -> Type[T]:
+    """
+    Factory function to create a cached version of a Tavily search tool class.
+
+    Args:
+        base_tool_class: The search tool class to be enhanced with caching
+
+    Returns:
+        A new class that inherits from both CachedSearchMixin and the base tool class
+    """
+
+    class CachedTool(CachedSearchMixin, base_tool_class):
+        pass
+
+    CachedTool.__name__ = f"Cached{base_tool_class.__name__}"
+    return CachedTool
+
+
+def search_cache_stats() -> dict:
+    """Return the hit statistics of the search cache and the shared requests."""
+    stats = {"enabled": search_cache is not None, "shared": search_flight.shared}
+    if search_cache is not None:
+        stats.update(search_cache.stats())
+    return stats
+
+
+# Initialize Tavily search tool with logging and caching
 LoggedTavilySearch = create_logged_tool(TavilySearchResults)
-tavily_tool = LoggedTavilySearch(name="tavily_search", max_results=TAVILY_MAX_RESULTS)
+CachedTavilySearch = create_cached_search_tool(LoggedTavilySearch)
+tavily_tool = CachedTavilySearch(name="tavily_search", max_results=TAVILY_MAX_RESULTS)
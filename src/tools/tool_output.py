@@ -0,0 +1,42 @@
+import logging
+from typing import Annotated
+
+from langchain_core.tools import tool
+
+from src.config import TOOL_OUTPUT_MAX_TOKENS, TOOL_OUTPUT_MAX_BYTES
+from src.utils.tool_output import load_tool_output, read_passages, read_window
+from .decorators import log_io
+
+logger = logging.getLogger(__name__)
+
+
+@tool
+@log_io
+def read_tool_output(
+    handle: Annotated[str, "The handle of the stored output, e.g. out_0123abcd."],
+    offset: Annotated[int, "The character offset to read from."] = 0,
+    query: Annotated[
+        str, "Optional. Read the passages most relevant to this query instead."
+    ] = "",
+) -> str:
+    """Use this to read the full output of an earlier tool call that was shortened. Read it part by part from an
+    offset, or pass a query to read only the relevant passages."""
+    text = load_tool_output(handle)
+    if text is None:
+        return f"Tool output {handle} was not found or has expired."
+    if query:
+        passages = read_passages(
+            text, query, TOOL_OUTPUT_MAX_TOKENS, TOOL_OUTPUT_MAX_BYTES
+        )
+        if passages is not None:
+            return passages
+        logger.info("No passage matches the query, reading from the offset")
+    window, end = read_window(
+        text, offset, TOOL_OUTPUT_MAX_TOKENS, TOOL_OUTPUT_MAX_BYTES
+    )
+    if end < len(text):
+        window += (
+            f"\n\n[Characters {offset} to {end} of {len(text)}. "
+            f"Call read_tool_output with offset={end} to read on.]"
+        )
+    return window
@@ -0,0 +1,230 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    根据任意可JSON序列化的内容生成缓存键。
+
+    Args:
+        *parts: 参与生成缓存键的内容
+
+    Returns:
+        str: 缓存键(SHA-256十六进制摘要)
+    """
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_query(query: str) -> str:
+    """规范化用户请求：统一大小写和空白，去掉首尾的标点。"""
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.strip(" \t.,!?;:。，！？；：")
+
+
+class TTLCache:
+    """
+    带过期时间的LRU缓存，可选使用SQLite持久化。
+
+    内存中最多保留max_size条记录，超出时淘汰最久未使用的记录；
+    配置db_path时，记录同时写入SQLite，在内存未命中时从SQLite读取，
+    进程重启后仍然有效。SQLite中的过期记录在写入时定期清理，
+    配置max_db_size时同时删除超出数量上限的最早写入的记录。
+    缓存值必须可以JSON序列化。线程安全。
+
+    Args:
+        name: 缓存名称，同时作为SQLite表名
+        max_size: 内存中最多保留的记录数量
+        ttl: 记录的有效时间(秒)
+        db_path: SQLite数据库路径，为None时只使用内存
+        max_db_size: SQLite中最多保留的记录数量，为None时不限制
+    """
+
+    # 每写入多少次清理一次SQLite中的过期记录
+    PRUNE_INTERVAL = 100
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        ttl: float,
+        db_path: Optional[str] = None,
+        max_db_size: Optional[int] = None,
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_db_size = max_db_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        if db_path:
+            if os.path.dirname(db_path):
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取未过期的缓存值，不存在或已过期时返回None。"""
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """获取未过期的缓存值，不计入命中统计。"""
+        with self._lock:
+            return self._get(key)
+
+    @property
+    def persistent(self) -> bool:
+        """是否使用SQLite持久化。读写SQLite会阻塞，异步代码应在线程中调用。"""
+        return self._conn is not None
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            f"SELECT value, expires_at FROM {self.name} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        value = json.loads(row[0])
+        self._set_memory(key, row[1], value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """写入缓存值。"""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._set_memory(key, expires_at, value)
+            if self._conn is None:
+                return
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.name} VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at),
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_INTERVAL == 0:
+                self._prune()
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """返回缓存的命中统计。"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        """清空缓存，包括SQLite中的记录。"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute(f"DELETE FROM {self.name}")
+                self._conn.commit()
+
+    def _prune(self) -> None:
+        """删除SQLite中过期和超出数量上限的记录。"""
+        self._conn.execute(
+            f"DELETE FROM {self.name} WHERE expires_at <= ?", (time.time(),)
+        )
+        if self.max_db_size is not None:
+            # 有效时间相同，过期时间最早的记录就是最早写入的记录
+            self._conn.execute(
+                f"DELETE FROM {self.name} WHERE key IN (SELECT key FROM {self.name} "
+                "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_db_size,),
+            )
+
+    def _set_memory(self, key: str, expires_at: float, value: Any) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用。
+
+    同一时刻相同键的调用只执行一次，其他调用者等待并共享它的结果或异常。
+    同步调用在线程之间合并，异步调用在同一事件循环的任务之间合并。
+    等待的调用者被取消时不会取消共享的调用。线程安全。
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._lock = threading.Lock()
+        self._calls: dict[str, concurrent.futures.Future] = {}
+        self._tasks: dict[tuple[asyncio.AbstractEventLoop, str], asyncio.Task] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        """执行fn，或等待正在进行的相同键的调用并返回它的结果。"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = concurrent.futures.Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """do的异步版本。"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._tasks.get((loop, key))
+            if task is None:
+                task = self._tasks[(loop, key)] = loop.create_task(fn())
+                task.add_done_callback(lambda _: self._tasks.pop((loop, key), None))
+            else:
+                self.shared += 1
+        return await asyncio.shield(task)
@@ -0,0 +1,165 @@
+import logging
+from typing import Iterable
+
+from langchain_core.messages import BaseMessage, ToolMessage
+
+from .token_utils import APPROXIMATE_COUNTER, TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# 压缩后的摘要和引用格式
+SUMMARY_FORMAT = "{}\n\n[... {} tokens of earlier {} output omitted ...]"
+REFERENCE_FORMAT = "[Earlier output from {} omitted to save context ({} tokens).]"
+
+
+def count_message_tokens(message, counter: TokenCounter = APPROXIMATE_COUNTER) -> int:
+    """
+    统计单条消息内容的token数量。
+
+    Args:
+        message: BaseMessage或{"role": ..., "content": ...}格式的消息
+        counter (TokenCounter): token计数器，默认按字符数估算
+
+    Returns:
+        int: token数量
+    """
+    content = (
+        message.content if isinstance(message, BaseMessage) else message.get("content")
+    )
+    if isinstance(content, str):
+        return counter.count(content)
+    if isinstance(content, list):
+        # 多模态消息只统计文本部分
+        return sum(
+            counter.count(part.get("text", ""))
+            for part in content
+            if isinstance(part, dict)
+        )
+    return 0
+
+
+def _source_name(message: BaseMessage) -> str:
+    """消息的来源名称：代理名称或工具名称。"""
+    return message.name or message.type
+
+
+def compact_messages(
+    messages: list,
+    max_tokens: int,
+    keep_recent: int,
+    summary_tokens: int,
+    compactable_names: Iterable[str],
+    counter: TokenCounter = APPROXIMATE_COUNTER,
+) -> list:
+    """
+    压缩消息历史，使其token数量不超过预算。
+
+    用户消息、计划等非代理输出始终原样保留。可以压缩的消息按优先级从低到高、
+    从旧到新依次压缩，工具输出(例如抓取的网页)优先于代理输出：
+    1. 先将最近keep_recent条以外的消息压缩为不超过summary_tokens的摘要
+    2. 仍然超出预算时，替换为只说明来源的引用
+    3. 仍然超出预算时，截断最近消息中最大的代理输出或工具输出，但不少于
+       summary_tokens
+
+    原消息不会被修改，被压缩的消息会以副本的形式出现在返回列表中。
+    被压缩的消息及其压缩前后的token数量会记录在日志中。
+
+    Args:
+        messages (list): 消息历史
+        max_tokens (int): 消息历史的token预算
+        keep_recent (int): 前两轮不压缩的最近消息数量
+        summary_tokens (int): 每条消息压缩后摘要的最大token数量
+        compactable_names (Iterable[str]): 可以被压缩的消息发送者名称(代理名称)，
+            工具输出总是可以被压缩
+        counter (TokenCounter): token计数器，默认按字符数估算
+
+    Returns:
+        list: 压缩后的消息列表，未超出预算时返回原列表
+    """
+    tokens = [count_message_tokens(message, counter) for message in messages]
+    total = sum(tokens)
+    if total <= max_tokens:
+        return messages
+
+    compactable_names = set(compactable_names)
+    compactable = [
+        index
+        for index, message in enumerate(messages)
+        if isinstance(message, BaseMessage)
+        and isinstance(message.content, str)
+        and (isinstance(message, ToolMessage) or message.name in compactable_names)
+    ]
+    recent_start = max(len(messages) - keep_recent, 0)
+    # 工具输出的优先级低于代理输出，先被压缩
+    candidates = sorted(
+        (index for index in compactable if index < recent_start),
+        key=lambda index: (not isinstance(messages[index], ToolMessage), index),
+    )
+    original_tokens = {index: tokens[index] for index in compactable}
+    result = list(messages)
+
+    def replace(index: int, content: str):
+        nonlocal total
+        result[index] = messages[index].model_copy(update={"content": content})
+        new_tokens = counter.count(content)
+        total += new_tokens - tokens[index]
+        tokens[index] = new_tokens
+
+    def summarize(index: int, max_summary_tokens: int):
+        name = _source_name(messages[index])
+        # 摘要说明本身也占用token
+        overhead = counter.count(
+            SUMMARY_FORMAT.format("", original_tokens[index], name)
+        )
+        head = counter.truncate(
+            messages[index].content, max(max_summary_tokens - overhead, 0)
+        )
+        omitted = original_tokens[index] - counter.count(head)
+        summary = SUMMARY_FORMAT.format(head, omitted, name)
+        if counter.count(summary) < tokens[index]:
+            replace(index, summary)
+
+    # 第一轮：将较早的消息截断为摘要
+    for index in candidates:
+        if total <= max_tokens:
+            break
+        if tokens[index] > summary_tokens:
+            summarize(index, summary_tokens)
+
+    # 第二轮：仍然超出预算时，将摘要替换为引用
+    for index in candidates:
+        if total <= max_tokens:
+            break
+        name = _source_name(messages[index])
+        replace(index, REFERENCE_FORMAT.format(name, original_tokens[index]))
+
+    # 第三轮：仍然超出预算时，从最大的开始截断最近的消息
+    recent = sorted(
+        (index for index in compactable if index >= recent_start),
+        key=lambda index: tokens[index],
+        reverse=True,
+    )
+    for index in recent:
+        if total <= max_tokens:
+            break
+        target = max(tokens[index] - (total - max_tokens), summary_tokens)
+        if target < tokens[index]:
+            summarize(index, target)
+
+    compacted = [
+        f"{_source_name(messages[index])} #{index}: "
+        f"{original_tokens[index]} -> {tokens[index]}"
+        for index in compactable
+        if result[index] is not messages[index]
+    ]
+    if total > max_tokens:
+        logger.warning(
+            f"Context still exceeds budget after compaction: {total} > {max_tokens} "
+            f"tokens ({counter.name}); compacted {', '.join(compacted)}"
+        )
+    else:
+        logger.info(
+            f"Context compacted to {total} tokens (budget {max_tokens}, "
+            f"{counter.name}): {', '.join(compacted)}"
+        )
+    return result
@@ -1,6 +1,7 @@
 import logging
 import json
 import json_repair
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -31,3 +32,74 @@ def repair_json_output(content: str) -> str:
         except Exception as e:
             logger.warning(f"JSON repair failed: {e}")
     return content
+
+
+class JSONFieldScanner:
+    """增量扫描流式输出的JSON对象，顶层字符串字段的值一旦完整即可读取。
+
+    用于在LLM流式输出JSON时提前得到决策，而不必等待整个响应结束。
+    遇到JSON对象之前的其他内容(例如代码块标记)或顶层不是对象时，
+    扫描器标记为失败，调用方应回退到完整解析。
+
+    Args:
+        key: 需要读取的顶层字段名
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.value: Optional[str] = None
+        self.failed = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buffer: list[str] = []
+        # 当前是否期待顶层对象的字段名，以及最近读取的字段名
+        self._expect_key = False
+        self._current_key: Optional[str] = None
+
+    def feed(self, text: str) -> Optional[str]:
+        """输入新的一段文本。
+
+        Returns:
+            字段值完整后返回该值，否则返回None
+        """
+        for char in text:
+            if self.value is not None or self.failed:
+                break
+            if self._in_string:
+                self._feed_string(char)
+            elif char == '"':
+                self._in_string = True
+                self._buffer = []
+            elif char in "{[":
+                if self._depth == 0 and char == "[":
+                    self.failed = True
+                self._depth += 1
+                self._expect_key = self._depth == 1
+            elif char in "}]":
+                self._depth -= 1
+            elif char == "," and self._depth == 1:
+                self._expect_key = True
+                self._current_key = None
+            elif self._depth == 0 and not char.isspace():
+                self.failed = True
+        return self.value
+
+    def _feed_string(self, char: str) -> None:
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            if self._depth == 1:
+                self._close_string(json.loads('"' + "".join(self._buffer) + '"'))
+            return
+        self._buffer.append(char)
+
+    def _close_string(self, string: str) -> None:
+        if self._expect_key:
+            self._current_key = string
+            self._expect_key = False
+        elif self._current_key == self.key:
+            self.value = string
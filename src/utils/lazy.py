@@ -0,0 +1,32 @@
+import functools
+import threading
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def lazy_singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    将无参数的工厂函数包装为延迟创建的单例。
+
+    首次调用时才创建对象，之后的调用返回同一个对象。
+    多个线程同时首次调用时也只会创建一次。
+
+    Args:
+        factory (Callable[[], T]): 创建对象的函数
+
+    Returns:
+        Callable[[], T]: 返回单例对象的函数
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(factory)
+    def get_instance() -> T:
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    return get_instance
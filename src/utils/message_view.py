@@ -0,0 +1,62 @@
+from collections.abc import Sequence
+from typing import Any, Callable
+
+from langchain_core.messages import BaseMessage
+
+
+def get_content(message) -> Any:
+    """
+    获取消息内容，支持BaseMessage和{"role": ..., "content": ...}格式的消息。
+    """
+    if isinstance(message, BaseMessage):
+        return message.content
+    return message["content"]
+
+
+def with_content(message, content: Any):
+    """
+    返回替换了内容的新消息，原消息不会被修改。
+
+    只做浅复制：除content外的字段(additional_kwargs等)与原消息共享。
+
+    Args:
+        message: BaseMessage或{"role": ..., "content": ...}格式的消息
+        content: 新的消息内容
+
+    Returns:
+        与原消息类型相同、内容被替换的消息
+    """
+    if isinstance(message, BaseMessage):
+        return message.model_copy(update={"content": content})
+    return {**message, "content": content}
+
+
+class MessageView(Sequence):
+    """
+    消息列表的只读视图，在访问消息时才应用展示变换。
+
+    用于在调用LLM前对消息做展示层面的调整(例如包装代理输出格式、附加搜索结果)，
+    无需深复制整个消息历史。未被变换的消息直接返回原对象，
+    被变换的消息在访问时由变换函数生成浅复制。
+
+    Args:
+        messages: 底层消息列表，不会被修改
+        transform: 变换函数，参数为(下标, 消息)，返回原消息或新消息
+    """
+
+    def __init__(self, messages: Sequence, transform: Callable[[int, Any], Any]):
+        self._messages = messages
+        self._transform = transform
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        return self._transform(index, self._messages[index])
+
+    def __repr__(self) -> str:
+        return f"MessageView({list(self)!r})"
@@ -0,0 +1,159 @@
+import functools
+import logging
+import re
+from typing import Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+# 中日韩字符通常每个字符对应一个token，其他文本平均约4个字符对应一个token
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    """
+    估算文本的token数量。
+
+    不依赖具体模型的分词器，只用于上下文预算控制，结果是近似值。
+
+    Args:
+        text (str): 待估算的文本
+
+    Returns:
+        int: 估算的token数量
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return cjk_count + (other_count + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    截断文本，使其估算的token数量不超过max_tokens。
+
+    Args:
+        text (str): 待截断的文本
+        max_tokens (int): 最大token数量
+
+    Returns:
+        str: 截断后的文本，未超出预算时返回原文本
+    """
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    # 按比例估算截断位置，再逐步收缩直到满足预算
+    end = len(text) * max_tokens // total
+    while end > 0 and count_tokens(text[:end]) > max_tokens:
+        end -= max(1, end // 20)
+    return text[: max(end, 0)]
+
+
+class TokenCounter(Protocol):
+    """token计数器：统计和截断文本的token数量。"""
+
+    name: str
+
+    def count(self, text: str) -> int: ...
+
+    def truncate(self, text: str, max_tokens: int) -> str: ...
+
+
+class ApproximateTokenCounter:
+    """按字符数估算token数量，不需要分词器文件，速度最快。"""
+
+    name = "approximate"
+
+    def count(self, text: str) -> int:
+        return count_tokens(text)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return truncate_to_tokens(text, max_tokens)
+
+
+class TiktokenCounter:
+    """使用tiktoken分词器统计token数量，结果与使用该分词器的模型一致。
+
+    Args:
+        encoding: tiktoken的编码对象
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.name = encoding.name
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        # 截断位置可能落在多字节字符中间，丢弃不完整的字符
+        head = self.encoding.decode_bytes(tokens[: max(max_tokens, 0)])
+        return head.decode("utf-8", errors="ignore")
+
+
+APPROXIMATE_COUNTER = ApproximateTokenCounter()
+
+# tiktoken不认识的模型(例如DeepSeek、Qwen)使用的编码
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@functools.cache
+def _load_encoding(name: str):
+    """
+    加载tiktoken编码，无法加载时返回None。
+
+    每个编码只尝试加载一次：离线且没有缓存时，tiktoken每次都要等待下载失败。
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"Tokenizer {name} unavailable, estimating tokens: {e!r}")
+        return None
+
+
+@functools.cache
+def get_token_counter(
+    model: Optional[str] = None, mode: str = "tiktoken"
+) -> TokenCounter:
+    """
+    获取模型的token计数器。
+
+    mode为tiktoken时使用模型对应的tiktoken编码，tiktoken不认识的模型使用
+    cl100k_base；tiktoken不可用或编码文件无法加载时(例如离线且没有缓存)
+    回退到估算。mode为approximate时直接按字符数估算。
+
+    首次加载编码可能需要下载编码文件，在事件循环中使用前应先在启动时
+    或线程中调用，参见load_token_counters。
+
+    Args:
+        model (Optional[str]): 模型名称，LiteLLM格式的provider前缀会被忽略
+        mode (str): tiktoken或approximate
+
+    Returns:
+        TokenCounter: token计数器
+    """
+    if mode == "approximate":
+        return APPROXIMATE_COUNTER
+    try:
+        import tiktoken
+    except ImportError as e:
+        logger.warning(f"Tokenizer for {model} unavailable, estimating tokens: {e!r}")
+        return APPROXIMATE_COUNTER
+    try:
+        encoding_name = tiktoken.encoding_name_for_model(
+            (model or "").rsplit("/", 1)[-1]
+        )
+    except KeyError:
+        encoding_name = DEFAULT_ENCODING
+    encoding = _load_encoding(encoding_name)
+    if encoding is None:
+        return APPROXIMATE_COUNTER
+    return TiktokenCounter(encoding)
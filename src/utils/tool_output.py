@@ -0,0 +1,323 @@
+import json
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Optional
+
+from src.config import (
+    TOKEN_COUNTER,
+    TOOL_OUTPUT_STORE_SIZE,
+    TOOL_OUTPUT_TTL,
+    TOOL_OUTPUT_DB_PATH,
+)
+
+from .cache import TTLCache, make_cache_key
+from .token_utils import TokenCounter, get_token_counter
+
+logger = logging.getLogger(__name__)
+
+# 被截短的工具输出末尾附加的说明，告诉代理如何读取完整输出
+SHAPED_NOTICE = (
+    "\n\n[Tool output shortened from {} to {} tokens. The full output is stored "
+    'as "{}": call read_tool_output with this handle to read the rest, '
+    "optionally from an offset or for a query.]"
+)
+
+# 头尾截断时头部所占的比例
+HEAD_SHARE = 2 / 3
+
+# 省略的段落之间的标记
+PASSAGE_GAP = "\n\n[...]\n\n"
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]{2,}|\d+", re.UNICODE)
+_CJK_RUN_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]+")
+
+# 完整的工具输出，按句柄保存
+tool_output_store = TTLCache(
+    "tool_outputs", TOOL_OUTPUT_STORE_SIZE, TOOL_OUTPUT_TTL, TOOL_OUTPUT_DB_PATH
+)
+
+
+def store_tool_output(text: str) -> str:
+    """保存完整的工具输出，返回读取它的句柄。相同的输出得到相同的句柄。"""
+    handle = "out_" + make_cache_key(text)[:16]
+    tool_output_store.set(handle, text)
+    return handle
+
+
+def load_tool_output(handle: str) -> Optional[str]:
+    """读取保存的工具输出，不存在或已过期时返回None。"""
+    return tool_output_store.get(handle.strip().strip("\"'`"))
+
+
+def content_text(content: Any) -> str:
+    """
+    将工具输出转换为文本。
+
+    多模态内容块中的图片保留为markdown图片链接；crawl_tool返回的
+    {"role": ..., "content": [...]}消息在序列化为JSON后同样会被还原为文本。
+    """
+    if isinstance(content, str):
+        if content.startswith("{"):
+            try:
+                message = json.loads(content)
+            except ValueError:
+                return content
+            if isinstance(message, dict) and isinstance(message.get("content"), list):
+                return content_text(message["content"])
+        return content
+    if isinstance(content, list):
+        parts = []
+        for part in content:
+            if isinstance(part, str):
+                parts.append(part)
+            elif part.get("type") == "text":
+                parts.append(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                parts.append(f"![]({part['image_url']['url']})")
+        return "\n\n".join(part for part in parts if part)
+    return str(content)
+
+
+class _Budget:
+    """token和字节数上限，0表示不限制。"""
+
+    def __init__(self, counter: TokenCounter, max_tokens: int, max_bytes: int):
+        self.counter = counter
+        self.max_tokens = max_tokens
+        self.max_bytes = max_bytes
+
+    def fits(self, text: str) -> bool:
+        if self.max_bytes and len(text.encode("utf-8")) > self.max_bytes:
+            return False
+        return not self.max_tokens or self.counter.count(text) <= self.max_tokens
+
+    def measure(self, text: str) -> tuple[int, int]:
+        """返回text的(token数, 字节数)，不限制token数时不计数。"""
+        tokens = self.counter.count(text) if self.max_tokens else 0
+        return tokens, len(text.encode("utf-8"))
+
+    def fits_size(self, tokens: int, size: int) -> bool:
+        if self.max_bytes and size > self.max_bytes:
+            return False
+        return not self.max_tokens or tokens <= self.max_tokens
+
+    def share(self, ratio: float) -> "_Budget":
+        return _Budget(
+            self.counter, int(self.max_tokens * ratio), int(self.max_bytes * ratio)
+        )
+
+    def after(self, text: str) -> "_Budget":
+        """返回减去text占用之后剩余的预算。"""
+        tokens = self.counter.count(text) if self.max_tokens else 0
+        size = len(text.encode("utf-8"))
+        return _Budget(
+            self.counter,
+            max(self.max_tokens - tokens, 1) if self.max_tokens else 0,
+            max(self.max_bytes - size, 1) if self.max_bytes else 0,
+        )
+
+    def max_chars(self, text: str) -> int:
+        # 字符数不会超过字节数，用来缩小二分查找的范围
+        return min(len(text), self.max_bytes) if self.max_bytes else len(text)
+
+
+def _fit_prefix(text: str, budget: _Budget) -> str:
+    """在预算内尽量长的前缀，尽量在换行处截断。"""
+    low, high = 0, budget.max_chars(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if budget.fits(text[:middle]):
+            low = middle
+        else:
+            high = middle - 1
+    newline = text.rfind("\n", 0, low)
+    if low < len(text) and newline > low * 3 // 4:
+        low = newline
+    return text[:low]
+
+
+def _fit_suffix(text: str, budget: _Budget) -> str:
+    """在预算内尽量长的后缀，尽量在换行处截断。"""
+    low, high = 0, budget.max_chars(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if budget.fits(text[len(text) - middle :]):
+            low = middle
+        else:
+            high = middle - 1
+    start = len(text) - low
+    newline = text.find("\n", start, start + low // 4)
+    if start > 0 and newline >= 0:
+        start = newline + 1
+    return text[start:]
+
+
+def head_tail(text: str, budget: _Budget) -> str:
+    """保留预算内的开头和结尾，确定性地截断中间部分。"""
+    head = _fit_prefix(text, budget.share(HEAD_SHARE))
+    rest = text[len(head) :]
+    tail = _fit_suffix(rest, budget.after(head + PASSAGE_GAP))
+    return head + PASSAGE_GAP + tail
+
+
+def _terms(text: str) -> list[str]:
+    """提取用于相关性打分的词：拉丁文等按单词，中日韩文字按相邻两个字。"""
+    text = text.lower()
+    terms = _WORD_PATTERN.findall(_CJK_RUN_PATTERN.sub(" ", text))
+    for run in _CJK_RUN_PATTERN.findall(text):
+        terms.extend(run[i : i + 2] for i in range(max(len(run) - 1, 1)))
+    return terms
+
+
+def select_passages(text: str, query: str, budget: _Budget) -> Optional[str]:
+    """
+    选择与query最相关的段落，按原文顺序拼接。
+
+    第一段(通常是标题和导语)总是保留。段落按查询词的出现次数和稀有程度打分，
+    分数相同时靠前的段落优先。
+
+    Returns:
+        选出的段落；没有段落与query相关时返回None
+    """
+    passages = [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+    query_terms = set(_terms(query))
+    if len(passages) < 2 or not query_terms:
+        return None
+    passage_terms = [Counter(_terms(passage)) for passage in passages]
+    document_frequency = Counter(
+        term for terms in passage_terms for term in query_terms & terms.keys()
+    )
+    scores = [
+        sum(
+            min(terms[term], 3) * math.log(1 + len(passages) / document_frequency[term])
+            for term in query_terms & terms.keys()
+        )
+        for terms in passage_terms
+    ]
+    if not any(scores[1:]):
+        return None
+
+    ranked = sorted(range(1, len(passages)), key=lambda i: (-scores[i], i))
+    # 每个段落和分隔符只计数一次，候选组合的大小按段落累加，
+    # 不必对每个候选组合重新计数整段拼接后的文本
+    sizes = [budget.measure(passage) for passage in passages]
+    separators = {
+        separator: budget.measure(separator)
+        for separator in ("\n\n", PASSAGE_GAP, PASSAGE_GAP.rstrip())
+    }
+    selected = [0]
+    added = []
+    for index in ranked:
+        if not scores[index]:
+            break
+        candidate = sorted(selected + [index])
+        if budget.fits_size(*_selection_size(candidate, sizes, separators)):
+            selected = candidate
+            added.append(index)
+    # 分词器在段落边界可能合并token，累加的token数只是近似值，最后再核对一次
+    while added and not budget.fits(_join_passages(passages, selected)):
+        selected.remove(added.pop())
+    if len(selected) == 1:
+        return None
+    return _join_passages(passages, selected)
+
+
+def _selection_size(
+    indexes: list[int], sizes: list[tuple[int, int]], separators: dict
+) -> tuple[int, int]:
+    """按_join_passages的拼接方式累加选中段落的(token数, 字节数)。"""
+    parts = [sizes[indexes[0]]]
+    for previous, index in zip(indexes, indexes[1:]):
+        parts.append(separators["\n\n" if index == previous + 1 else PASSAGE_GAP])
+        parts.append(sizes[index])
+    if indexes[-1] != len(sizes) - 1:
+        parts.append(separators[PASSAGE_GAP.rstrip()])
+    return sum(tokens for tokens, _ in parts), sum(size for _, size in parts)
+
+
+def _join_passages(passages: list[str], indexes: list[int]) -> str:
+    text = passages[indexes[0]]
+    for previous, index in zip(indexes, indexes[1:]):
+        text += ("\n\n" if index == previous + 1 else PASSAGE_GAP) + passages[index]
+    if indexes[-1] != len(passages) - 1:
+        text += PASSAGE_GAP.rstrip()
+    return text
+
+
+def shape_tool_output(
+    content: Any,
+    max_tokens: int,
+    max_bytes: int,
+    query: Optional[str] = None,
+    counter: Optional[TokenCounter] = None,
+) -> tuple[Any, Optional[str]]:
+    """
+    将工具输出限制在token和字节数上限内。
+
+    未超过上限的输出原样返回。超过上限时，完整输出以文本形式保存并得到一个句柄，
+    返回的内容为与query最相关的段落(提供query且有相关段落时)，
+    否则为开头和结尾，末尾附加说明如何通过句柄读取完整输出。
+
+    Args:
+        content: 工具输出，字符串或内容块列表
+        max_tokens: token上限，0表示不限制
+        max_bytes: UTF-8字节数上限，0表示不限制
+        query: 用于选择相关段落的查询，例如搜索词或用户请求
+        counter: token计数器，默认使用TOKEN_COUNTER配置的计数器
+
+    Returns:
+        (限制后的内容, 完整输出的句柄)；未超过上限时句柄为None
+    """
+    if not max_tokens and not max_bytes:
+        return content, None
+    counter = counter or get_token_counter(mode=TOKEN_COUNTER)
+    text = content_text(content)
+    budget = _Budget(counter, max_tokens, max_bytes)
+    if isinstance(content, (str, list)) and budget.fits(text):
+        return content, None
+
+    total = counter.count(text)
+    # 为说明预留空间，说明中的数字不会超过total的位数
+    body_budget = budget.after(SHAPED_NOTICE.format(total, total, "out_" + "0" * 16))
+    body = None
+    if query:
+        body = select_passages(text, query, body_budget)
+    if body is None:
+        body = head_tail(text, body_budget)
+    handle = store_tool_output(text)
+    shown = counter.count(body)
+    logger.info(f"Tool output shortened from {total} to {shown} tokens as {handle}")
+    return body + SHAPED_NOTICE.format(total, shown, handle), handle
+
+
+def read_window(
+    text: str,
+    offset: int,
+    max_tokens: int,
+    max_bytes: int,
+    counter: Optional[TokenCounter] = None,
+) -> tuple[str, int]:
+    """
+    从offset(字符位置)开始读取不超过上限的一段输出。
+
+    Returns:
+        (读取的内容, 下一段的起始位置)
+    """
+    counter = counter or get_token_counter(mode=TOKEN_COUNTER)
+    rest = text[max(offset, 0) :]
+    window = _fit_prefix(rest, _Budget(counter, max_tokens, max_bytes)) or rest[:1]
+    return window, max(offset, 0) + len(window)
+
+
+def read_passages(
+    text: str,
+    query: str,
+    max_tokens: int,
+    max_bytes: int,
+    counter: Optional[TokenCounter] = None,
+) -> Optional[str]:
+    """读取输出中与query最相关的段落，不超过上限；没有相关段落时返回None。"""
+    counter = counter or get_token_counter(mode=TOKEN_COUNTER)
+    return select_passages(text, query, _Budget(counter, max_tokens, max_bytes))
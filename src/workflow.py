@@ -1,6 +1,6 @@
 import logging
 from src.config import TEAM_MEMBERS
-from src.graph import build_graph
+from src.graph import get_graph
 
 # 配置日志系统
 logging.basicConfig(
@@ -16,10 +16,6 @@ def enable_debug_logging():
 
 logger = logging.getLogger(__name__)
 
-# 创建LangGraph工作流图
-# 这是系统的核心组件，定义了各个代理之间的协作关系
-graph = build_graph()
-
 
 def run_agent_workflow(user_input: str, debug: bool = False):
     """运行代理工作流处理用户输入。
@@ -55,13 +51,15 @@ def run_agent_workflow(user_input: str, debug: bool = False):
     # 1. 团队成员列表(常量)
     # 2. 用户输入消息
     # 3. 工作流配置参数(深度思考模式和搜索辅助规划)
-    result = graph.invoke(
+    # 工作流图在首次运行时才构建，之后复用同一个实例
+    result = get_graph().invoke(
         {
             # 常量配置
             "TEAM_MEMBERS": TEAM_MEMBERS,  # 所有可用的代理列表
-
             # 运行时变量
-            "messages": [{"role": "user", "content": user_input}],  # 转换用户输入为消息格式
+            "messages": [
+                {"role": "user", "content": user_input}
+            ],  # 转换用户输入为消息格式
             "deep_thinking_mode": True,  # 启用深度思考模式，使用更强大的推理LLM
             "search_before_planning": True,  # 启用搜索辅助规划，在计划前执行相关搜索
         }
@@ -76,4 +74,4 @@ if __name__ == "__main__":
     # 使用Mermaid格式可视化工作流图结构
     # 可以将输出复制到Mermaid在线编辑器查看图形化表示
     # https://mermaid-js.github.io/mermaid-live-editor/
-    print(graph.get_graph().draw_mermaid())
+    print(get_graph().get_graph().draw_mermaid())
@@ -0,0 +1,76 @@
+import asyncio
+from unittest.mock import patch
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import src.llms.cache as llm_cache
+from src.graph import classifier
+from src.llms.cache import create_cached_llm
+from src.service.accounting import WorkflowAccountant
+from src.service.workflow_service import run_agent_workflow
+from src.utils.cache import TTLCache
+from src.utils.token_utils import count_tokens
+
+
+class EchoChatModel(BaseChatModel):
+    """A chat model that answers with the last message."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = AIMessage(content=messages[-1].content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def test_workflow_summary_event():
+    """Test that a workflow ends with a per-node usage summary."""
+
+    async def collect():
+        return [
+            event
+            async for event in run_agent_workflow(
+                [{"role": "user", "content": "Hello"}]
+            )
+        ]
+
+    # The keyword classifier answers the greeting from a template, without the network
+    with patch.object(classifier, "_classifier", classifier.KeywordClassifier()):
+        events = asyncio.run(collect())
+    assert events[-1]["event"] == "workflow_summary"
+    summary = events[-1]["data"]
+    coordinator = summary["nodes"]["coordinator"]
+    # The templated answer never reached a provider
+    assert coordinator["llm_calls"] == 0
+    assert coordinator["replayed_calls"] == 1
+    assert coordinator["completion_tokens"] == 0
+    assert summary["total"]["llm_calls"] == 0
+    call = summary["calls"][0]
+    assert call["node"] == "coordinator"
+    assert call["langgraph_step"] == 1
+    assert call["source"] == "replay"
+    assert call["ttft"] is not None
+
+
+def test_cached_responses_are_not_llm_calls(monkeypatch):
+    """Test that response cache hits are reported apart from the model calls."""
+    monkeypatch.setattr(
+        llm_cache, "llm_response_cache", TTLCache("llm_responses", 8, 60)
+    )
+    llm = create_cached_llm(EchoChatModel)()
+    accountant = WorkflowAccountant("workflow")
+    config = {"callbacks": [accountant]}
+    llm.invoke("what is mcp?", config)
+    llm.invoke("what is mcp?", config)
+    # A stream closed early is still reported as a cache hit
+    stream = llm.stream("what is mcp?", config)
+    next(stream)
+    stream.close()
+
+    total = accountant.summary()["total"]
+    assert total["llm_calls"] == 1
+    assert total["cached_calls"] == 2
+    assert total["completion_tokens"] == count_tokens("what is mcp?")
@@ -0,0 +1,372 @@
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+import httpx
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import src.graph.nodes as nodes
+from src.config import TEAM_MEMBERS
+from src.crawler import crawler as crawler_module
+from src.crawler import jina_client
+from src.crawler.article import Article
+from src.crawler.jina_client import JinaClient
+from src.graph import build_graph
+from src.llms.http import LoopAsyncClient
+from src.llms.replay import ReplayChatModel
+from src.tools.crawl import crawl_tool
+
+PLAN = json.dumps(
+    {
+        "thought": "Research, then code.",
+        "title": "Quantum computing",
+        "steps": [
+            {"agent_name": "researcher", "title": "Research", "description": "R"},
+            {"agent_name": "coder", "title": "Code", "description": "C"},
+        ],
+    }
+)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """A chat model that answers with the next of its responses on every call."""
+
+    responses: list[str]
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _next(self) -> str:
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(self._next()))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        content = self._next()
+        for start in range(0, len(content), 8):
+            chunk = AIMessageChunk(content=content[start : start + 8])
+            yield ChatGenerationChunk(message=chunk)
+
+
+class StubAgent:
+    """An agent that answers with a fixed response and records how it was called."""
+
+    def __init__(self, response: str):
+        self.response = response
+        self.calls = []
+
+    def invoke(self, state):
+        self.calls.append("invoke")
+        return {"messages": [*state["messages"], AIMessage(self.response)]}
+
+    async def ainvoke(self, state):
+        self.calls.append("ainvoke")
+        return {"messages": [*state["messages"], AIMessage(self.response)]}
+
+
+class StubSearch:
+    def invoke(self, input):
+        return [{"title": "Qubits", "content": input["query"], "url": "u"}]
+
+    async def ainvoke(self, input):
+        return self.invoke(input)
+
+
+def _state(**kwargs) -> dict:
+    return {
+        "messages": [HumanMessage(content="Research quantum computing")],
+        "TEAM_MEMBERS": TEAM_MEMBERS,
+        "full_plan": PLAN,
+        **kwargs,
+    }
+
+
+def _both(node, anode, state: dict):
+    """Run the sync and async implementation of a node on the same state."""
+    return node(state), asyncio.run(anode(state))
+
+
+@pytest.fixture
+def agents():
+    agents = {
+        "researcher": StubAgent("Qubits are neat."),
+        "coder": StubAgent('```json\n{"result": 42}\n```'),
+        "browser": StubAgent("Browsed."),
+    }
+    with (
+        patch.object(nodes, "get_research_agent", lambda: agents["researcher"]),
+        patch.object(nodes, "get_coder_agent", lambda: agents["coder"]),
+        patch.object(nodes, "get_browser_agent", lambda: agents["browser"]),
+        patch.object(nodes, "get_plan_cache_key", lambda _: None),
+        patch.object(nodes, "classify_request", lambda _: None),
+        patch.object(nodes, "tavily_tool", StubSearch()),
+    ):
+        yield agents
+
+
+def test_agent_nodes_match(agents):
+    """Test that the async agent nodes return the same commands as the sync ones."""
+    pairs = [
+        (nodes.research_node, nodes.aresearch_node, "researcher"),
+        (nodes.code_node, nodes.acode_node, "coder"),
+        (nodes.browser_node, nodes.abrowser_node, "browser"),
+    ]
+    for node, anode, name in pairs:
+        for parallel_execution in (False, True):
+            command, acommand = _both(
+                node, anode, _state(parallel_execution=parallel_execution)
+            )
+            assert command == acommand
+            assert command.goto == ("executor" if parallel_execution else "supervisor")
+            assert command.update["messages"][0].name == name
+        assert agents[name].calls == ["invoke", "ainvoke"] * 2
+
+
+def test_supervisor_nodes_match(agents):
+    """Test routing by the LLM and by the plan."""
+    for content in ('{"next": "coder"}', '{"next": "FINISH"}'):
+        with patch.object(
+            nodes, "get_llm_by_type", lambda _: ReplayChatModel(content=content)
+        ):
+            command, acommand = _both(
+                nodes.supervisor_node, nodes.asupervisor_node, _state()
+            )
+        assert command == acommand
+    assert command.goto == "__end__"
+
+    # Deterministic routing does not call the LLM at all
+    state = _state(deterministic_routing=True, plan_cursor=0)
+    state["messages"] = [*state["messages"], HumanMessage(PLAN, name="planner")]
+    with patch.object(nodes, "get_llm_by_type", None):
+        command, acommand = _both(nodes.supervisor_node, nodes.asupervisor_node, state)
+    assert command == acommand
+    assert command.goto == "researcher"
+    assert command.update["plan_cursor"] == 1
+
+
+def test_executor_nodes_match(agents):
+    """Test that both executors dispatch the same wave of steps."""
+    state = _state(parallel_execution=True, plan_cursor=0)
+    command, acommand = _both(nodes.executor_node, nodes.aexecutor_node, state)
+    assert command == acommand
+    assert [send.node for send in command.goto] == ["researcher"]
+
+
+def test_planner_nodes_match(agents):
+    """Test planning with and without the search, and an invalid plan."""
+    for search_before_planning in (False, True):
+        with patch.object(
+            nodes, "get_llm_by_type", lambda _: ReplayChatModel(content=PLAN)
+        ):
+            command, acommand = _both(
+                nodes.planner_node,
+                nodes.aplanner_node,
+                _state(search_before_planning=search_before_planning),
+            )
+        assert command == acommand
+        assert command.goto == "supervisor"
+        assert json.loads(command.update["full_plan"]) == json.loads(PLAN)
+
+    with patch.object(
+        nodes, "get_llm_by_type", lambda _: ReplayChatModel(content="not a plan {")
+    ):
+        command, acommand = _both(nodes.planner_node, nodes.aplanner_node, _state())
+    assert command == acommand
+
+
+def test_coordinator_and_reporter_nodes_match(agents):
+    """Test the coordinator's handoff and reply, and the reporter."""
+    for content, goto in (("handoff_to_planner()", "planner"), ("Hi!", "__end__")):
+        with patch.object(
+            nodes, "get_llm_by_type", lambda _: ReplayChatModel(content=content)
+        ):
+            command, acommand = _both(
+                nodes.coordinator_node, nodes.acoordinator_node, _state()
+            )
+        assert command == acommand
+        assert command.goto == goto
+
+    with patch.object(
+        nodes, "get_llm_by_type", lambda _: ReplayChatModel(content="# Report")
+    ):
+        command, acommand = _both(nodes.reporter_node, nodes.areporter_node, _state())
+    assert command == acommand
+    assert command.update["messages"][0].content == "# Report"
+
+
+def _scripted_llms():
+    llms = {
+        "coordinator": ScriptedChatModel(responses=["handoff_to_planner()"]),
+        "planner": ScriptedChatModel(responses=[PLAN]),
+        "supervisor": ScriptedChatModel(
+            responses=[
+                '{"next": "researcher"}',
+                '{"next": "coder"}',
+                '{"next": "FINISH"}',
+            ]
+        ),
+    }
+    return patch.multiple(
+        nodes,
+        _get_coordinator_llm=lambda _: llms["coordinator"],
+        _get_planner_llm=lambda _: llms["planner"],
+        _get_supervisor_llm=lambda: llms["supervisor"],
+    )
+
+
+def _graph_input() -> dict:
+    return {
+        "TEAM_MEMBERS": TEAM_MEMBERS,
+        "messages": [{"role": "user", "content": "Research quantum computing"}],
+        "plan_cursor": 0,
+    }
+
+
+def test_graph_runs_the_async_nodes(agents):
+    """Test that invoke, ainvoke and astream run the whole graph to the same end."""
+    graph = build_graph()
+
+    with _scripted_llms():
+        state = graph.invoke(_graph_input())
+    with _scripted_llms():
+        astate = asyncio.run(graph.ainvoke(_graph_input()))
+
+    async def stream():
+        return [
+            next(iter(update))
+            async for update in graph.astream(_graph_input(), stream_mode="updates")
+        ]
+
+    with _scripted_llms():
+        nodes_run = asyncio.run(stream())
+
+    def contents(state):
+        return [(message.name, message.content) for message in state["messages"]]
+
+    assert contents(state) == contents(astate)
+    assert contents(state)[-2:] == [
+        ("researcher", "Qubits are neat."),
+        ("coder", '{"result": 42}'),
+    ]
+    assert nodes_run == [
+        "coordinator",
+        "planner",
+        "supervisor",
+        "researcher",
+        "supervisor",
+        "coder",
+        "supervisor",
+    ]
+    # The sync run used the agents' invoke, the async runs their ainvoke
+    assert agents["researcher"].calls == ["invoke", "ainvoke", "ainvoke"]
+
+
+@pytest.fixture
+def crawl_stubs():
+    """Crawl a fixed page without the network or the readability script."""
+    calls = []
+    article = Article(title="Qubits", html_content="<p>Qubits</p><img src='/q.png'>")
+
+    def extract_article(self, html):
+        calls.append(("extract", html, threading.current_thread()))
+        return article
+
+    async def acrawl(self, url, return_format="html"):
+        calls.append(("acrawl", url))
+        if url == "https://broken.example":
+            raise httpx.ConnectError("connection refused")
+        return "<html>page</html>"
+
+    def crawl(self, url, return_format="html"):
+        calls.append(("crawl", url))
+        return "<html>page</html>"
+
+    with (
+        patch.object(JinaClient, "acrawl", acrawl),
+        patch.object(JinaClient, "crawl", crawl),
+        patch.object(
+            crawler_module.ReadabilityExtractor, "extract_article", extract_article
+        ),
+    ):
+        yield calls
+
+
+def test_acrawl_tool(crawl_stubs):
+    """Test that the async crawl tool matches the sync one without blocking the loop."""
+    url = "https://example.com/post"
+    result = asyncio.run(crawl_tool.ainvoke({"url": url}))
+    assert crawl_stubs[0] == ("acrawl", url)
+    # Extraction runs in a worker thread
+    assert crawl_stubs[1][2] is not threading.main_thread()
+    assert result == {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": "# Qubits\n\nQubits"},
+            {"type": "image_url", "image_url": {"url": "https://example.com/q.png"}},
+            {"type": "text", "text": ""},
+        ],
+    }
+    assert crawl_tool.invoke({"url": url}) == result
+    assert [call[0] for call in crawl_stubs] == [
+        "acrawl",
+        "extract",
+        "crawl",
+        "extract",
+    ]
+
+
+def test_acrawl_tool_errors(crawl_stubs):
+    """Test that crawl errors are returned to the agent, and cancellation is not."""
+    result = asyncio.run(crawl_tool.ainvoke({"url": "https://broken.example"}))
+    assert result.startswith("Failed to crawl. Error: ConnectError(")
+
+    async def cancelled():
+        task = asyncio.create_task(crawl_tool.ainvoke({"url": "https://a.example"}))
+        await asyncio.sleep(0)
+        task.cancel()
+        await task
+
+    with (
+        patch.object(JinaClient, "acrawl", lambda *args, **kwargs: asyncio.sleep(10)),
+        pytest.raises(asyncio.CancelledError),
+    ):
+        asyncio.run(cancelled())
+
+
+def test_jina_client_acrawl():
+    """Test the request the async Jina client sends."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, text="<html>page</html>")
+
+    client = LoopAsyncClient(
+        transport=httpx.MockTransport(handler), timeout=jina_client.TIMEOUT
+    )
+
+    async def crawl_twice() -> list[str]:
+        pages = [await JinaClient().acrawl("https://example.com", "markdown")]
+        pool = client.loop_client()
+        pages.append(await JinaClient().acrawl("https://example.com", "markdown"))
+        # Both crawls go through the same connection pool
+        assert client.loop_client() is pool
+        return pages
+
+    with (
+        patch.object(jina_client, "_async_client", client),
+        patch.dict("os.environ", {"JINA_API_KEY": "key"}),
+    ):
+        pages = asyncio.run(crawl_twice())
+    assert pages == ["<html>page</html>"] * 2
+    assert jina_client.get_async_client().timeout.read is not None
+    assert str(requests[0].url) == "https://r.jina.ai/"
+    assert requests[0].headers["X-Return-Format"] == "markdown"
+    assert requests[0].headers["Authorization"] == "Bearer key"
+    assert json.loads(requests[0].content) == {"url": "https://example.com"}
@@ -1,7 +1,15 @@
+import asyncio
+import importlib
+import os
+import tempfile
+import time
 import unittest
-import subprocess
+from functools import partial
 from unittest.mock import patch
-from src.tools.bash_tool import bash_tool
+from src.tools.bash_tool import BoundedOutput, bash_tool
+
+# src.tools re-exports the tool under the name of its module
+bash_tool_module = importlib.import_module("src.tools.bash_tool")
 
 
 class TestBashTool(unittest.TestCase):
@@ -10,19 +18,13 @@ class TestBashTool(unittest.TestCase):
         result = bash_tool.invoke("echo 'Hello World'")
         self.assertEqual(result.strip(), "Hello World")
 
-    @patch("subprocess.run")
-    def test_command_with_error(self, mock_run):
+    def test_command_with_error(self):
         """Test bash tool when command fails"""
-        # Configure mock to raise CalledProcessError
-        mock_run.side_effect = subprocess.CalledProcessError(
-            returncode=1, cmd="invalid_command", output="", stderr="Command not found"
-        )
-
-        result = bash_tool.invoke("invalid_command")
+        result = bash_tool.invoke("echo 'Command not found' >&2; exit 1")
         self.assertIn("Command failed with exit code 1", result)
         self.assertIn("Command not found", result)
 
-    @patch("subprocess.run")
+    @patch("subprocess.Popen")
     def test_command_with_exception(self, mock_run):
         """Test bash tool when an unexpected exception occurs"""
         # Configure mock to raise a generic exception
@@ -39,6 +41,74 @@ class TestBashTool(unittest.TestCase):
         )
         self.assertEqual(result.strip(), "test content")
 
+    def test_bounded_output_spills_to_disk(self):
+        """Test that long output keeps its head and tail and is logged in full"""
+        with tempfile.TemporaryDirectory() as log_dir:
+            output = BoundedOutput("stdout", head=5, tail=5, log_dir=log_dir)
+            for line in ("0123456789\n", "abcdefghij\n"):
+                output.write(line)
+            output.close()
+            result = output.render()
+            self.assertTrue(result.startswith("01234\n... [12 characters omitted"))
+            self.assertTrue(result.endswith("ghij\n"))
+            with open(output.log_path) as log:
+                self.assertEqual(log.read(), "0123456789\nabcdefghij\n")
+
+    def test_async_command_streams_output(self):
+        """Test that the async tool streams stdout and stderr while it runs"""
+
+        async def run():
+            deltas, result = [], None
+            async for event in bash_tool.astream_events(
+                "echo out; echo err >&2; exit 3", version="v2"
+            ):
+                if event["event"] == "on_custom_event":
+                    deltas.append((event["data"]["stream"], event["data"]["delta"]))
+                elif event["event"] == "on_tool_end":
+                    result = event["data"]["output"]
+            return deltas, result
+
+        deltas, result = asyncio.run(run())
+        self.assertEqual(sorted(deltas), [("stderr", "err\n"), ("stdout", "out\n")])
+        self.assertIn("Command failed with exit code 3", result)
+
+    def test_sync_output_is_bounded(self):
+        """Test that the sync tool keeps only the head and tail of long output"""
+        with tempfile.TemporaryDirectory() as log_dir:
+            bounded = partial(BoundedOutput, head=5, tail=5, log_dir=log_dir)
+            with patch.object(bash_tool_module, "BoundedOutput", bounded):
+                result = bash_tool.invoke("seq 1 1000")
+            self.assertTrue(result.startswith("1\n2\n3"))
+            self.assertIn("characters omitted", result)
+            self.assertTrue(result.endswith("1000\n"))
+
+    def test_sync_timeout_kills_process_group(self):
+        """Test that a timed out sync command is killed with its processes"""
+        self.assert_timeout_kills_process_group(bash_tool.invoke)
+
+    def test_async_timeout_kills_process_group(self):
+        """Test that a timed out command is killed with the processes it started"""
+        self.assert_timeout_kills_process_group(
+            lambda cmd: asyncio.run(bash_tool.ainvoke(cmd))
+        )
+
+    def assert_timeout_kills_process_group(self, invoke):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pid_file = os.path.join(tmp_dir, "pid")
+            start = time.monotonic()
+            with patch.object(bash_tool_module, "BASH_TIMEOUT", 0.5):
+                result = invoke(f"sleep 30 & echo $! > {pid_file}; wait")
+            self.assertLess(time.monotonic() - start, 5)
+            self.assertIn("Command timed out after 0.5 seconds", result)
+            with open(pid_file) as f:
+                pid = int(f.read())
+        # The background process is gone, or a zombie waiting to be reaped
+        try:
+            with open(f"/proc/{pid}/stat") as stat:
+                self.assertEqual(stat.read().split()[2], "Z")
+        except FileNotFoundError:
+            pass
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.messages import AIMessage, HumanMessage
+
+import src.graph.plan_cache as plan_cache_module
+import src.tools.search as search_module
+from src.graph.plan_cache import get_plan_cache_key, normalize_query
+from src.prompts.template import CompiledPrompt
+from src.tools.search import tavily_tool
+from src.utils.cache import SingleFlight, TTLCache, make_cache_key
+
+
+def test_ttl_cache_lru_eviction():
+    """Test that the least recently used entry is evicted."""
+    cache = TTLCache("test", max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expiry():
+    """Test that expired entries are not returned."""
+    cache = TTLCache("test", max_size=2, ttl=0.05)
+    cache.set("a", {"plan": "x"})
+    assert cache.get("a") == {"plan": "x"}
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_sqlite_persistence(tmp_path):
+    """Test that entries survive a restart with SQLite backing."""
+    db_path = str(tmp_path / "cache.sqlite")
+    TTLCache("test", max_size=2, ttl=60, db_path=db_path).set("a", [1, 2])
+    assert TTLCache("test", max_size=2, ttl=60, db_path=db_path).get("a") == [1, 2]
+
+
+def test_plan_cache_key_normalization():
+    """Test that near-identical requests share a cache key."""
+    assert normalize_query("  What is   MCP? ") == normalize_query("what is mcp")
+    assert make_cache_key(normalize_query("A."), True) == make_cache_key("a", True)
+    assert make_cache_key("a", True) != make_cache_key("a", False)
+
+
+def test_plan_cache_key_skips_follow_ups():
+    """Test that plans are only cached for single-turn requests."""
+    request = HumanMessage(content="Research quantum computing")
+    follow_up = [
+        HumanMessage(content="Research quantum computing"),
+        AIMessage(content="Should I focus on hardware?"),
+        HumanMessage(content="Yes, go ahead"),
+    ]
+    with patch.object(plan_cache_module, "plan_cache", TTLCache("test", 2, 60)):
+        assert get_plan_cache_key({"messages": [request]}) is not None
+        assert get_plan_cache_key({"messages": follow_up}) is None
+        # Messages from agents are not user turns
+        agent = HumanMessage(content="Qubits are neat.", name="researcher")
+        assert get_plan_cache_key({"messages": [request, agent]}) is not None
+
+
+def test_plan_cache_key_follows_planner_prompt():
+    """Test that plans made with another planner prompt are not reused."""
+    state = {"messages": [HumanMessage(content="Research quantum computing")]}
+    keys = set()
+    with patch.object(plan_cache_module, "plan_cache", TTLCache("test", 2, 60)):
+        for template in ("Plan the task.", "Plan the task in steps."):
+            prompt = CompiledPrompt(template)
+            with patch.object(
+                plan_cache_module, "get_compiled_prompt", lambda _: prompt
+            ):
+                keys.add(get_plan_cache_key(state))
+    assert len(keys) == 2
+
+
+def test_single_flight_shares_concurrent_calls():
+    """Test that concurrent calls with the same key run once."""
+    flight = SingleFlight()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: flight.do("k", slow_call), range(4)))
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert flight.shared == 3
+
+
+def _search_patches(cache):
+    """Return the upstream search queries and the patches that count them."""
+    requests = []
+
+    async def search(self, query, run_manager=None):
+        requests.append(query)
+        await asyncio.sleep(0.1)
+        if query == "fail":
+            return "HTTPError('503')", {}
+        return [{"url": "https://example.com", "content": query}], {"query": query}
+
+    patches = [
+        patch.object(search_module, "search_cache", cache),
+        patch.object(search_module, "search_flight", SingleFlight()),
+        patch.object(TavilySearchResults, "_arun", search),
+    ]
+    return requests, patches
+
+
+def test_search_cache_and_dedup(tmp_path):
+    """Test that identical searches share a request and a cached result."""
+    cache = TTLCache("search", 8, 60, str(tmp_path / "search.sqlite"))
+    requests, patches = _search_patches(cache)
+
+    async def run():
+        first = await asyncio.gather(
+            tavily_tool.ainvoke({"query": "What is MCP?"}),
+            tavily_tool.ainvoke({"query": "what is mcp"}),
+        )
+        again = await tavily_tool.ainvoke({"query": "  WHAT is MCP "})
+        failed = [await tavily_tool.ainvoke({"query": "fail"}) for _ in range(2)]
+        return first, again, failed
+
+    with ExitStack() as stack:
+        for search_patch in patches:
+            stack.enter_context(search_patch)
+        first, again, failed = asyncio.run(run())
+        stats = search_module.search_cache_stats()
+    assert first[0] == first[1] == again
+    assert requests == ["What is MCP?", "fail", "fail"]
+    assert failed[0] == "HTTPError('503')"
+    assert stats["shared"] == 1
+    # The lookup inside the shared request is not counted again
+    assert (stats["hits"], stats["misses"]) == (1, 4)
+
+    # The sync path reads results that survived a restart from SQLite
+    restarted = TTLCache("search", 8, 60, str(tmp_path / "search.sqlite"))
+    with patch.object(search_module, "search_cache", restarted):
+        assert tavily_tool.invoke({"query": "what is mcp"}) == again
+
+
+def test_search_cache_counts_one_miss_per_search():
+    """Test that a search and its normalized repeat give a hit ratio of one half."""
+    requests = []
+
+    def search(self, query, run_manager=None):
+        requests.append(query)
+        return [{"url": "https://example.com", "content": query}], {"query": query}
+
+    with (
+        patch.object(search_module, "search_cache", TTLCache("search", 8, 60)),
+        patch.object(TavilySearchResults, "_run", search),
+    ):
+        first = tavily_tool.invoke({"query": "What is MCP?"})
+        assert tavily_tool.invoke({"query": "what is mcp"}) == first
+        stats = search_module.search_cache_stats()
+    assert requests == ["What is MCP?"]
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
@@ -0,0 +1,122 @@
+import asyncio
+import json
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import src.agents.agents as agents
+import src.graph.nodes as nodes
+from benchmarks.cassette import record_session, replay_session
+from src.service.workflow_service import run_agent_workflow
+from src.utils.lazy import lazy_singleton
+
+PLAN = json.dumps(
+    {
+        "thought": "test",
+        "title": "test",
+        "steps": [
+            {"agent_name": "researcher", "title": "research", "description": ""},
+            {"agent_name": "reporter", "title": "report", "description": ""},
+        ],
+    }
+)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """A chat model that answers each agent of a research session."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages) -> AIMessage:
+        system_prompt = messages[0].content
+        names = {message.name for message in messages}
+        if "You are Langmanus" in system_prompt:
+            return AIMessage(content="handoff_to_planner()")
+        if "Deep Researcher" in system_prompt:
+            return AIMessage(content=PLAN)
+        if "supervisor" in system_prompt:
+            goto = "researcher"
+            if "reporter" in names:
+                goto = "FINISH"
+            elif "researcher" in names:
+                goto = "reporter"
+            return AIMessage(content=json.dumps({"next": goto}))
+        if "You are a researcher" in system_prompt:
+            if any(isinstance(message, ToolMessage) for message in messages):
+                return AIMessage(content="Quantum findings")
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "tavily_search",
+                        "args": {"query": "quantum computing"},
+                        "id": "call_1",
+                    }
+                ],
+            )
+        return AIMessage(content="Final report")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+
+def _fresh_agents():
+    return [
+        patch.object(nodes, name, lazy_singleton(getattr(nodes, name).__wrapped__))
+        for name in ("get_research_agent", "get_coder_agent", "get_browser_agent")
+    ]
+
+
+async def _run_session() -> tuple[list[tuple], str]:
+    """Run a workflow and return its agent and tool events and streamed text."""
+    steps, text = [], ""
+    async for event in run_agent_workflow(
+        [{"role": "user", "content": "Research quantum computing"}]
+    ):
+        if event["event"] == "message":
+            text += event["data"]["delta"].get("content") or ""
+        elif event["event"] in ("start_of_agent", "tool_call_result"):
+            steps.append((event["event"], event["data"].get("agent_name")))
+    return steps, text
+
+
+def test_record_and_replay_session(tmp_path):
+    """Test that a replayed session reproduces the recorded one offline."""
+    path = str(tmp_path / "session.json")
+    llm = ScriptedChatModel()
+    search_results = [{"url": "https://example.com", "content": "qubits"}]
+    searches = []
+
+    async def search(self, query, run_manager=None):
+        searches.append(query)
+        return search_results, {}
+
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(nodes, "get_llm_by_type", lambda _: llm))
+        stack.enter_context(patch.object(agents, "get_llm_by_type", lambda _: llm))
+        stack.enter_context(patch.object(TavilySearchResults, "_arun", search))
+        for agent_patch in _fresh_agents():
+            stack.enter_context(agent_patch)
+        with record_session(path) as recorder:
+            recorded, _ = asyncio.run(_run_session())
+
+    kinds = [interaction["type"] for interaction in recorder.interactions]
+    assert kinds.count("tool") == 1
+    assert searches == ["quantum computing"]
+
+    with patch.object(TavilySearchResults, "_arun", search):
+        with replay_session(path):
+            replayed, text = asyncio.run(_run_session())
+    assert replayed == recorded
+    assert "Quantum findings" in text and "Final report" in text
+    # The search was answered from the cassette
+    assert searches == ["quantum computing"]
@@ -0,0 +1,173 @@
+from unittest.mock import patch
+
+import tiktoken
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.config import TEAM_MEMBERS
+from src.prompts import template
+from src.prompts.template import apply_prompt_template, load_token_counters
+from src.utils.context_utils import compact_messages, count_message_tokens
+from src.utils.token_utils import (
+    APPROXIMATE_COUNTER,
+    TiktokenCounter,
+    _load_encoding,
+    count_tokens,
+    get_token_counter,
+    truncate_to_tokens,
+)
+
+
+def _history(steps: int, output_tokens: int) -> list:
+    messages = [
+        HumanMessage(content="What is the weather?"),
+        HumanMessage(content="{}", name="planner"),
+    ]
+    for i in range(steps):
+        messages.append(
+            HumanMessage(
+                content=f"finding {i} " + "x" * output_tokens * 4, name="researcher"
+            )
+        )
+    return messages
+
+
+def test_truncate_to_tokens():
+    """Test that truncated text fits the token budget."""
+    text = "word " * 1000
+    assert count_tokens(truncate_to_tokens(text, 100)) <= 100
+    assert truncate_to_tokens("short", 100) == "short"
+
+
+def test_compact_messages_within_budget():
+    """Test that messages within budget are returned unchanged."""
+    messages = _history(2, 100)
+    assert compact_messages(messages, 10000, 2, 50, ["researcher"]) is messages
+
+
+def test_compact_messages_over_budget():
+    """Test that older agent outputs are compacted and recent ones kept."""
+    messages = _history(10, 1000)
+    compacted = compact_messages(messages, 3000, 2, 100, ["researcher"])
+    assert sum(count_message_tokens(message) for message in compacted) <= 3000
+    # User request, plan and the most recent outputs are kept verbatim
+    assert compacted[:2] == messages[:2]
+    assert compacted[-2:] == messages[-2:]
+    assert compacted[2].content.startswith(("finding 0", "[Earlier output"))
+    assert compacted[2].name == "researcher"
+    # The original history is not modified
+    assert count_message_tokens(messages[2]) > 1000
+
+
+def test_compact_messages_flat_with_plan_length():
+    """Test that the compacted size stays bounded as plans get longer."""
+    sizes = [
+        sum(
+            count_message_tokens(message)
+            for message in compact_messages(
+                _history(steps, 1000), 4000, 2, 100, ["researcher"]
+            )
+        )
+        for steps in (5, 20, 80)
+    ]
+    assert all(size <= 4000 for size in sizes)
+
+
+def _crawl_history(page_tokens: int) -> list:
+    """A ReAct history whose latest message is a large crawled page."""
+    return [
+        HumanMessage(content="Summarize the page"),
+        AIMessage(content="earlier findings " * 200, name="researcher"),
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "crawl_tool", "args": {"url": "u"}, "id": "c1"}],
+        ),
+        ToolMessage(
+            content="page " + "y" * page_tokens * 4,
+            name="crawl_tool",
+            tool_call_id="c1",
+        ),
+    ]
+
+
+def test_compact_messages_truncates_large_recent_tool_output():
+    """Test that a huge recent tool output is truncated to fit the budget."""
+    messages = _crawl_history(50000)
+    compacted = compact_messages(messages, 4000, 3, 100, ["researcher"])
+    assert sum(count_message_tokens(message) for message in compacted) <= 4000
+    assert compacted[0] == messages[0]
+    assert compacted[3].content.startswith("page ")
+    assert "omitted" in compacted[3].content
+    assert compacted[3].tool_call_id == "c1"
+
+
+def test_compact_messages_tool_outputs_before_agent_outputs():
+    """Test that older tool outputs are compacted before agent outputs."""
+    messages = _crawl_history(1000) + [
+        AIMessage(content="done " * 10, name="researcher")
+    ]
+    compacted = compact_messages(messages, 1500, 1, 50, ["researcher"])
+    assert compacted[1] == messages[1]
+    assert compacted[3] != messages[3]
+
+
+def test_tiktoken_counter():
+    """Test exact counting and truncation that keeps characters whole."""
+    encoding = tiktoken.Encoding(
+        name="bytes",
+        pat_str=r".",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={},
+    )
+    counter = TiktokenCounter(encoding)
+    assert counter.count("héllo") == 6
+    assert counter.truncate("héllo", 2) == "h"
+    assert counter.truncate("héllo", 3) == "hé"
+    assert counter.truncate("short", 10) == "short"
+
+
+def test_token_counter_falls_back_to_approximate():
+    """Test that an unavailable tokenizer falls back to estimating, once."""
+    get_token_counter.cache_clear()
+    _load_encoding.cache_clear()
+    try:
+        with patch.object(
+            tiktoken, "get_encoding", side_effect=OSError("offline")
+        ) as get_encoding:
+            assert get_token_counter("gpt-4o") is APPROXIMATE_COUNTER
+            # Models with the same encoding do not try to load it again
+            assert get_token_counter("o1-mini") is APPROXIMATE_COUNTER
+        assert get_encoding.call_count == 1
+        assert get_token_counter("gpt-4o", "approximate") is APPROXIMATE_COUNTER
+    finally:
+        get_token_counter.cache_clear()
+        _load_encoding.cache_clear()
+
+
+def test_token_counters_load_before_prompts():
+    """Test that prompts reuse the counters loaded at startup."""
+    get_token_counter.cache_clear()
+    try:
+        load_token_counters()
+        loaded = get_token_counter.cache_info().misses
+        state = {
+            "messages": _history(2, 10),
+            "TEAM_MEMBERS": TEAM_MEMBERS,
+            "STEP_MERGE_RULE": "",
+        }
+        for name in ("coordinator", "planner", "supervisor", "researcher"):
+            apply_prompt_template(name, state)
+        assert get_token_counter.cache_info().misses == loaded
+    finally:
+        get_token_counter.cache_clear()
+
+
+def test_prompt_fits_context_window():
+    """Test that prompts are trimmed to the model's context window."""
+    state = {"messages": _crawl_history(50000), "TEAM_MEMBERS": TEAM_MEMBERS}
+    with (
+        patch.object(template, "TOKEN_COUNTER", "approximate"),
+        patch.dict(template._LLM_CONTEXT, {"basic": ("model", 8000)}),
+        patch.object(template, "CONTEXT_OUTPUT_RESERVE", 1000),
+    ):
+        messages = apply_prompt_template("researcher", state)
+    assert sum(count_message_tokens(message) for message in messages) <= 7000
@@ -0,0 +1,46 @@
+import asyncio
+
+from benchmarks.openai_stub import DEFAULT_CONTENT, StubServer
+from src.llms.http import get_async_http_client, get_http_client
+from src.llms.llm import create_azure_llm, create_openai_llm
+
+
+def test_llm_clients_share_connection_pool():
+    """Test that every LLM client uses the shared connection pools."""
+    llms = [
+        create_openai_llm(model="gpt-4o", api_key="test"),
+        create_openai_llm(
+            model="qwen-max", base_url="http://localhost:8765/v1", api_key="test"
+        ),
+        create_azure_llm(
+            azure_deployment="gpt-4o",
+            azure_endpoint="https://example.openai.azure.com",
+            api_version="2024-02-01",
+            api_key="test",
+        ),
+    ]
+    for llm in llms:
+        assert llm.root_client._client is get_http_client()
+        assert llm.root_async_client._client is get_async_http_client()
+
+
+def test_async_client_works_across_event_loops():
+    """Test that the shared async client can be used from a new loop per call."""
+    with StubServer() as server:
+        llm = create_openai_llm(
+            model="gpt-4o", base_url=server.base_url, api_key="stub", max_retries=0
+        )
+        # BrowserTool runs the LLM on a new event loop for every task
+        for _ in range(2):
+            assert asyncio.run(llm.ainvoke("Hi")).content == DEFAULT_CONTENT
+        # Each loop opened its own connection
+        assert server.stats()["connections"] == 2
+
+        async def both():
+            await llm.ainvoke("Hi")
+            await llm.ainvoke("Hi")
+
+        server.reset_stats()
+        asyncio.run(both())
+        # Calls on the same loop share the pool
+        assert server.stats()["connections"] == 1
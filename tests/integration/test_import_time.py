@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Time that importing the app may add on top of its third-party dependencies
+IMPORT_TIME_BUDGET = 1.0
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+SCRIPT = """
+import json, sys, time
+import fastapi, sse_starlette.sse, langgraph.graph, langgraph.prebuilt
+import langchain_openai, langchain_deepseek, langchain_community.chat_models
+import langchain_community.tools.tavily_search, langchain_community.adapters.openai
+start = time.perf_counter()
+import src.api.app, src.workflow
+elapsed = time.perf_counter() - start
+import src.llms.llm
+print(json.dumps({
+    "elapsed": elapsed,
+    "browser_use": "browser_use" in sys.modules,
+    "llms": list(src.llms.llm._llm_cache),
+}))
+"""
+
+
+def test_import_time_budget():
+    """Test that importing the app and CLI builds nothing and stays within budget."""
+    env = {**os.environ, "TAVILY_API_KEY": os.environ.get("TAVILY_API_KEY", "test")}
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    assert not result["browser_use"]
+    assert result["llms"] == []
+    assert result["elapsed"] < IMPORT_TIME_BUDGET
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+import src.llms.cache as llm_cache
+from src.llms.cache import canonicalize_message, create_cached_llm
+from src.llms.replay import ReplayChatModel, iter_message_chunks
+from src.utils.cache import TTLCache
+
+
+class CountingChatModel(ReplayChatModel):
+    calls: int = 0
+
+    def _generate(self, *args, **kwargs):
+        self.calls += 1
+        return super()._generate(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs):
+        self.calls += 1
+        yield from super()._stream(*args, **kwargs)
+
+
+@pytest.fixture
+def response_cache(monkeypatch):
+    cache = TTLCache("llm_responses", max_size=8, ttl=60)
+    monkeypatch.setattr(llm_cache, "llm_response_cache", cache)
+    return cache
+
+
+def test_invoke_and_stream_share_cached_response(response_cache):
+    """Test that a cached response is returned by invoke and replayed by stream."""
+    llm = create_cached_llm(CountingChatModel)(content="cached answer")
+    messages = [HumanMessage(content="what is mcp?")]
+
+    assert llm.invoke(messages).content == "cached answer"
+    assert llm.invoke(messages).content == "cached answer"
+    chunks = list(llm.stream(messages))
+    assert len(chunks) > 1
+    assert "".join(chunk.content for chunk in chunks) == "cached answer"
+    assert llm.calls == 1
+    assert response_cache.stats()["hits"] == 2
+
+    llm.invoke([HumanMessage(content="something else")])
+    assert llm.calls == 2
+
+
+def test_async_calls_use_sqlite_off_the_event_loop(monkeypatch, tmp_path):
+    """Test that async calls read and write a persistent cache in a thread."""
+    cache = TTLCache("llm_responses", 8, 60, str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(llm_cache, "llm_response_cache", cache)
+    threads = []
+    for name in ("get", "set"):
+        method = getattr(cache, name)
+
+        def record(*args, method=method):
+            threads.append(threading.current_thread())
+            return method(*args)
+
+        monkeypatch.setattr(cache, name, record)
+    llm = create_cached_llm(CountingChatModel)(content="cached answer")
+    messages = [HumanMessage(content="what is mcp?")]
+
+    async def run():
+        await llm.ainvoke(messages)
+        return [chunk async for chunk in llm.astream(messages)]
+
+    chunks = asyncio.run(run())
+    assert "".join(chunk.content for chunk in chunks) == "cached answer"
+    assert llm.calls == 1
+    assert threads
+    assert threading.main_thread() not in threads
+
+
+def test_cache_key_ignores_volatile_parts():
+    """Test that prompt timestamps and message ids do not change the cache key."""
+    first = SystemMessage(content="CURRENT_TIME: Mon Mar 10 2025 10:00:00\nHi", id="1")
+    second = SystemMessage(content="CURRENT_TIME: Tue Mar 11 2025 12:30:00\nHi", id="2")
+    assert canonicalize_message(first) == canonicalize_message(second)
+
+
+def test_message_chunks_round_trip():
+    """Test that replayed chunks add up to the original message."""
+    message = AIMessage(
+        content="Let me search.",
+        tool_calls=[{"name": "search", "args": {"query": "mcp"}, "id": "call_1"}],
+    )
+    chunks = list(iter_message_chunks(message, chunk_size=4))
+    total = chunks[0]
+    for chunk in chunks[1:]:
+        total += chunk
+    assert total.message.content == message.content
+    assert total.message.tool_calls == message.tool_calls
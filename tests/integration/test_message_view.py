@@ -0,0 +1,30 @@
+from langchain_core.messages import HumanMessage
+
+from src.utils.message_view import MessageView, with_content
+
+
+def test_message_view_transforms_lazily():
+    """Test that the view transforms messages on access without modifying them."""
+    messages = [
+        HumanMessage(content="question"),
+        HumanMessage(content="a", name="coder"),
+    ]
+    view = MessageView(
+        messages,
+        lambda index, message: (
+            with_content(message, message.content.upper()) if message.name else message
+        ),
+    )
+    assert len(view) == 2
+    assert view[0] is messages[0]
+    assert view[-1].content == "A"
+    assert view[-1].name == "coder"
+    assert [message.content for message in view[1:]] == ["A"]
+    assert messages[1].content == "a"
+
+
+def test_with_content_dict_message():
+    """Test replacing the content of a dict message."""
+    message = {"role": "system", "content": "prompt"}
+    assert with_content(message, "new") == {"role": "system", "content": "new"}
+    assert message["content"] == "prompt"
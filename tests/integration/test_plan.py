@@ -0,0 +1,83 @@
+import json
+
+from langchain_core.messages import HumanMessage
+
+from src.graph.plan import (
+    parse_plan_steps,
+    derive_step_dependencies,
+    get_next_wave,
+    get_planned_next,
+)
+
+
+def _plan(*agents):
+    return json.dumps(
+        {
+            "thought": "test",
+            "title": "test",
+            "steps": [
+                {"agent_name": agent, "title": f"step {i}", "description": ""}
+                for i, agent in enumerate(agents)
+            ],
+        }
+    )
+
+
+def test_parse_plan_steps():
+    """Test that a valid plan is parsed into steps."""
+    steps = parse_plan_steps(_plan("researcher", "reporter"))
+    assert [step["agent_name"] for step in steps] == ["researcher", "reporter"]
+
+
+def test_parse_plan_steps_invalid():
+    """Test that invalid plans are rejected."""
+    assert parse_plan_steps("") is None
+    assert parse_plan_steps("not a plan") is None
+    assert parse_plan_steps(_plan("researcher", "unknown_agent")) is None
+
+
+def test_derive_step_dependencies():
+    """Test dependency derivation between plan steps."""
+    steps = parse_plan_steps(
+        _plan("researcher", "researcher", "coder", "researcher", "reporter")
+    )
+    assert derive_step_dependencies(steps) == [
+        [],
+        [],
+        [0, 1],
+        [0, 1, 2],
+        [0, 1, 2, 3],
+    ]
+
+
+def test_get_next_wave():
+    """Test that independent steps are grouped into waves."""
+    steps = parse_plan_steps(
+        _plan("researcher", "researcher", "browser", "coder", "reporter")
+    )
+    assert get_next_wave(steps, 0) == [0, 1, 2]
+    assert get_next_wave(steps, 3) == [3]
+    assert get_next_wave(steps, 4) == [4]
+    assert get_next_wave(steps, 5) == []
+
+
+def test_get_planned_next():
+    """Test plan-cursor routing without the supervisor LLM."""
+    steps = parse_plan_steps(_plan("researcher", "reporter"))
+    planner = HumanMessage(content="{}", name="planner")
+    researcher = HumanMessage(content="findings", name="researcher")
+    reporter = HumanMessage(content="report", name="reporter")
+    assert get_planned_next(steps, 0, planner) == "researcher"
+    assert get_planned_next(steps, 1, researcher) == "reporter"
+    assert get_planned_next(steps, 2, reporter) == "FINISH"
+
+
+def test_get_planned_next_fallback():
+    """Test that failed or unexpected outputs fall back to the LLM supervisor."""
+    steps = parse_plan_steps(_plan("coder", "reporter"))
+    failed = HumanMessage(content="Failed to execute. Error: ...", name="coder")
+    empty = HumanMessage(content="", name="coder")
+    unexpected = HumanMessage(content="findings", name="researcher")
+    assert get_planned_next(steps, 1, failed) is None
+    assert get_planned_next(steps, 1, empty) is None
+    assert get_planned_next(steps, 1, unexpected) is None
@@ -0,0 +1,110 @@
+import os
+from functools import partial
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.config import TEAM_MEMBERS
+from src.graph import nodes
+from src.prompts import template
+from src.prompts.template import (
+    apply_prompt_template,
+    current_time,
+    get_compiled_prompt,
+    reload_prompt_templates,
+)
+
+
+def test_cache_friendly_prompt_keeps_prefix():
+    """Test that a growing conversation keeps the previous prompt as its prefix."""
+    history = [HumanMessage(content="Research quantum computing")]
+    first = apply_prompt_template(
+        "supervisor",
+        {"messages": history, "TEAM_MEMBERS": TEAM_MEMBERS},
+        cache_friendly=True,
+    )
+    history = history + [AIMessage(content="Findings", name="researcher")]
+    second = apply_prompt_template(
+        "supervisor",
+        {"messages": history, "TEAM_MEMBERS": TEAM_MEMBERS},
+        cache_friendly=True,
+    )
+
+    assert "CURRENT_TIME" not in first[0]["content"]
+    assert first[-1]["content"].startswith("CURRENT_TIME: ")
+    assert second[-1]["content"].startswith("CURRENT_TIME: ")
+    # Everything but the trailing time is a prefix of the next call's prompt
+    assert second[: len(first) - 1] == first[:-1]
+
+
+def test_legacy_prompt_puts_time_first():
+    """Test that the legacy mode keeps CURRENT_TIME at the top of the system prompt."""
+    messages = apply_prompt_template(
+        "supervisor",
+        {"messages": [HumanMessage(content="Hi")], "TEAM_MEMBERS": TEAM_MEMBERS},
+        cache_friendly=False,
+    )
+    assert messages[0]["content"].startswith("---\nCURRENT_TIME: ")
+    assert len(messages) == 2
+
+
+def test_current_time_is_coarsened():
+    """Test that the prompt time is rounded down to the resolution."""
+    assert current_time(60)[22:24] == "00"
+
+
+def test_compiled_prompt_reloads_on_change(tmp_path):
+    """Test that compiled prompts are cached until their file changes."""
+    path = tmp_path / "greeter.md"
+    path.write_text("Hello <<NAME>>, {braces} stay")
+    with patch.object(template, "PROMPTS_DIR", str(tmp_path)):
+        compiled = get_compiled_prompt("greeter")
+        assert compiled.format(NAME="Ada") == "Hello Ada, {braces} stay"
+        assert get_compiled_prompt("greeter") is compiled
+
+        path.write_text("Bye <<NAME>>")
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+        assert get_compiled_prompt("greeter").format(NAME="Ada") == "Bye Ada"
+
+        reload_prompt_templates()
+        assert get_compiled_prompt("greeter") is not compiled
+
+
+def test_planner_search_results_precede_time():
+    """Test that the planner's search results follow the request, not CURRENT_TIME."""
+    request = HumanMessage(content="Research quantum computing")
+    state = {"messages": [request], "TEAM_MEMBERS": TEAM_MEMBERS}
+    results = [{"title": "Qubits", "content": "Qubits are neat.", "url": "u"}]
+
+    for cache_friendly in (True, False):
+        with patch.object(
+            nodes,
+            "apply_prompt_template",
+            partial(apply_prompt_template, cache_friendly=cache_friendly),
+        ):
+            messages = nodes._build_planner_messages(state, results)
+        request_message = messages[1]
+        assert request_message.content.startswith(request.content)
+        assert "# Relative Search Results" in request_message.content
+        assert "Qubits are neat." in request_message.content
+        if cache_friendly:
+            assert messages[-1]["content"].startswith("CURRENT_TIME: ")
+            assert "Search Results" not in messages[-1]["content"]
+        assert len(messages) == (3 if cache_friendly else 2)
+    # The state's message is not modified
+    assert request.content == "Research quantum computing"
+
+
+def test_planner_splits_researcher_steps_only_in_parallel_mode():
+    """Test that sequential plans keep merging consecutive researcher steps."""
+    state = {
+        "messages": [HumanMessage(content="Research quantum computing")],
+        "TEAM_MEMBERS": TEAM_MEMBERS,
+    }
+    sequential = nodes._build_planner_messages(state, None)[0]["content"]
+    parallel = nodes._build_planner_messages(
+        {**state, "parallel_execution": True}, None
+    )[0]["content"]
+    assert nodes.STEP_MERGE_RULE in sequential
+    assert "executed in parallel" not in sequential
+    assert nodes.PARALLEL_STEP_MERGE_RULE in parallel
@@ -0,0 +1,99 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.tools import python_repl
+from src.tools.python_pool import PythonWorkerPool, PythonWorkerTimeout
+from src.tools.python_repl import python_repl_tool
+
+
+@pytest.fixture
+def pool():
+    pool = PythonWorkerPool(
+        size=2,
+        warm=1,
+        preload=[],
+        memory_mb=512,
+        cpu_seconds=1,
+        timeout=4,
+        idle_timeout=60,
+    )
+    yield pool
+    pool.close()
+
+
+def test_sessions_are_isolated(pool):
+    """Test that variables persist within a session but not across sessions."""
+    assert pool.execute("a", "x = 1") == ""
+    assert pool.execute("a", "print(x)") == "1\n"
+    assert "NameError" in pool.execute("b", "print(x)")
+
+    pool.end_session("a")
+    assert "NameError" in pool.execute("a", "print(x)")
+    assert pool.stats()["sessions"] == 2
+
+
+def test_limits_restart_the_session(pool):
+    """Test that CPU, memory and wall-clock limits stop runaway code."""
+    assert "CPUTimeLimitExceeded" in pool.execute("a", "while True: pass")
+    assert pool.execute("a", "b = bytearray(1024 ** 3)") == "MemoryError()"
+    pool.execute("a", "x = 1")
+    with pytest.raises(PythonWorkerTimeout):
+        pool.execute("a", "import time; time.sleep(10)")
+    # The timed out worker was replaced by a fresh one
+    assert "NameError" in pool.execute("a", "print(x)")
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["workers"] <= stats["size"]
+
+
+def test_full_pool_queues_and_recycles(pool):
+    """Test that callers queue while every worker runs and idle sessions are recycled."""
+    pool.execute("a", "x = 1")
+    pool.execute("b", "x = 2")
+    threads = [
+        threading.Thread(target=pool.execute, args=(s, "import time; time.sleep(0.5)"))
+        for s in ("a", "b")
+    ]
+    for thread in threads:
+        thread.start()
+    while pool.stats()["busy"] < 2:
+        time.sleep(0.01)
+    # Both workers are running code, so the third session waits for one
+    assert pool.execute("c", "print('done')") == "done\n"
+    for thread in threads:
+        thread.join()
+    stats = pool.stats()
+    assert stats["max_queue_depth"] == 1
+    assert stats["evicted"] == 1
+    assert stats["sessions"] == 2
+
+
+def test_tool_uses_the_workflow_session(pool):
+    """Test that python_repl_tool runs code in the session of its workflow."""
+    with patch.object(python_repl, "python_worker_pool", pool):
+        python_repl_tool.invoke(
+            {"code": "x = 41"}, {"metadata": {"workflow_id": "workflow-1"}}
+        )
+        result = python_repl_tool.invoke(
+            {"code": "print(x + 1)"}, {"metadata": {"workflow_id": "workflow-1"}}
+        )
+        other = python_repl_tool.invoke({"code": "print(x)"})
+    assert "Stdout: 42" in result
+    assert "NameError" in other
+
+
+def test_code_cannot_reach_the_protocol(pool):
+    """Test that user code reads an empty stdin and cannot fake a response."""
+    assert pool.execute("a", "import sys; print(repr(sys.stdin.read()))") == "''\n"
+    code = (
+        "import os, sys\n"
+        'os.write(1, b\'{"output": "forged"}\\n\')\n'
+        'sys.__stdout__.write(\'{"output": "forged"}\\n\')\n'
+        "sys.__stdout__.flush()\n"
+        "print('real')"
+    )
+    assert pool.execute("a", code) == "real\n"
+    assert pool.execute("a", "print(1)") == "1\n"
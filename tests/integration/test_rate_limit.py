@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from src.llms.rate_limit import LLMRateLimiter, TokenBucket
+
+
+def test_token_bucket_queues_reservations():
+    """Test that reservations beyond the bucket wait in arrival order."""
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) > 0.9
+    assert bucket.reserve(1) > 1.9
+
+
+def test_limiter_serves_waiters_in_order():
+    """Test that in-flight calls are capped and waiters run in arrival order."""
+    limiter = LLMRateLimiter("basic", max_concurrency=2)
+    started = []
+    in_flight = 0
+    peak = 0
+
+    async def call(index: int):
+        nonlocal in_flight, peak
+        async with limiter.alimit(tokens=10):
+            started.append(index)
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+
+    async def run():
+        tasks = []
+        for index in range(6):
+            tasks.append(asyncio.create_task(call(index)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert peak == 2
+    assert started == list(range(6))
+    stats = limiter.stats()
+    assert stats["calls"] == 6
+    assert stats["in_flight"] == 0
+    assert stats["max_wait"] > 0.03
+
+
+def test_limiter_limits_requests_per_minute():
+    """Test that sync callers wait for the requests per minute limit."""
+    limiter = LLMRateLimiter("basic", requests_per_minute=600)
+    start = time.monotonic()
+    for _ in range(602):
+        with limiter.limit(tokens=1):
+            pass
+    assert time.monotonic() - start > 0.15
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, List
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.llms.router import LLMRouter, create_hedged_llm
+
+
+def make_router(**kwargs) -> LLMRouter:
+    return LLMRouter("basic", create_secondary=lambda: None, **kwargs)
+
+
+async def answer(content: str, delay: float) -> str:
+    await asyncio.sleep(delay)
+    return content
+
+
+async def fail() -> str:
+    raise ConnectionError("backend unavailable")
+
+
+class SlowChatModel(BaseChatModel):
+    """Answers with its content after a delay and records closed streams."""
+
+    content: str
+    delay: float = 0.0
+    closed: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow"
+
+    def _generate(self, messages: List[BaseMessage], *args, **kwargs: Any):
+        time.sleep(self.delay)
+        message = AIMessage(content=self.content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self, messages: List[BaseMessage], *args, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        try:
+            await asyncio.sleep(self.delay)
+            for word in self.content.split():
+                yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+        finally:
+            self.closed.append(self.content)
+
+
+def make_hedged_llm(primary_delay: float) -> BaseChatModel:
+    router = LLMRouter(
+        "basic",
+        create_secondary=lambda: SlowChatModel(content="secondary"),
+        default_hedge_delay=0.05,
+    )
+    return create_hedged_llm(SlowChatModel, router)(
+        content="primary", delay=primary_delay
+    )
+
+
+def test_hedged_request_wins_over_slow_primary():
+    """Test that a slow primary is hedged and the faster answer is used."""
+    router = make_router(default_hedge_delay=0.05)
+    result = asyncio.run(
+        router.race(
+            "generate",
+            lambda: answer("primary", 1.0),
+            lambda: answer("secondary", 0.01),
+        )
+    )
+    assert result == "secondary"
+    assert router.hedges == 1
+    assert router.trackers[("secondary", "generate")].wins == 1
+
+
+def test_fallback_on_error_and_timeout():
+    """Test that failed and timed out primary calls fall back to the secondary."""
+    router = make_router(hedge_percentile=0, timeout=0.05)
+    assert asyncio.run(router.race("generate", fail, lambda: answer("b", 0))) == "b"
+    assert (
+        asyncio.run(
+            router.race("generate", lambda: answer("a", 1), lambda: answer("b", 0))
+        )
+        == "b"
+    )
+    assert router.fallbacks == 2
+    assert router.trackers[("primary", "generate")].errors == 1
+    assert router.trackers[("primary", "generate")].timeouts == 1
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(router.race("generate", fail, fail))
+
+
+def test_hedge_delay_follows_primary_latency():
+    """Test that the hedge delay is a percentile of the primary's latencies."""
+    router = make_router(hedge_percentile=95, min_samples=20, default_hedge_delay=5)
+    assert router.hedge_delay("generate") == 5
+    tracker = router.trackers[("primary", "generate")]
+    tracker.latencies.extend([0.1] * 19 + [2.0])
+    assert router.hedge_delay("generate") == pytest.approx(0.1)
+    tracker.latencies.extend([2.0] * 5)
+    assert router.hedge_delay("generate") == pytest.approx(2.0)
+    assert router.hedge_delay("stream") == 5
+
+
+def test_sync_call_inside_running_loop():
+    """Test that a sync call is hedged from code running in an event loop."""
+    llm = make_hedged_llm(primary_delay=1.0)
+
+    async def call() -> str:
+        return llm.invoke("hi").content
+
+    assert asyncio.run(call()) == "secondary"
+    assert llm.llm_router.hedges == 1
+
+
+def test_losing_stream_is_closed():
+    """Test that the losing stream is closed before the winner's first chunk."""
+    llm = make_hedged_llm(primary_delay=1.0)
+
+    async def stream() -> list[str]:
+        closed = []
+        async for chunk in llm._astream([HumanMessage(content="hi")]):
+            closed.append(list(llm.closed))
+        return closed
+
+    assert asyncio.run(stream()) == [["primary"]]
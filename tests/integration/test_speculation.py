@@ -0,0 +1,74 @@
+import asyncio
+import gc
+from unittest.mock import patch
+
+from src.graph import speculation
+
+
+class FakeSearch:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, input):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return [{"title": "result", "content": input["query"]}]
+
+
+def test_take_speculative_search():
+    """Test that the planner gets the speculative search result once."""
+
+    async def run():
+        search_id = speculation.start_speculative_search("query")
+        first = await speculation.take_speculative_search(search_id)
+        second = await speculation.take_speculative_search(search_id)
+        return first, second
+
+    search = FakeSearch()
+    with patch.object(speculation, "tavily_tool", search):
+        first, second = asyncio.run(run())
+    assert first == [{"title": "result", "content": "query"}]
+    assert second is None
+    assert search.calls == 1
+
+
+def test_discard_speculative_search():
+    """Test that a discarded search is cancelled and not returned."""
+
+    async def run():
+        search_id = speculation.start_speculative_search("query")
+        task = speculation._speculative_searches[search_id]
+        speculation.discard_speculative_search(search_id)
+        await asyncio.sleep(0)
+        return task, await speculation.take_speculative_search(search_id)
+
+    with patch.object(speculation, "tavily_tool", FakeSearch()):
+        task, result = asyncio.run(run())
+    assert task.cancelled()
+    assert result is None
+
+
+def test_failed_discarded_search_is_logged(caplog):
+    """Test that the error of a discarded search is retrieved and logged."""
+
+    class FailingSearch:
+        async def ainvoke(self, input):
+            raise ConnectionError("search unavailable")
+
+    async def run():
+        search_id = speculation.start_speculative_search("query")
+        task = speculation._speculative_searches[search_id]
+        await asyncio.sleep(0)
+        speculation.discard_speculative_search(search_id)
+        return task
+
+    loop = asyncio.new_event_loop()
+    unretrieved = []
+    loop.set_exception_handler(lambda _, context: unretrieved.append(context))
+    with patch.object(speculation, "tavily_tool", FailingSearch()):
+        task = loop.run_until_complete(run())
+    loop.close()
+    del task
+    gc.collect()
+    assert unretrieved == []
+    assert "Speculative planning search failed: search unavailable" in caplog.text
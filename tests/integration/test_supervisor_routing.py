@@ -0,0 +1,105 @@
+import asyncio
+from unittest.mock import patch
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import src.graph.nodes as nodes
+import src.llms.cache as llm_cache
+from src.config import TEAM_MEMBERS
+from src.llms.cache import create_cached_llm
+from src.utils.cache import TTLCache
+from src.utils.json_utils import JSONFieldScanner
+
+
+class ChunkedChatModel(BaseChatModel):
+    """A chat model that streams a fixed content in small chunks."""
+
+    content: str
+    chunk_size: int = 4
+    streamed: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "chunked"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(self.content))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for start in range(0, len(self.content), self.chunk_size):
+            text = self.content[start : start + self.chunk_size]
+            self.streamed.append(text)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+def _state() -> dict:
+    return {
+        "messages": [HumanMessage(content="Research quantum computing")],
+        "TEAM_MEMBERS": TEAM_MEMBERS,
+    }
+
+
+def _route(content: str, use_async: bool = False) -> tuple[str, str]:
+    llm = ChunkedChatModel(content=content, streamed=[])
+    with patch.object(nodes, "get_llm_by_type", lambda llm_type: llm):
+        if use_async:
+            goto = asyncio.run(nodes._aroute_by_llm(_state()))
+        else:
+            goto = nodes._route_by_llm(_state())
+    return goto, "".join(llm.streamed)
+
+
+def test_json_field_scanner():
+    """Test that a top-level string field is read as soon as it is closed."""
+    scanner = JSONFieldScanner("next")
+    assert scanner.feed('{"reason": "not \\"next\\"", "ne') is None
+    assert scanner.feed('xt": "coder"') == "coder"
+
+    nested = JSONFieldScanner("next")
+    assert nested.feed('{"a": {"next": "x"}, "next": "y"}') == "y"
+
+    fenced = JSONFieldScanner("next")
+    assert fenced.feed('```json\n{"next": "coder"}```') is None
+    assert fenced.failed
+
+
+def test_supervisor_stops_after_decision():
+    """Test that the supervisor stops the stream once `next` is known."""
+    content = '{"next": "researcher", "reason": "' + "x" * 200 + '"}'
+    for use_async in (False, True):
+        goto, streamed = _route(content, use_async)
+        assert goto == "researcher"
+        assert len(streamed) < 40
+
+
+def test_supervisor_falls_back_to_full_parse():
+    """Test that unknown options and non-JSON prefixes are parsed in full."""
+    goto, streamed = _route('```json\n{"next": "coder"}\n```')
+    assert goto == "coder"
+    assert streamed == '```json\n{"next": "coder"}\n```'
+
+    goto, _ = _route('{"next": "nobody", "next": "FINISH"}')
+    assert goto == "FINISH"
+
+
+def test_supervisor_routing_is_cached():
+    """Test that a repeated routing call is served by the response cache."""
+    content = '{"next": "coder", "reason": "' + "x" * 200 + '"}'
+    for use_async in (False, True):
+        cache = TTLCache("llm_responses", max_size=8, ttl=60)
+        llm = create_cached_llm(ChunkedChatModel)(content=content, streamed=[])
+        with (
+            patch.object(llm_cache, "llm_response_cache", cache),
+            patch.object(nodes, "get_llm_by_type", lambda llm_type: llm),
+        ):
+            for _ in range(2):
+                if use_async:
+                    goto = asyncio.run(nodes._aroute_by_llm(_state()))
+                else:
+                    goto = nodes._route_by_llm(_state())
+                assert goto == "coder"
+        # The second call did not reach the model
+        assert len("".join(llm.streamed)) < 40
+        assert cache.stats()["hits"] == 1
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+
+from src.agents import tool_node
+from src.agents.tool_node import ConcurrentToolNode
+from src.llms.rate_limit import LLMRateLimiter
+
+DELAY = 0.2
+
+
+def _slow_tool(name: str, in_flight: list) -> StructuredTool:
+    """
+    A tool that takes DELAY seconds. Async calls record the calls in flight
+    and the maximum in `in_flight`.
+    """
+
+    async def arun(query: str) -> str:
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[1], in_flight[0])
+        await asyncio.sleep(DELAY)
+        in_flight[0] -= 1
+        return query
+
+    return StructuredTool.from_function(
+        func=lambda query: time.sleep(DELAY) or query,
+        coroutine=arun,
+        name=name,
+        description="A slow tool.",
+    )
+
+
+def _turn(*names: str) -> dict:
+    return {
+        "messages": [
+            AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": name, "args": {"query": str(i)}, "id": f"call_{i}"}
+                    for i, name in enumerate(names)
+                ],
+            )
+        ]
+    }
+
+
+def _ainvoke(node: ConcurrentToolNode, turn: dict) -> tuple[list, float]:
+    start = time.monotonic()
+    result = asyncio.run(node.ainvoke(turn))
+    return result["messages"], time.monotonic() - start
+
+
+def test_tool_calls_of_a_turn_run_concurrently():
+    """Test that a turn takes about as long as its slowest tool call."""
+    in_flight = [0, 0]
+    node = ConcurrentToolNode(
+        [_slow_tool("search", in_flight), _slow_tool("crawl", in_flight)]
+    )
+    messages, elapsed = _ainvoke(node, _turn("search", "crawl", "crawl", "crawl"))
+    assert [message.content for message in messages] == ["0", "1", "2", "3"]
+    assert in_flight[1] == 4
+    assert elapsed < 3 * DELAY
+
+    start = time.monotonic()
+    node.invoke(_turn("search", "crawl", "crawl", "crawl"))
+    assert time.monotonic() - start < 3 * DELAY
+
+
+def test_concurrency_limits():
+    """Test the limits per turn and per tool."""
+    in_flight = [0, 0]
+    node = ConcurrentToolNode([_slow_tool("search", in_flight)], max_concurrency=2)
+    _, elapsed = _ainvoke(node, _turn("search", "search", "search", "search"))
+    assert in_flight[1] == 2
+    assert 2 * DELAY <= elapsed < 3 * DELAY
+
+    in_flight = [0, 0]
+    limiters = {"browser": LLMRateLimiter("browser", max_concurrency=1)}
+    node = ConcurrentToolNode(
+        [_slow_tool("browser", in_flight), _slow_tool("search", in_flight)]
+    )
+    with patch.object(tool_node, "_tool_limiters", limiters):
+        _, elapsed = _ainvoke(node, _turn("browser", "browser", "search"))
+    assert 2 * DELAY <= elapsed < 3 * DELAY
+    assert limiters["browser"].stats()["calls"] == 2
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import re
+import threading
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import StructuredTool
+
+from src.agents.tool_node import ConcurrentToolNode
+from src.tools import read_tool_output
+from src.utils.token_utils import get_token_counter
+from src.utils.tool_output import content_text, load_tool_output, shape_tool_output
+
+counter = get_token_counter(mode="approximate")
+
+
+def _page(paragraphs: int = 200) -> str:
+    passages = [f"# Report\n\nAn overview of line {paragraphs} of the report."]
+    for i in range(1, paragraphs):
+        topic = "solar panel efficiency" if i in (120, 150) else "general filler text"
+        passages.append(f"Paragraph {i} is about {topic}. " * 8)
+    return "\n\n".join(passages)
+
+
+def _handle(shaped: str) -> str:
+    return re.search(r'"(out_[0-9a-f]+)"', shaped).group(1)
+
+
+def test_head_tail_truncation():
+    """Test that long outputs keep their beginning and end, within the caps."""
+    text = "\n".join(f"line {i}: " + "x" * 40 for i in range(2000))
+    shaped, handle = shape_tool_output(text, 500, 4000, counter=counter)
+    assert handle is not None and handle in shaped
+    assert counter.count(shaped) <= 500
+    assert len(shaped.encode("utf-8")) <= 4000
+    shaped_by_bytes, _ = shape_tool_output(text, 0, 1000, counter=counter)
+    assert 900 < len(shaped_by_bytes.encode("utf-8")) <= 1000
+    assert shaped.startswith("line 0: ")
+    assert "line 1999: " in shaped
+    assert "[...]" in shaped
+    # Deterministic, and the same output gets the same handle
+    assert shape_tool_output(text, 500, 4000, counter=counter) == (shaped, handle)
+    assert load_tool_output(handle) == text
+
+    assert shape_tool_output("short", 500, 4000, counter=counter) == ("short", None)
+    assert shape_tool_output(text, 0, 0, counter=counter) == (text, None)
+
+
+def test_relevant_passages():
+    """Test that the passages matching the query are kept, in their order."""
+    text = _page()
+    shaped, _ = shape_tool_output(
+        text, 300, 0, query="Solar panel efficiency", counter=counter
+    )
+    assert counter.count(shaped) <= 300
+    assert shaped.startswith("# Report")
+    assert shaped.index("Paragraph 120 ") < shaped.index("Paragraph 150 ")
+    assert "Paragraph 1 " not in shaped
+
+    # Without any matching passage, the beginning and the end are kept
+    shaped, _ = shape_tool_output(text, 300, 0, query="quantum", counter=counter)
+    assert "Paragraph 1 " in shaped and "Paragraph 199 " in shaped
+
+
+def test_crawl_message_content():
+    """Test that crawl_tool's message is shaped as its text."""
+    content = json.dumps(
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "# Title"},
+                {"type": "image_url", "image_url": {"url": "https://a.b/c.png"}},
+            ],
+        }
+    )
+    assert content_text(content) == "# Title\n\n![](https://a.b/c.png)"
+
+
+def test_read_tool_output():
+    """Test reading a stored output by offset and by query."""
+    text = _page()
+    _, handle = shape_tool_output(text, 300, 0, counter=counter)
+
+    first = read_tool_output.invoke({"handle": handle})
+    offset = int(re.search(r"offset=(\d+)", first).group(1))
+    assert text.startswith(first[: first.rindex("\n\n[Characters")])
+    second = read_tool_output.invoke({"handle": handle, "offset": offset})
+    assert text[offset:].startswith(second[:100])
+
+    relevant = read_tool_output.invoke({"handle": handle, "query": "solar panel"})
+    assert "Paragraph 120 " in relevant
+
+    assert "not found" in read_tool_output.invoke({"handle": "out_missing"})
+
+
+def test_tool_node_shapes_outputs():
+    """Test that long tool outputs are shortened before entering the history."""
+    page = _page()
+    crawl = StructuredTool.from_function(
+        func=lambda url: page, name="crawl_tool", description="Crawl a page."
+    )
+    node = ConcurrentToolNode([crawl, read_tool_output])
+    turn = {
+        "messages": [
+            HumanMessage(content="How efficient are solar panels?"),
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "crawl_tool", "args": {"url": "u"}, "id": "c"}],
+            ),
+        ]
+    }
+    for result in (node.invoke(turn), asyncio.run(node.ainvoke(turn))):
+        shaped = result["messages"][0].content
+        assert counter.count(shaped) < counter.count(page) / 4
+        assert "Paragraph 120 " in shaped
+        assert load_tool_output(_handle(shaped)) == page
+
+    node = ConcurrentToolNode([crawl], shape_outputs=False)
+    assert node.invoke(turn)["messages"][0].content == page
+
+
+class CountingCounter:
+    """Counts the characters every token count goes through."""
+
+    name = "counting"
+
+    def __init__(self):
+        self.counted = 0
+
+    def count(self, text: str) -> int:
+        self.counted += len(text)
+        return counter.count(text)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return counter.truncate(text, max_tokens)
+
+
+def test_relevant_passages_are_counted_once():
+    """Test that selecting passages does not count the selection again per passage."""
+    text = "\n\n".join(
+        f"Paragraph {i} is about solar panel efficiency. " * 8 for i in range(500)
+    )
+    counting = CountingCounter()
+    shaped, _ = shape_tool_output(
+        text, 20000, 0, query="solar panel efficiency", counter=counting
+    )
+    assert counter.count(shaped) <= 20000
+    # The text is counted for the total, and each passage and the selection once
+    assert counting.counted < 4 * len(text)
+
+
+def test_async_tool_node_shapes_in_a_thread():
+    """Test that the async tool node shapes outputs off the event loop."""
+    threads = []
+    shape = ConcurrentToolNode._shape
+
+    def recording_shape(self, call, output):
+        threads.append(threading.current_thread())
+        return shape(self, call, output)
+
+    crawl = StructuredTool.from_function(
+        func=lambda url: _page(), name="crawl_tool", description="Crawl a page."
+    )
+    turn = {
+        "messages": [
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "crawl_tool", "args": {"url": "u"}, "id": "c"}],
+            )
+        ]
+    }
+    with patch.object(ConcurrentToolNode, "_shape", recording_shape):
+        result = asyncio.run(ConcurrentToolNode([crawl]).ainvoke(turn))
+    assert threads and threads[0] is not threading.main_thread()
+    assert "read_tool_output" in result["messages"][0].content
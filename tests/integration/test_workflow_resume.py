@@ -0,0 +1,272 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import src.graph.nodes as nodes
+from src.service import workflow_service
+from src.service.workflow_service import (
+    close_durable_runtime,
+    get_workflow,
+    resume_agent_workflow,
+    run_agent_workflow,
+)
+
+PLAN = json.dumps(
+    {
+        "thought": "Research the topic.",
+        "title": "Quantum computing",
+        "steps": [
+            {
+                "agent_name": "researcher",
+                "title": "Research",
+                "description": "Research quantum computing.",
+            }
+        ],
+    }
+)
+
+REQUEST = [{"role": "user", "content": "Research quantum computing"}]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """A chat model that answers with the next of its responses on every call."""
+
+    responses: list[str]
+    calls: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _next(self) -> str:
+        self.calls.append(self.responses[0])
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(self._next()))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        content = self._next()
+        for start in range(0, len(content), 8):
+            chunk = AIMessageChunk(content=content[start : start + 8])
+            yield ChatGenerationChunk(message=chunk)
+
+
+class Crash(BaseException):
+    """Stops the workflow like a killed server process would."""
+
+
+class StubAgent:
+    """A research agent that fails, crashes or waits on request."""
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.release = None
+
+    async def ainvoke(self, state):
+        self.calls += 1
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        if self.release is not None:
+            await self.release.wait()
+        return {"messages": [*state["messages"], AIMessage("Qubits are neat.")]}
+
+
+@pytest.fixture
+def stubs(tmp_path):
+    """Run workflows on a temporary checkpoint database with stub LLMs."""
+    llms = {
+        "coordinator": ScriptedChatModel(responses=["handoff_to_planner()"], calls=[]),
+        "planner": ScriptedChatModel(responses=[PLAN], calls=[]),
+        "supervisor": ScriptedChatModel(
+            responses=['{"next": "researcher"}', '{"next": "FINISH"}'], calls=[]
+        ),
+    }
+    agent = StubAgent()
+    with (
+        patch.object(
+            workflow_service,
+            "CHECKPOINT_DB_PATH",
+            str(tmp_path / "checkpoints.sqlite"),
+        ),
+        patch.object(nodes, "_get_coordinator_llm", lambda _: llms["coordinator"]),
+        patch.object(nodes, "_get_planner_llm", lambda _: llms["planner"]),
+        patch.object(nodes, "_get_supervisor_llm", lambda: llms["supervisor"]),
+        patch.object(nodes, "get_research_agent", lambda: agent),
+        patch.object(nodes, "get_plan_cache_key", lambda _: None),
+    ):
+        yield llms, agent
+
+
+def _run(main):
+    async def run():
+        try:
+            return await main()
+        finally:
+            await close_durable_runtime()
+
+    return asyncio.run(run())
+
+
+async def _collect(events, stop_on: type = ()) -> list[dict]:
+    collected = []
+    try:
+        async for event in events:
+            collected.append(event)
+    except stop_on:
+        pass
+    return collected
+
+
+def _names(events: list[dict]) -> list[str]:
+    return [
+        event["event"]
+        + (f":{event['data']['agent_name']}" if "agent_name" in event["data"] else "")
+        for event in events
+        if event["event"] not in ("message", "start_of_llm", "end_of_llm")
+    ]
+
+
+def _workflow_id(events: list[dict]) -> str:
+    return next(e for e in events if e["event"] == "start_of_workflow")["data"][
+        "workflow_id"
+    ]
+
+
+def test_resume_replays_a_completed_workflow(stubs):
+    """Test that a completed workflow is replayed from the event log alone."""
+    llms, agent = stubs
+
+    async def main():
+        events = await _collect(run_agent_workflow(REQUEST))
+        workflow_id = _workflow_id(events)
+        await close_durable_runtime()
+        replayed = await _collect(resume_agent_workflow(workflow_id))
+        return events, replayed, await get_workflow(workflow_id)
+
+    events, replayed, workflow = _run(main)
+    assert _names(events)[-3:] == [
+        "end_of_workflow",
+        "final_session_state",
+        "workflow_summary",
+    ]
+    assert replayed == events
+    assert workflow["status"] == "completed"
+    assert agent.calls == 1
+    assert len(llms["planner"].calls) == 1
+    assert len(llms["supervisor"].calls) == 2
+
+
+def test_resume_continues_from_the_checkpoint(stubs):
+    """
+    Test that an interrupted workflow continues from its latest checkpoint,
+    without re-running the completed steps, and that the events of the
+    unfinished step are dropped from the log.
+    """
+    llms, agent = stubs
+    agent.error = Crash()
+
+    async def main():
+        events = await _collect(run_agent_workflow(REQUEST), stop_on=Crash)
+        workflow_id = _workflow_id(events)
+        interrupted = await get_workflow(workflow_id)
+        # A new server process resumes the workflow
+        await close_durable_runtime()
+        resumed = await _collect(resume_agent_workflow(workflow_id))
+        log = await workflow_service.workflow_store.list_events(workflow_id)
+        return events, interrupted, resumed, log, await get_workflow(workflow_id)
+
+    events, interrupted, resumed, log, workflow = _run(main)
+    assert interrupted["status"] == "running"
+    assert _names(events)[-1] == "start_of_agent:researcher"
+
+    names = _names(resumed)
+    # The events up to the last checkpoint are replayed, the researcher's
+    # unfinished step is not
+    assert resumed[: len(events) - 1] == events[:-1]
+    assert names.count("start_of_agent:planner") == 1
+    assert names.count("start_of_agent:researcher") == 1
+    assert names[-3:] == ["end_of_workflow", "final_session_state", "workflow_summary"]
+    assert log == resumed
+    assert workflow["status"] == "completed"
+
+    # The coordinator and planner ran once, the researcher step is re-run
+    assert len(llms["coordinator"].calls) == 1
+    assert len(llms["planner"].calls) == 1
+    assert agent.calls == 2
+    final_state = resumed[-2]["data"]["messages"]
+    assert final_state[-1]["content"] == "Qubits are neat."
+
+
+def test_failed_workflow_is_marked_and_retried(stubs):
+    """Test that a workflow whose graph raises is marked failed and can be retried."""
+    llms, agent = stubs
+    agent.error = RuntimeError("model unavailable")
+
+    async def main():
+        events = await _collect(run_agent_workflow(REQUEST), stop_on=RuntimeError)
+        workflow_id = _workflow_id(events)
+        failed = await get_workflow(workflow_id)
+        resumed = await _collect(resume_agent_workflow(workflow_id))
+        return failed, resumed, await get_workflow(workflow_id)
+
+    failed, resumed, workflow = _run(main)
+    assert failed["status"] == "failed"
+    assert _names(resumed)[-3] == "end_of_workflow"
+    assert workflow["status"] == "completed"
+    assert len(llms["planner"].calls) == 1
+    assert agent.calls == 2
+
+
+def test_resume_rejects_a_running_workflow(stubs):
+    """Test that a workflow cannot be resumed while it is still running."""
+    _, agent = stubs
+
+    async def main():
+        agent.release = asyncio.Event()
+        events = run_agent_workflow(REQUEST)
+        workflow_id = None
+        async for event in events:
+            if event["event"] == "start_of_workflow":
+                workflow_id = event["data"]["workflow_id"]
+            if event["event"] == "start_of_agent" and (
+                event["data"]["agent_name"] == "researcher"
+            ):
+                break
+        with pytest.raises(ValueError, match="already running"):
+            await anext(resume_agent_workflow(workflow_id))
+        agent.release.set()
+        rest = await _collect(events)
+        return rest, await get_workflow(workflow_id)
+
+    rest, workflow = _run(main)
+    assert _names(rest)[-1] == "workflow_summary"
+    assert workflow["status"] == "completed"
+
+
+def test_resume_sends_missing_final_events(stubs):
+    """Test that a finished workflow whose final events were lost gets them on resume."""
+
+    async def main():
+        events = await _collect(run_agent_workflow(REQUEST))
+        workflow_id = _workflow_id(events)
+        # The server stopped after the last checkpoint, before the final events
+        # were written
+        store = workflow_service.workflow_store
+        await store._conn.execute(
+            "DELETE FROM workflow_events WHERE workflow_id = ? AND step IS NULL",
+            (workflow_id,),
+        )
+        await store.set_status(workflow_id, "running")
+        return await _collect(resume_agent_workflow(workflow_id))
+
+    resumed = _run(main)
+    assert _names(resumed)[-2:] == ["end_of_workflow", "final_session_state"]
+    assert resumed[-1]["data"]["messages"][-1]["content"] == "Qubits are neat."